@@ -18,6 +18,9 @@ setup(
                       'requests[security]>=2.13,<3',
                       'pytest',
                       'sparqlwrapper'],
+    extras_require={'msgpack': ['msgpack'],
+                    'orjson': ['orjson'],
+                    'zstd': ['zstandard']},
     classifiers=[
                  'Programming Language :: Python :: 3.9',
                  'Programming Language :: Python :: 3.8',
@@ -17,21 +17,47 @@ from typing import List, Dict
 
 from builtins import range
 from builtins import object
+import asyncio
 import traceback
 import logging
 import random
 import json
 
+from collections import namedtuple
+from concurrent.futures import (ThreadPoolExecutor, wait, FIRST_COMPLETED,
+                                CancelledError)
+from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
 from six import string_types
-from json import dumps, loads
 from functools import partial
+from io import BytesIO
 from socket import setdefaulttimeout
+from time import time
 
-from weblyzard_api.util.http import Retrieve
+from weblyzard_api.util.http import (Retrieve, AbortHandle,
+                                     DEFAULT_POOL_SIZE,
+                                     DEFAULT_POOL_IDLE_TIMEOUT)
+from weblyzard_api.util.async_http import (AsyncRetrieve,
+                                           DEFAULT_MAX_CONNECTIONS)
+from weblyzard_api.util.json_codec import loads
+from weblyzard_api.client.admission import (get_admission_controller,
+                                            is_overload)
+from weblyzard_api.client.balancing import (NodeHealth, CLOSED,
+                                            get_balancing_strategy,
+                                            DEFAULT_FAILURE_THRESHOLD,
+                                            DEFAULT_RESET_TIMEOUT)
+from weblyzard_api.client.hedging import HedgedRequestError
+from weblyzard_api.client.batching import (AdaptiveBatcher,
+                                           HTTP_PAYLOAD_TOO_LARGE)
+from weblyzard_api.util.json_stream import iter_json_array
+from weblyzard_api.client.serialization import (
+    JSONSerializer, get_serializer, check_compression, compress,
+    DEFAULT_MIN_COMPRESSION_SIZE)
 
 # set higher timeout values
 WS_DEFAULT_TIMEOUT = 900
+# max. number of nodes queried in parallel by `execute_all_services`
+DEFAULT_MAX_WORKERS = 8
 
 WEBLYZARD_API_URL = getenv("WEBLYZARD_API_URL") or "http://localhost:8080"
 WEBLYZARD_API_USER = getenv("WEBLYZARD_API_USER")
@@ -41,6 +67,10 @@ OGER_API_URL = getenv("OGER_API_URL")
 
 logger = logging.getLogger(__name__)
 
+# the outcome of a request broadcast to a single node, i.e. either its
+# response or the raised error
+NodeResult = namedtuple('NodeResult', ('service_url', 'response', 'error'))
+
 
 class RESTClient(object):
     """
@@ -50,7 +80,11 @@ class RESTClient(object):
     def __init__(self, service_url: str, user: str=None, password: str=None,
                  authentification_method: str='basic',
                  module_name: str='eWRT.REST',
-                 default_timeout: int=WS_DEFAULT_TIMEOUT):
+                 default_timeout: int=WS_DEFAULT_TIMEOUT,
+                 pool_size: int=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout: int=DEFAULT_POOL_IDLE_TIMEOUT,
+                 compression: str=None, serializer=None,
+                 min_compression_size: int=DEFAULT_MIN_COMPRESSION_SIZE):
         """ 
         :param service_url: the base url of the web service
         :param modul_name: the module name to add to the USER AGENT
@@ -60,18 +94,34 @@ class RESTClient(object):
         :param authentification_method: authentification method to use
                                         ('basic'*, 'digest').
         :param default_timeout: default request timeout
+        :param pool_size: max. number of idle keep-alive connections to
+                          the web service
+        :param pool_idle_timeout: seconds after which idle connections
+                                  are discarded
+        :param compression: optional request body compression ('gzip',
+                            'zstd')
+        :param serializer: the serializer used for encoding request
+                           parameters ('json'*, 'msgpack' or a
+                           :class:`~weblyzard_api.client.serialization.Serializer`)
+        :param min_compression_size: min. size of compressed request bodies
         """
         # remove superfluous slashes, if required
         self.service_url = service_url[:-1] if service_url.endswith("/") \
             else service_url
         self.user = user
         self.password = password
+        self.compression = check_compression(compression)
+        self.serializer = get_serializer(serializer)
+        self.min_compression_size = min_compression_size
 
         if not default_timeout:
             default_timeout = WS_DEFAULT_TIMEOUT
 
         url_obj = Retrieve(module_name, sleep_time=0,
-                           default_timeout=default_timeout)
+                           default_timeout=default_timeout,
+                           pool_size=pool_size,
+                           pool_idle_timeout=pool_idle_timeout)
+        self._url_obj = url_obj
         self.retrieve = partial(url_obj.open,
                                 user=user,
                                 pwd=password,
@@ -81,7 +131,8 @@ class RESTClient(object):
     def _json_request(self, url: str, parameters: Dict=None,
                       parse_result: bool=True, return_plain: bool=False,
                       json_encode_arguments: bool=True,
-                      content_type: str='application/json'):
+                      content_type: str='application/json',
+                      stream_result: bool=False):
         """ Execute a given JSON request.
         :param url: the url to query
         :param parameters: optional parameters
@@ -91,24 +142,89 @@ class RESTClient(object):
         :param json_encode_arguments: whether to json encode the parameters
                                       (True*)
         :param content_type: one of 'application/json', 'application/xml'
+        :param stream_result: return an iterator which incrementally decodes
+                              the elements of the JSON array returned by the
+                              service (False*)
         """
         if parameters:
-            handle = self.retrieve(
-                url=url,
-                data=dumps(parameters) if json_encode_arguments else parameters,
-                headers={'Content-Type': content_type})
+            data, headers = self._encode_request(
+                parameters, json_encode_arguments, content_type)
+            try:
+                handle = self.retrieve(url=url, data=data, headers=headers)
+            except HTTPError as e:
+                if not self._fallback_to_json(e, headers):
+                    raise
+                data, headers = self._encode_request(
+                    parameters, json_encode_arguments, content_type)
+                handle = self.retrieve(url=url, data=data, headers=headers)
         else:
             handle = self.retrieve(url)
 
+        if stream_result:
+            return iter_json_array(handle)
+
         if parse_result:
             response = handle.read()
             if response:
-                return response if return_plain else loads(response.decode('utf8'))
+                return response if return_plain else \
+                    self._decode_response(handle, response)
             else:
                 # this will also return empty list, dicts ...
                 return response
         return handle
 
+    def _encode_request(self, parameters, json_encode_arguments,
+                        content_type):
+        """ serializes and compresses the request parameters
+        :returns: a tuple (data, headers) """
+        if json_encode_arguments:
+            data = self.serializer.dumps(parameters)
+            if content_type == 'application/json':
+                content_type = self.serializer.content_type
+        else:
+            data = parameters.encode('utf-8') \
+                if isinstance(parameters, str) else parameters
+
+        headers = {'Content-Type': content_type}
+        if not isinstance(self.serializer, JSONSerializer):
+            headers['Accept'] = '%s, application/json;q=0.9' % \
+                self.serializer.content_type
+        if self.compression and len(data) >= self.min_compression_size:
+            data = compress(data, self.compression)
+            headers['Content-Encoding'] = self.compression
+        return data, headers
+
+    def _fallback_to_json(self, error, headers):
+        """ falls back to uncompressed JSON, if the service does not support
+        the negotiated serialization or compression
+        :returns: True if the request should be resubmitted """
+        negotiated = 'Content-Encoding' in headers or \
+            not isinstance(self.serializer, JSONSerializer)
+        if not negotiated or error.code not in (400, 415):
+            return False
+        if error.code == 400 and 'Content-Encoding' not in headers:
+            return False
+
+        logger.warning('%s rejected %s request (%s); falling back to '
+                       'uncompressed JSON.', self.service_url,
+                       headers.get('Content-Encoding', self.serializer.name),
+                       error.code)
+        self.compression = None
+        if not isinstance(self.serializer, JSONSerializer):
+            self.serializer = JSONSerializer()
+        return True
+
+    def _decode_response(self, handle, response):
+        """ decodes the response based on its content type """
+        content_type = (handle.headers.get('Content-Type') or '').split(';')[0]
+        if content_type.strip() in self.serializer.response_content_types:
+            return self.serializer.loads(response)
+        return loads(response)
+
+    def close(self):
+        """ Close all idle keep-alive connections to the web service. """
+        self._url_obj.close()
+
     @staticmethod
     def get_request_url(service_url: str, command: str, identifier: str=None,
                         query_parameters: str=None):
@@ -136,7 +252,8 @@ class RESTClient(object):
     def execute(self, command: str, identifier: str=None, parameters: Dict=None,
                 parse_result: bool=True, return_plain: bool=False,
                 json_encode_arguments: bool=True, query_parameters: str=None,
-                content_type: str='application/json'):
+                content_type: str='application/json',
+                stream_result: bool=False):
         """ Execute a given JSON command on the given web service
         :param command: the command to execute
         :param identifier: an optional identifier (e.g. batch_id, ...)
@@ -146,6 +263,8 @@ class RESTClient(object):
                              using json.load (False*)
         :param json_encode_arguments: whether to json encode the parameters
         :param query_parameters: optional query parameters
+        :param stream_result: return an iterator over the elements of the
+                              JSON array returned by the service
         :rtype: the query result
         """
         url = self.get_request_url(self.service_url, command, identifier,
@@ -157,24 +276,85 @@ class RESTClient(object):
                                   parse_result=parse_result,
                                   return_plain=return_plain,
                                   json_encode_arguments=json_encode_arguments,
-                                  content_type=content_type)
+                                  content_type=content_type,
+                                  stream_result=stream_result)
 
 
 class MultiRESTClient(object):
     """ Allow multiple URLs for access REST services """
     MAX_BATCH_SIZE = 500
     URL_PATH: str = ''
+    REST_CLIENT_CLASS = RESTClient
+    # errors after which service calls resubmit their requests
+    RETRYABLE_ERRORS = (HTTPError, URLError)
 
     def __init__(self, service_urls, user=None, password=None,
-                 default_timeout=WS_DEFAULT_TIMEOUT, use_random_server=True):
-
+                 default_timeout=WS_DEFAULT_TIMEOUT, use_random_server=True,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 max_workers=DEFAULT_MAX_WORKERS,
+                 balancing_strategy='fixed',
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 hedging_policy=None, compression=None, serializer=None,
+                 admission_control=None):
+        """
+        :param service_urls: a single or a list of service urls
+        :param user: optional user name
+        :param password: optional password
+        :param default_timeout: the default request timeout
+        :param use_random_server: shuffle the service urls
+        :param pool_size: max. number of idle keep-alive connections per node
+        :param pool_idle_timeout: seconds after which idle connections are
+                                  discarded
+        :param max_workers: max. number of nodes queried in parallel by
+                            `execute_all_services` requests
+        :param balancing_strategy: the order in which nodes are tried, i.e.
+            'fixed', 'round_robin', 'least_outstanding', 'latency_ewma' or
+            a :class:`~weblyzard_api.client.balancing.BalancingStrategy`
+        :param failure_threshold: number of consecutive failures after which
+                                  a node is ejected
+        :param reset_timeout: seconds after which an ejected node is probed
+                              again
+        :param hedging_policy: an optional
+            :class:`~weblyzard_api.client.hedging.HedgingPolicy` which
+            enables hedging for requests issued with `hedge=True`
+        :param compression: optional request body compression ('gzip',
+                            'zstd'); clients fall back to uncompressed
+                            requests if a service does not support it.
+        :param serializer: the request serializer ('json'*, 'msgpack' or a
+            :class:`~weblyzard_api.client.serialization.Serializer`);
+            clients fall back to JSON if a service does not support it.
+        :param admission_control: limit the number of requests in flight
+            per node and adapt the limits to the service's back-pressure
+            (True or an
+            :class:`~weblyzard_api.client.admission.AdmissionController`).
+            Requests exceeding the service's capacity are queued; 429, 502
+            and 503 responses reduce the number of concurrent requests and
+            pause the node as indicated by the service.
+        """
         self._service_urls = self.fix_urls(service_urls, user, password)
+        self.max_workers = max_workers
+        self.balancing_strategy = get_balancing_strategy(balancing_strategy)
+        self.hedging_policy = hedging_policy
+        self._hedging_executor = None
+        self.admission = get_admission_controller(admission_control)
+        # adapts the size of document batches to the server's latency
+        self.batcher = AdaptiveBatcher(max_batch_size=self.MAX_BATCH_SIZE)
 
         if use_random_server:
             random.shuffle(self._service_urls)
 
         self.clients = self._connect_clients(self._service_urls,
-                                             default_timeout=default_timeout)
+                                             default_timeout=default_timeout,
+                                             pool_size=pool_size,
+                                             pool_idle_timeout=pool_idle_timeout,
+                                             compression=compression,
+                                             serializer=serializer)
+        self.health = {client: NodeHealth(client.service_url,
+                                          failure_threshold=failure_threshold,
+                                          reset_timeout=reset_timeout)
+                       for client in self.clients.values()}
 
     def is_online(self):
         try:
@@ -219,7 +399,10 @@ class MultiRESTClient(object):
 
     @classmethod
     def _connect_clients(cls, service_urls, user=None, password=None,
-                         default_timeout=WS_DEFAULT_TIMEOUT):
+                         default_timeout=WS_DEFAULT_TIMEOUT,
+                         pool_size=DEFAULT_POOL_SIZE,
+                         pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                         compression=None, serializer=None):
 
         clients = {}
 
@@ -240,10 +423,14 @@ class MultiRESTClient(object):
                         if user is None and password is None:
                             url_i, user, password = Retrieve.get_user_password(url_i)
 
-                        clients[i] = RESTClient(service_url=url_i,
-                                                user=user,
-                                                password=password,
-                                                default_timeout=default_timeout)
+                        clients[i] = cls.REST_CLIENT_CLASS(service_url=url_i,
+                            user=user,
+                            password=password,
+                            default_timeout=default_timeout,
+                            pool_size=pool_size,
+                            pool_idle_timeout=pool_idle_timeout,
+                            compression=compression,
+                            serializer=serializer)
                     return clients
             else:
 
@@ -251,17 +438,24 @@ class MultiRESTClient(object):
                     url, user, password = Retrieve.get_user_password(url)
 
                 # append to end
-                clients[len(clients)] = RESTClient(service_url=url,
-                                                   user=user,
-                                                   password=password,
-                                                   default_timeout=default_timeout)
+                clients[len(clients)] = cls.REST_CLIENT_CLASS(
+                    service_url=url,
+                    user=user,
+                    password=password,
+                    default_timeout=default_timeout,
+                    pool_size=pool_size,
+                    pool_idle_timeout=pool_idle_timeout,
+                    compression=compression,
+                    serializer=serializer)
         return clients
 
     def request(self, path: str, parameters: Dict=None, source_id: int=None,
                 parse_result: bool=True, return_plain: bool=False,
                 json_encode_arguments: bool=True,
                 query_parameters: str=None, content_type: str='application/json',
-                execute_all_services: bool=False, pass_through_exceptions=()):
+                execute_all_services: bool=False, pass_through_exceptions=(),
+                hedge: bool=False, stream_result: bool=False,
+                return_node_results: bool=False):
         """ Execute a given JSON request.
         :param path: the path to query
         :param parameters: optional parameters
@@ -271,58 +465,653 @@ class MultiRESTClient(object):
             set to True, if the client shall pass through all exceptions
         :param return_plain: whether to return the result without prior
                              deserialization using json.load (False*)
+        :param execute_all_services: send the request concurrently to all
+            services (at most `max_workers` at a time)
+        :param hedge: send a duplicate request to the next service, if the
+            first one does not answer within the delay determined by the
+            client's `hedging_policy`. Only use for idempotent requests.
+        :param stream_result: return an iterator which incrementally decodes
+            the elements of the JSON array returned by the service rather
+            than the decoded result
+        :param return_node_results: return a list of :class:`NodeResult`
+            tuples (one per service, including failed ones) for requests
+            sent to all services
+        :returns: the service's response or, if `execute_all_services` is
+            set, the list of the successful services' responses (failed
+            services are logged)
         """
+        clients = self._select_clients(source_id)
+        execute_args = self._get_execute_args(
+            path, parameters, parse_result, return_plain,
+            json_encode_arguments, query_parameters, content_type,
+            stream_result)
+        if execute_all_services:
+            return self._broadcast(clients, path, execute_args,
+                                   pass_through_exceptions,
+                                   return_node_results)
+
+        hedge = hedge and self.hedging_policy is not None
         response = None
         errors = []
 
-        clients = []
-        if source_id is not None and source_id > 0:
-            client_id = source_id % len(self.clients)
-            if client_id in self.clients:
-                clients = [self.clients[client_id]]
+        remaining = list(clients)
+        while remaining:
+            client = self._next_client(remaining)
+            try:
+                response = self._admitted_execute(client, remaining,
+                                                  execute_args, hedge)
+                break
+            except Exception as e:
+                self._handle_request_error(client, path, e, errors,
+                                           pass_through_exceptions)
 
-        if not len(clients):
-            clients = self.clients.values()
+        self._check_request_errors(path, errors)
+        return response
 
-        for client in clients:
-            try:
-                response = client.execute(
-                    command=path,
+    @staticmethod
+    def _get_execute_args(path, parameters, parse_result, return_plain,
+                          json_encode_arguments, query_parameters,
+                          content_type, stream_result):
+        """ :returns: the keyword arguments of `RESTClient.execute` for the
+            given request """
+        return dict(command=path,
                     parameters=parameters,
                     parse_result=parse_result,
                     return_plain=return_plain,
                     json_encode_arguments=json_encode_arguments,
                     query_parameters=query_parameters,
-                    content_type=content_type)
+                    content_type=content_type,
+                    stream_result=stream_result)
 
-                if not execute_all_services:
-                    break
+    @staticmethod
+    def _handle_request_error(client, path, error, errors,
+                              pass_through_exceptions):
+        """ Handles the error of a failed attempt to execute the request on
+        `client` (must be called within the except clause).
 
-            except Exception as e:
-                if pass_through_exceptions:
-                    raise e
-                else:
-                    msg = 'Could not execute %s %s, error %s\n%s' % (
-                        client.service_url, path, e,
-                        traceback.format_exc())
-                    logger.warning(msg, exc_info=True)
-                    errors.append(msg)
+        :param errors: the list of error messages, which is extended by
+            the messages of the failed nodes
+        :raises: the (first node's) error, if `pass_through_exceptions` is
+            set
+        """
+        if isinstance(error, HedgedRequestError):
+            if pass_through_exceptions:
+                raise error.errors[0][1]
+            for failed_client, node_error in error.errors:
+                msg = 'Could not execute %s %s, error %s' % (
+                    failed_client.service_url, path, node_error)
+                logger.warning(msg, exc_info=node_error)
+                errors.append(msg)
+            return
+        if pass_through_exceptions:
+            raise error
+        msg = 'Could not execute %s %s, error %s\n%s' % (
+            client.service_url, path, error, traceback.format_exc())
+        logger.warning(msg, exc_info=True)
+        errors.append(msg)
 
+    def _check_request_errors(self, path, errors):
+        """ raises an exception, if the request has failed on all nodes """
         if len(errors) == len(self.clients):
-            print ('\n'.join(errors))
             raise Exception('Could not make request to path %s: %s' % (
                 path,
                 '\n'.join(errors)))
 
+    def _next_client(self, remaining):
+        """ removes and returns the next client of `remaining`; with
+        admission control, waits until one of the clients has a free slot
+        """
+        if self.admission is None:
+            return remaining.pop(0)
+        client = self.admission.acquire(remaining)
+        remaining.remove(client)
+        return client
+
+    def _next_hedge_client(self, remaining):
+        """ removes and returns the next client of `remaining` for a hedge
+        request; with admission control, returns None rather than waiting,
+        if none of the clients has a free slot """
+        if self.admission is None:
+            return remaining.pop(0)
+        client = self.admission.try_acquire(remaining)
+        if client is not None:
+            remaining.remove(client)
+        return client
+
+    def _get_hedge_client(self, client, remaining):
+        """ :returns: the client of `remaining` (which is removed from
+            `remaining`) for a hedge request of the request to `client`,
+            or None if the hedging budget or the admission control do not
+            allow a hedge request """
+        if not self.hedging_policy.acquire_hedge():
+            return None
+        hedge_client = self._next_hedge_client(remaining)
+        if hedge_client is not None:
+            logger.debug('Hedging request to %s with %s', client.service_url,
+                         hedge_client.service_url)
+        return hedge_client
+
+    def _release_hedge(self, client, future):
+        """ releases the admission slot of the hedge request executed by
+        the given (completed or cancelled) future """
+        if future.cancelled():
+            self._release(client, CancelledError())
+        else:
+            self._release(client, future.exception())
+
+    def _admitted_execute(self, client, remaining, execute_args, hedge):
+        """ executes the (optionally hedged) request on the client chosen
+        by :meth:`_next_client` and releases its admission slot """
+        try:
+            if hedge and remaining:
+                response = self._hedged_execute(client, remaining,
+                                                execute_args)
+            else:
+                response = self._execute(client, execute_args)
+        except BaseException as e:
+            self._release(client, e)
+            raise
+        self._release(client)
+        return response
+
+    def _release(self, client, error=None):
+        """ releases the client's admission slot """
+        if self.admission is None:
+            return
+        if isinstance(error, HedgedRequestError):
+            error = dict(error.errors).get(client, error)
+        self.admission.release(client, error)
+
+    def _get_retry_delay(self, error, max_retry_delay):
+        """ :returns: the number of seconds to wait before resubmitting a
+            request which failed with the given error; overloads are
+            handled by the admission control, which delays the next request
+            to the overloaded node """
+        if self.admission is not None and is_overload(error):
+            return 0
+        return max_retry_delay * random.random()
+
+    def _get_batch_retry_delay(self, error, max_retry_delay):
+        """ :returns: the number of seconds to wait before resubmitting a
+            batch which failed with the given error (see
+            :meth:`_get_retry_delay`)
+        :raises: the error, if the batch has been too large, since the
+            batcher resubmits smaller batches """
+        if getattr(error, 'code', None) == HTTP_PAYLOAD_TOO_LARGE:
+            raise error
+        return self._get_retry_delay(error, max_retry_delay)
+
+    @staticmethod
+    def _retry_attempts(wait_time, max_retry_attempts):
+        """ yields the number of previous attempts before every attempt to
+        submit a request, until either `wait_time` seconds have passed or
+        `max_retry_attempts` attempts have been made """
+        attempts = 0
+        start_time = time()
+        while time() - start_time < wait_time and \
+                attempts < max_retry_attempts:
+            yield attempts
+            attempts += 1
+
+    def _timed_execute(self, client, execute_args, abort_handle=None):
+        """ executes the request and records its latency in the hedging
+        policy """
+        start_time = time()
+        response = self._execute(client, execute_args, abort_handle)
+        self.hedging_policy.record_latency(time() - start_time)
+        return response
+
+    def _hedged_execute(self, client, remaining, execute_args):
+        """ Executes the request on `client` and hedges it by sending the
+        request to the next client of `remaining` (which is removed from
+        `remaining`), if `client` does not answer in time.
+
+        The losing request is aborted by shutting down its connection, so
+        that it does not occupy a thread of the hedging executor (and its
+        connection) until the socket times out.
+
+        :returns: the first successful response
+        :raises HedgedRequestError: if all involved clients fail
+        """
+        policy = self.hedging_policy
+        policy.start_request()
+        if self._hedging_executor is None:
+            self._hedging_executor = ThreadPoolExecutor(
+                max_workers=2 * max(1, self.max_workers))
+        executor = self._hedging_executor
+
+        handles = {}
+        primary = executor.submit(self._timed_execute, client, execute_args,
+                                  handles.setdefault(client, AbortHandle()))
+        futures = {primary: client}
+        done, _ = wait([primary], timeout=policy.get_delay())
+        hedge_client = None if done else \
+            self._get_hedge_client(client, remaining)
+        if hedge_client is not None:
+            hedge = executor.submit(
+                self._timed_execute, hedge_client, execute_args,
+                handles.setdefault(hedge_client, AbortHandle()))
+            hedge.add_done_callback(partial(self._release_hedge,
+                                            hedge_client))
+            futures[hedge] = hedge_client
+
+        errors = []
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    errors.append((futures[future], e))
+                    continue
+                for loser in pending:
+                    if not loser.cancel():
+                        handles[futures[loser]].abort()
+                return response
+        raise HedgedRequestError(errors)
+
+    def _broadcast(self, clients, path, execute_args,
+                   pass_through_exceptions=(), return_node_results=False):
+        """ Executes the request on all given clients using a bounded
+        thread pool.
+
+        :returns: the results in the order of `clients` (see
+            :meth:`_check_broadcast_results`)
+        """
+        with ThreadPoolExecutor(
+                max_workers=max(1, min(self.max_workers, len(clients)))) \
+                as executor:
+            futures = [executor.submit(self._execute, client, execute_args)
+                       for client in clients]
+            results = []
+            for client, future in zip(clients, futures):
+                try:
+                    results.append(NodeResult(client.service_url,
+                                              future.result(), None))
+                except Exception as e:
+                    if pass_through_exceptions:
+                        for pending in futures:
+                            pending.cancel()
+                        raise e
+                    results.append(NodeResult(client.service_url, None, e))
+        return self._check_broadcast_results(path, results,
+                                             return_node_results)
+
+    @staticmethod
+    def _check_broadcast_results(path, results, return_node_results=False):
+        """ logs failed nodes and raises an exception if no node succeeded
+
+        :param results: a list of :class:`NodeResult` tuples
+        :param return_node_results: return the `results` rather than the
+            responses of the successful nodes
+        """
+        errors = []
+        for result in results:
+            if result.error is not None:
+                msg = 'Could not execute %s %s, error %s' % (
+                    result.service_url, path, result.error)
+                logger.warning(msg, exc_info=result.error)
+                errors.append(msg)
+
+        if results and len(errors) == len(results):
+            raise Exception('Could not make request to path %s: %s' % (
+                path,
+                '\n'.join(errors)))
+        if return_node_results:
+            return results
+        return [result.response for result in results
+                if result.error is None]
+
+    def _execute(self, client, execute_args, abort_handle=None):
+        """ executes the request on the given client and updates the
+        client's health; aborted requests do not count as node failures """
+        health = self.health[client]
+        start_time = health.start()
+        try:
+            if abort_handle is None:
+                response = client.execute(**execute_args)
+            else:
+                with abort_handle:
+                    response = client.execute(**execute_args)
+        except BaseException as e:
+            health.failure(e)
+            raise
+        health.success(start_time)
         return response
 
+    def _select_clients(self, source_id: int=None):
+        """ :returns: the clients to query for the given source_id, ordered
+            by the balancing strategy. Ejected clients are only used as a
+            last resort, except for a single probe request once their
+            reset timeout has passed, which is sent first. """
+        if source_id is not None and source_id > 0:
+            client_id = source_id % len(self.clients)
+            if client_id in self.clients:
+                return [self.clients[client_id]]
+        probes, available, ejected = [], [], []
+        for client in self.clients.values():
+            health = self.health[client]
+            if health.state == CLOSED:
+                available.append(client)
+            elif health.try_start():
+                probes.append(client)
+            else:
+                ejected.append(client)
+        return probes + self.balancing_strategy.order(available,
+                                                      self.health) + ejected
+
+    def get_health(self):
+        """ :returns: a list of dictionaries with the health counters of
+            every node """
+        return [self.health[client].as_dict()
+                for client in self.clients.values()]
+
     def get_service_urls(self):
         """ """
         return [client.service_url for client in self.clients.values()]
 
+    def close(self):
+        """ Close all idle keep-alive connections. """
+        for client in self.clients.values():
+            client.close()
+        if self._hedging_executor is not None:
+            self._hedging_executor.shutdown(wait=False)
+            self._hedging_executor = None
+
     @classmethod
     def get_document_batch(cls, documents, batch_size=None):
         batch_size = batch_size if batch_size else cls.MAX_BATCH_SIZE
         for i in range(0, len(documents), batch_size):
             yield documents[i:i + batch_size]
 
+
+class AsyncRESTClient(RESTClient):
+    """
+    class:: AsyncRESTClient
+
+    asyncio counterpart of :class:`RESTClient` - :meth:`execute` returns
+    a coroutine. Only basic authentification is supported.
+    """
+
+    def __init__(self, service_url: str, user: str=None, password: str=None,
+                 authentification_method: str='basic',
+                 module_name: str='eWRT.REST',
+                 default_timeout: int=WS_DEFAULT_TIMEOUT,
+                 pool_size: int=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout: int=DEFAULT_POOL_IDLE_TIMEOUT,
+                 max_connections: int=DEFAULT_MAX_CONNECTIONS,
+                 compression: str=None, serializer=None,
+                 min_compression_size: int=DEFAULT_MIN_COMPRESSION_SIZE):
+        """
+        :param service_url: the base url of the web service
+        :param modul_name: the module name to add to the USER AGENT
+                               description (optional)
+        :param user: username
+        :param password: password
+        :param authentification_method: authentification method to use
+                                        (only 'basic' is supported).
+        :param default_timeout: default request timeout
+        :param pool_size: max. number of idle keep-alive connections to
+                          the web service
+        :param pool_idle_timeout: seconds after which idle connections
+                                  are discarded
+        :param max_connections: max. number of concurrent connections to
+                                the web service
+        :param compression: optional request body compression
+        :param serializer: the serializer used for encoding request
+                           parameters
+        :param min_compression_size: min. size of compressed request bodies
+        """
+        if authentification_method != 'basic':
+            raise ValueError('AsyncRESTClient only supports basic '
+                             'authentification')
+        self.service_url = service_url[:-1] if service_url.endswith("/") \
+            else service_url
+        self.user = user
+        self.password = password
+        self.compression = check_compression(compression)
+        self.serializer = get_serializer(serializer)
+        self.min_compression_size = min_compression_size
+
+        if not default_timeout:
+            default_timeout = WS_DEFAULT_TIMEOUT
+
+        url_obj = AsyncRetrieve(module_name,
+                                default_timeout=default_timeout,
+                                pool_size=pool_size,
+                                pool_idle_timeout=pool_idle_timeout,
+                                max_connections=max_connections)
+        self._url_obj = url_obj
+        self.retrieve = partial(url_obj.open,
+                                user=user,
+                                pwd=password,
+                                authentification_method=authentification_method
+                                )
+
+    async def _json_request(self, url: str, parameters: Dict=None,
+                            parse_result: bool=True, return_plain: bool=False,
+                            json_encode_arguments: bool=True,
+                            content_type: str='application/json',
+                            stream_result: bool=False):
+        """ Execute a given JSON request (see :meth:`RESTClient._json_request`).
+
+        .. note::
+            The response body is always received completely; `stream_result`
+            only decodes the elements of the returned JSON array on demand.
+        """
+        if parameters:
+            data, headers = self._encode_request(
+                parameters, json_encode_arguments, content_type)
+            try:
+                handle = await self.retrieve(url=url, data=data,
+                                             headers=headers)
+            except HTTPError as e:
+                if not self._fallback_to_json(e, headers):
+                    raise
+                data, headers = self._encode_request(
+                    parameters, json_encode_arguments, content_type)
+                handle = await self.retrieve(url=url, data=data,
+                                             headers=headers)
+        else:
+            handle = await self.retrieve(url)
+
+        if stream_result:
+            return iter_json_array(BytesIO(handle.read()))
+
+        if parse_result:
+            response = handle.read()
+            if response:
+                return response if return_plain else \
+                    self._decode_response(handle, response)
+            else:
+                # this will also return empty list, dicts ...
+                return response
+        return handle
+
+    async def execute(self, command: str, identifier: str=None,
+                      parameters: Dict=None, parse_result: bool=True,
+                      return_plain: bool=False,
+                      json_encode_arguments: bool=True,
+                      query_parameters: str=None,
+                      content_type: str='application/json',
+                      stream_result: bool=False):
+        """ Execute a given JSON command on the given web service
+        (see :meth:`RESTClient.execute`).
+        """
+        url = self.get_request_url(self.service_url, command, identifier,
+                                   query_parameters)
+
+        logger.debug(f'Requesting url {url}')
+
+        return await self._json_request(
+            url=url, parameters=parameters,
+            parse_result=parse_result,
+            return_plain=return_plain,
+            json_encode_arguments=json_encode_arguments,
+            content_type=content_type,
+            stream_result=stream_result)
+
+
+class AsyncMultiRESTClient(MultiRESTClient):
+    """ asyncio counterpart of :class:`MultiRESTClient`.
+
+    :meth:`request` returns a coroutine, so that service methods which
+    directly return the result of `request` automatically become awaitable
+    in subclasses combining a service client with this class, e.g.
+    ``class AsyncJeremiaNg(AsyncMultiRESTClient, JeremiaNg)``.
+    """
+    REST_CLIENT_CLASS = AsyncRESTClient
+
+    async def is_online(self):
+        try:
+            await self.request('status')
+            return True
+        except:
+            return False
+
+    async def request(self, path: str, parameters: Dict=None,
+                      source_id: int=None, parse_result: bool=True,
+                      return_plain: bool=False,
+                      json_encode_arguments: bool=True,
+                      query_parameters: str=None,
+                      content_type: str='application/json',
+                      execute_all_services: bool=False,
+                      pass_through_exceptions=(), hedge: bool=False,
+                      stream_result: bool=False,
+                      return_node_results: bool=False):
+        """ Execute a given JSON request (see :meth:`MultiRESTClient.request`).
+        """
+        clients = self._select_clients(source_id)
+        execute_args = self._get_execute_args(
+            path, parameters, parse_result, return_plain,
+            json_encode_arguments, query_parameters, content_type,
+            stream_result)
+        if execute_all_services:
+            return await self._broadcast(clients, path, execute_args,
+                                         pass_through_exceptions,
+                                         return_node_results)
+
+        hedge = hedge and self.hedging_policy is not None
+        response = None
+        errors = []
+
+        remaining = list(clients)
+        while remaining:
+            client = await self._next_client(remaining)
+            try:
+                response = await self._admitted_execute(client, remaining,
+                                                        execute_args, hedge)
+                break
+            except Exception as e:
+                self._handle_request_error(client, path, e, errors,
+                                           pass_through_exceptions)
+
+        self._check_request_errors(path, errors)
+        return response
+
+    async def _next_client(self, remaining):
+        """ see :meth:`MultiRESTClient._next_client` """
+        if self.admission is None:
+            return remaining.pop(0)
+        client = await self.admission.acquire_async(remaining)
+        remaining.remove(client)
+        return client
+
+    async def _admitted_execute(self, client, remaining, execute_args,
+                                hedge):
+        """ see :meth:`MultiRESTClient._admitted_execute` """
+        try:
+            if hedge and remaining:
+                response = await self._hedged_execute(client, remaining,
+                                                      execute_args)
+            else:
+                response = await self._execute(client, execute_args)
+        except BaseException as e:
+            self._release(client, e)
+            raise
+        self._release(client)
+        return response
+
+    async def _execute(self, client, execute_args):
+        """ see :meth:`MultiRESTClient._execute` """
+        health = self.health[client]
+        start_time = health.start()
+        try:
+            response = await client.execute(**execute_args)
+        except BaseException as e:
+            health.failure(e)
+            raise
+        health.success(start_time)
+        return response
+
+    async def _timed_execute(self, client, execute_args):
+        """ see :meth:`MultiRESTClient._timed_execute` """
+        start_time = time()
+        response = await self._execute(client, execute_args)
+        self.hedging_policy.record_latency(time() - start_time)
+        return response
+
+    async def _hedged_execute(self, client, remaining, execute_args):
+        """ see :meth:`MultiRESTClient._hedged_execute`; the losing request
+        is cancelled. """
+        policy = self.hedging_policy
+        policy.start_request()
+
+        primary = asyncio.ensure_future(
+            self._timed_execute(client, execute_args))
+        tasks = {primary: client}
+        done, _ = await asyncio.wait([primary], timeout=policy.get_delay())
+        hedge_client = None if done else \
+            self._get_hedge_client(client, remaining)
+        if hedge_client is not None:
+            hedge = asyncio.ensure_future(
+                self._timed_execute(hedge_client, execute_args))
+            hedge.add_done_callback(partial(self._release_hedge,
+                                            hedge_client))
+            tasks[hedge] = hedge_client
+
+        errors = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append((tasks[task], task.exception()))
+                        continue
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise HedgedRequestError(errors)
+
+    async def _broadcast(self, clients, path, execute_args,
+                         pass_through_exceptions=(),
+                         return_node_results=False):
+        """ Executes the request concurrently on all given clients, with at
+        most `max_workers` requests in flight (see
+        :meth:`MultiRESTClient._broadcast`).
+        """
+        semaphore = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def execute(client):
+            async with semaphore:
+                return await self._execute(client, execute_args)
+
+        tasks = [asyncio.ensure_future(execute(client)) for client in clients]
+        try:
+            responses = await asyncio.gather(
+                *tasks, return_exceptions=not pass_through_exceptions)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        results = [NodeResult(client.service_url, None, response)
+                   if isinstance(response, Exception) else
+                   NodeResult(client.service_url, response, None)
+                   for client, response in zip(clients, responses)]
+        return self._check_broadcast_results(path, results,
+                                             return_node_results)
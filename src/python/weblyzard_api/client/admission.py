@@ -0,0 +1,271 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Client side admission control for :class:`MultiRESTClient` requests.
+
+An :class:`AdmissionController` limits the number of requests in flight
+per node. Requests exceeding the limit wait locally and are released as
+soon as a request to one of the nodes completes, rather than polling the
+service for free capacity.
+
+The per-node limits are adapted to the service's back-pressure using
+additive increase and multiplicative decrease (AIMD): successful requests
+slowly raise the limit, while overload responses (`429 Too Many
+Requests`, `502 Bad Gateway` and `503 Service Unavailable`) reduce it and
+block the node for the time given in the response's `Retry-After` header
+(or an exponential backoff if the header is missing).
+'''
+import asyncio
+import logging
+
+from email.utils import parsedate_to_datetime
+from threading import Condition
+from time import time
+from urllib.error import HTTPError
+
+logger = logging.getLogger(__name__)
+
+# status codes indicating an overloaded service
+OVERLOAD_STATUS_CODES = (429, 502, 503)
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 64
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+
+
+def is_overload(error):
+    ''' :returns: True if the error indicates an overloaded service '''
+    return isinstance(error, HTTPError) and \
+        error.code in OVERLOAD_STATUS_CODES
+
+
+def parse_retry_after(value, now=None):
+    '''
+    :param value: the value of a `Retry-After` header, i.e. a number of \
+        seconds or an HTTP date
+    :param now: the current time (default: :func:`time.time`)
+    :returns: the number of seconds to wait or None, if the value cannot \
+        be parsed
+    '''
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0., float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(0., retry_at - (time() if now is None else now))
+
+
+class NodeLimiter(object):
+    '''
+    In-flight limit of a single node.
+
+    :param service_url: the node's service url
+    :param initial_limit: the initial number of concurrent requests
+    :param min_limit: lower bound of the limit
+    :param max_limit: upper bound of the limit
+    :param decrease_factor: factor applied to the limit after overloads
+    :param backoff: seconds the node is blocked after an overload without \
+        `Retry-After` header; doubled with every consecutive overload
+    :param max_backoff: upper bound for the time a node is blocked
+    '''
+
+    def __init__(self, service_url, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 min_limit=DEFAULT_MIN_LIMIT, max_limit=DEFAULT_MAX_LIMIT,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+        self.service_url = service_url
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.decrease_factor = decrease_factor
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.in_flight = 0
+        self.blocked_until = 0.
+        self.overloads = 0
+        self.consecutive_overloads = 0
+        self._successes = 0
+
+    def get_delay(self, now):
+        ''' :returns: the number of seconds until the node may be used \
+            again, 0 if it is available or None if all slots are taken '''
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= self.limit:
+            return None
+        return 0
+
+    def success(self):
+        ''' records a successful request; the limit grows by one after \
+            `limit` successful requests '''
+        self.consecutive_overloads = 0
+        self._successes += 1
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def overload(self, retry_after=None, now=None):
+        ''' records an overload response and blocks the node for \
+            `retry_after` seconds (or the current backoff) '''
+        now = time() if now is None else now
+        self.overloads += 1
+        self.consecutive_overloads += 1
+        self._successes = 0
+        self.limit = max(self.min_limit,
+                         int(self.limit * self.decrease_factor))
+        if retry_after is None:
+            retry_after = self.backoff * 2 ** (self.consecutive_overloads - 1)
+        delay = min(retry_after, self.max_backoff)
+        self.blocked_until = max(self.blocked_until, now + delay)
+        logger.info('Node %s is overloaded; limiting it to %d concurrent '
+                    'requests and pausing for %.1f seconds',
+                    self.service_url, self.limit, delay)
+
+    def as_dict(self):
+        ''' :returns: a dictionary with the limiter's state '''
+        return {'service_url': self.service_url,
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'blocked_for': max(0., self.blocked_until - time()),
+                'overloads': self.overloads}
+
+
+class AdmissionController(object):
+    '''
+    Limits the number of concurrent requests per node.
+
+    The controller is thread-safe and may also be used by asyncio clients
+    (see :meth:`acquire_async`). The parameters are passed to the
+    :class:`NodeLimiter` of every node.
+    '''
+
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT,
+                 min_limit=DEFAULT_MIN_LIMIT, max_limit=DEFAULT_MAX_LIMIT,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF):
+        self._limiter_args = dict(initial_limit=initial_limit,
+                                  min_limit=min_limit, max_limit=max_limit,
+                                  decrease_factor=decrease_factor,
+                                  backoff=backoff, max_backoff=max_backoff)
+        self.limiters = {}
+        self._condition = Condition()
+        self._async_waiters = set()
+
+    def get_limiter(self, client):
+        ''' :returns: the :class:`NodeLimiter` of the given client '''
+        limiter = self.limiters.get(client)
+        if limiter is None:
+            limiter = self.limiters.setdefault(
+                client, NodeLimiter(client.service_url, **self._limiter_args))
+        return limiter
+
+    def _try_acquire(self, clients):
+        ''' :returns: a tuple of the first client in `clients` with a free \
+            slot (or None) and the max. number of seconds to wait before \
+            trying again (None, if only a completed request frees a slot) '''
+        now = time()
+        wait = None
+        for client in clients:
+            limiter = self.get_limiter(client)
+            delay = limiter.get_delay(now)
+            if delay == 0:
+                limiter.in_flight += 1
+                return client, None
+            if delay is not None:
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def try_acquire(self, clients):
+        '''
+        Acquires a slot without waiting.
+
+        :param clients: the candidate clients in the order of preference
+        :returns: the admitted client, which needs to be passed to \
+            :meth:`release` once the request has completed, or None if \
+            none of the clients has a free slot
+        '''
+        with self._condition:
+            return self._try_acquire(clients)[0]
+
+    def acquire(self, clients):
+        '''
+        Blocks until one of the given clients is allowed to send a request.
+
+        :param clients: the candidate clients in the order of preference
+        :returns: the admitted client, which needs to be passed to \
+            :meth:`release` once the request has completed
+        '''
+        with self._condition:
+            while True:
+                client, wait = self._try_acquire(clients)
+                if client is not None:
+                    return client
+                self._condition.wait(wait)
+
+    async def acquire_async(self, clients):
+        ''' asyncio variant of :meth:`acquire` '''
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                client, wait = self._try_acquire(clients)
+                if client is not None:
+                    return client
+                waiter = (loop, loop.create_future())
+                self._async_waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    self._async_waiters.discard(waiter)
+
+    def release(self, client, error=None):
+        '''
+        Releases the slot of a completed request and adapts the client's
+        limit to the outcome of the request.
+
+        :param client: the client returned by :meth:`acquire`
+        :param error: the request's exception, if it has failed
+        '''
+        with self._condition:
+            limiter = self.get_limiter(client)
+            limiter.in_flight -= 1
+            if is_overload(error):
+                headers = getattr(error, 'headers', None) or {}
+                limiter.overload(parse_retry_after(headers.get('Retry-After')))
+            elif error is None:
+                limiter.success()
+            self._condition.notify_all()
+            for loop, future in self._async_waiters:
+                loop.call_soon_threadsafe(self._wake, future)
+
+    @staticmethod
+    def _wake(future):
+        if not future.done():
+            future.set_result(None)
+
+    def as_dict(self):
+        ''' :returns: a list with the state of every node's limiter '''
+        return [limiter.as_dict() for limiter in self.limiters.values()]
+
+
+def get_admission_controller(admission_control):
+    '''
+    :param admission_control: an :class:`AdmissionController`, True for a \
+        controller with the default settings or None/False
+    :returns: the corresponding :class:`AdmissionController` or None
+    '''
+    if isinstance(admission_control, AdmissionController):
+        return admission_control
+    return AdmissionController() if admission_control else None
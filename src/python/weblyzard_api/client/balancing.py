@@ -0,0 +1,257 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Load balancing and circuit breaking for :class:`MultiRESTClient`.
+
+Every node of a :class:`~weblyzard_api.client.MultiRESTClient` is tracked
+by a :class:`NodeHealth` object, which counts requests, failures and
+in-flight requests, keeps an exponentially weighted moving average (EWMA)
+of the node's latency and implements a circuit breaker:
+
+ * ``closed``: the node is used normally.
+ * ``open``: the node failed ``failure_threshold`` times in a row and is
+   ejected; it is only tried as a last resort.
+ * ``half_open``: ``reset_timeout`` seconds after ejection, a single probe
+   request is sent to the node; it is closed again on success and re-opened
+   on failure.
+
+A :class:`BalancingStrategy` determines the order in which healthy nodes
+are tried.
+'''
+import logging
+
+from itertools import count
+from socket import timeout as SocketTimeout
+from threading import Lock
+from time import time
+from urllib.error import HTTPError, URLError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+DEFAULT_EWMA_DECAY = 0.3
+
+
+def is_node_failure(error):
+    '''
+    :returns: True if the given error indicates an unhealthy node (i.e.
+        connection errors, timeouts, overload and server errors) rather than
+        a problem with the request itself.
+    '''
+    if isinstance(error, HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (URLError, OSError, SocketTimeout,
+                              TimeoutError))
+
+
+class NodeHealth(object):
+    '''
+    Health counters and circuit breaker of a single node.
+
+    :param service_url: the node's service url
+    :param failure_threshold: number of consecutive failures after which \
+        the node is ejected
+    :param reset_timeout: seconds after which an ejected node is probed again
+    :param ewma_decay: weight of the latest latency in the latency EWMA
+    '''
+
+    def __init__(self, service_url, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 ewma_decay=DEFAULT_EWMA_DECAY):
+        self.service_url = service_url
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ewma_decay = ewma_decay
+
+        self.state = CLOSED
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.outstanding = 0
+        self.latency_ewma = None
+        self.opened_at = None
+        self.probe_started_at = None
+        self._lock = Lock()
+
+    def is_available(self):
+        ''' :returns: True if requests may be sent to the node (use \
+            :meth:`try_start` for selecting nodes, which admits a single \
+            probe request to an ejected node) '''
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time() - self.opened_at >= self.reset_timeout
+        # half open: only a single probe request at a time
+        return False
+
+    def try_start(self):
+        '''
+        Atomically decides whether a request may be sent to the node. Once
+        the reset timeout has passed, an ejected node admits exactly one
+        caller as probe (and another one, if the probe has not completed
+        within `reset_timeout`, e.g. because it has never been sent).
+
+        :returns: True if the caller may send a request to the node
+        '''
+        with self._lock:
+            now = time()
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                logger.info('Probing ejected node %s', self.service_url)
+                self.state = HALF_OPEN
+            elif now - self.probe_started_at < self.reset_timeout:
+                return False
+            self.probe_started_at = now
+            return True
+
+    def start(self):
+        ''' registers a new request to the node
+        :returns: the request's start time '''
+        with self._lock:
+            if self.state == OPEN and \
+                    time() - self.opened_at >= self.reset_timeout:
+                logger.info('Probing ejected node %s', self.service_url)
+                self.state = HALF_OPEN
+                self.probe_started_at = time()
+            self.requests += 1
+            self.outstanding += 1
+        return time()
+
+    def success(self, start_time):
+        ''' records a successful request started at `start_time` '''
+        latency = time() - start_time
+        with self._lock:
+            self.outstanding -= 1
+            self.successes += 1
+            self.consecutive_failures = 0
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = self.ewma_decay * latency + \
+                    (1 - self.ewma_decay) * self.latency_ewma
+            if self.state != CLOSED:
+                logger.info('Node %s is healthy again', self.service_url)
+                self.state = CLOSED
+                self.opened_at = None
+
+    def failure(self, error=None):
+        ''' records a failed request; errors which do not indicate an
+        unhealthy node (see :func:`is_node_failure`) do not count towards
+        the circuit breaker. '''
+        with self._lock:
+            self.outstanding -= 1
+            if error is not None and not is_node_failure(error):
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                    self.state == CLOSED and
+                    self.consecutive_failures >= self.failure_threshold):
+                logger.warning('Ejecting node %s after %d consecutive '
+                               'failures', self.service_url,
+                               self.consecutive_failures)
+                self.state = OPEN
+                self.opened_at = time()
+                self.ejections += 1
+
+    def as_dict(self):
+        ''' :returns: a dictionary with the node's health counters '''
+        return {'service_url': self.service_url,
+                'state': self.state,
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'consecutive_failures': self.consecutive_failures,
+                'ejections': self.ejections,
+                'outstanding': self.outstanding,
+                'latency_ewma': self.latency_ewma}
+
+
+class BalancingStrategy(object):
+    '''
+    Determines the order in which the (healthy) nodes are tried.
+    '''
+
+    def order(self, clients, health):
+        '''
+        :param clients: a list of clients
+        :param health: a dictionary mapping every client to its \
+            :class:`NodeHealth`
+        :returns: the clients in the order they should be tried
+        '''
+        raise NotImplementedError
+
+
+class FixedOrderStrategy(BalancingStrategy):
+    ''' Always tries the nodes in the configured order. '''
+
+    def order(self, clients, health):
+        return list(clients)
+
+
+class RoundRobinStrategy(BalancingStrategy):
+    ''' Rotates the start node with every request. '''
+
+    def __init__(self):
+        self._counter = count()
+
+    def order(self, clients, health):
+        if not clients:
+            return []
+        offset = next(self._counter) % len(clients)
+        return clients[offset:] + clients[:offset]
+
+
+class LeastOutstandingStrategy(RoundRobinStrategy):
+    ''' Prefers the nodes with the fewest requests in flight; ties are
+    resolved in round-robin order. '''
+
+    def order(self, clients, health):
+        return sorted(RoundRobinStrategy.order(self, clients, health),
+                      key=lambda client: health[client].outstanding)
+
+
+class LatencyEWMAStrategy(RoundRobinStrategy):
+    ''' Prefers the nodes with the lowest expected latency, i.e. the
+    latency EWMA weighted by the number of requests in flight. Nodes
+    without latency measurements are tried first. '''
+
+    def order(self, clients, health):
+        def expected_latency(client):
+            node = health[client]
+            if node.latency_ewma is None:
+                return 0.
+            return node.latency_ewma * (node.outstanding + 1)
+
+        return sorted(RoundRobinStrategy.order(self, clients, health),
+                      key=expected_latency)
+
+
+BALANCING_STRATEGIES = {'fixed': FixedOrderStrategy,
+                        'round_robin': RoundRobinStrategy,
+                        'least_outstanding': LeastOutstandingStrategy,
+                        'latency_ewma': LatencyEWMAStrategy}
+
+
+def get_balancing_strategy(strategy):
+    '''
+    :param strategy: a :class:`BalancingStrategy` or the name of one of the \
+        `BALANCING_STRATEGIES`
+    :returns: the corresponding :class:`BalancingStrategy` instance
+    '''
+    if isinstance(strategy, BalancingStrategy):
+        return strategy
+    if strategy not in BALANCING_STRATEGIES:
+        raise ValueError('Unknown balancing strategy %s (supported: %s)' % (
+            strategy, ', '.join(sorted(BALANCING_STRATEGIES))))
+    return BALANCING_STRATEGIES[strategy]()
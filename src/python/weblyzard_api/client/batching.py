@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Adaptive batching of document lists submitted to the web services.
+
+:class:`AdaptiveBatcher` splits document lists into batches which are
+limited by the number of documents and by their (JSON encoded) payload
+size. The batch size is adapted between requests using additive increase
+and multiplicative decrease (AIMD): it grows while batches are answered
+within the target latency and shrinks for slow batches and server errors.
+The batch results are merged in input order.
+'''
+import logging
+
+from threading import Lock
+from time import time
+from urllib.error import HTTPError
+
+from weblyzard_api.util.json_codec import dumpb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL_BATCH_SIZE = 50
+DEFAULT_MIN_BATCH_SIZE = 1
+DEFAULT_MAX_BATCH_SIZE = 500
+DEFAULT_MAX_BATCH_BYTES = 4 * 1024 * 1024
+DEFAULT_TARGET_LATENCY = 30
+DEFAULT_ADDITIVE_INCREASE = 10
+DEFAULT_DECREASE_FACTOR = 0.5
+
+# status code indicating that the request's payload has been too large
+HTTP_PAYLOAD_TOO_LARGE = 413
+
+
+def get_payload_size(document):
+    ''' :returns: the (estimated) size of the document's JSON payload '''
+    if isinstance(document, bytes):
+        return len(document)
+    if isinstance(document, str):
+        return len(document.encode('utf-8'))
+    return len(dumpb(document))
+
+
+def merge_results(results):
+    '''
+    Merges the results of subsequent batches in input order.
+
+    :param results: a list of batch results
+    :returns: the concatenated list, the merged dictionary or, if only a \
+        single batch has been submitted, its unmodified result.
+    '''
+    results = [result for result in results if result is not None]
+    if not results:
+        return None
+    if len(results) == 1:
+        return results[0]
+    if all(isinstance(result, list) for result in results):
+        merged = []
+        for result in results:
+            merged.extend(result)
+        return merged
+    if all(isinstance(result, dict) for result in results):
+        merged = {}
+        for result in results:
+            merged.update(result)
+        return merged
+    raise TypeError('Cannot merge batch results of type %s' %
+                    ', '.join(sorted({type(r).__name__ for r in results})))
+
+
+class AdaptiveBatcher(object):
+    '''
+    Splits document lists into batches whose size adapts to the observed
+    server latency.
+
+    :param initial_batch_size: the number of documents of the first batch
+    :param min_batch_size: the min. number of documents per batch
+    :param max_batch_size: the max. number of documents per batch
+    :param max_batch_bytes: the max. payload size of a batch (batches \
+        always contain at least one document)
+    :param target_latency: batches answered within this number of seconds \
+        increase the batch size, slower ones decrease it
+    :param additive_increase: number of documents added after fast batches
+    :param decrease_factor: factor applied to the batch size after slow \
+        batches and errors
+    '''
+
+    def __init__(self, initial_batch_size=DEFAULT_INITIAL_BATCH_SIZE,
+                 min_batch_size=DEFAULT_MIN_BATCH_SIZE,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_batch_bytes=DEFAULT_MAX_BATCH_BYTES,
+                 target_latency=DEFAULT_TARGET_LATENCY,
+                 additive_increase=DEFAULT_ADDITIVE_INCREASE,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR):
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size)
+        self.max_batch_bytes = max_batch_bytes
+        self.target_latency = target_latency
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.batch_size = min(max(initial_batch_size, self.min_batch_size),
+                              self.max_batch_size)
+        self._lock = Lock()
+
+    def record_latency(self, batch_length, latency):
+        ''' adapts the batch size to the latency of a successful batch '''
+        with self._lock:
+            if latency > self.target_latency:
+                self._decrease()
+            elif batch_length >= self.batch_size:
+                # only grow if the batch has actually been full
+                self.batch_size = min(self.max_batch_size,
+                                      self.batch_size + self.additive_increase)
+
+    def record_error(self):
+        ''' shrinks the batch size after a failed batch '''
+        with self._lock:
+            self._decrease()
+
+    def _decrease(self):
+        self.batch_size = max(self.min_batch_size,
+                              int(self.batch_size * self.decrease_factor))
+
+    def next_batch(self, documents, start):
+        '''
+        :param documents: the list of documents
+        :param start: index of the batch's first document
+        :returns: the next batch starting at the given index
+        '''
+        end = min(len(documents), start + self.batch_size)
+        if self.max_batch_bytes:
+            payload_size = 0
+            for index in range(start, end):
+                payload_size += get_payload_size(documents[index])
+                if payload_size > self.max_batch_bytes and index > start:
+                    end = index
+                    break
+        return documents[start:end]
+
+    def _is_retryable(self, error, batch):
+        ''' :returns: True if the batch may be resubmitted in smaller \
+            batches '''
+        return isinstance(error, HTTPError) and \
+            error.code == HTTP_PAYLOAD_TOO_LARGE and \
+            len(batch) > self.min_batch_size
+
+    def process(self, documents, submit, merge=merge_results):
+        '''
+        Submits the documents in adaptive batches.
+
+        :param documents: a list of documents
+        :param submit: function called with every batch
+        :param merge: function merging the list of batch results
+        :returns: the merged batch results
+        '''
+        results = []
+        start = 0
+        while start < len(documents):
+            batch = self.next_batch(documents, start)
+            start_time = time()
+            try:
+                result = submit(batch)
+            except Exception as e:
+                self.record_error()
+                if self._is_retryable(e, batch):
+                    logger.info('Payload too large; reducing batch size to '
+                                '%d', self.batch_size)
+                    continue
+                raise
+            self.record_latency(len(batch), time() - start_time)
+            results.append(result)
+            start += len(batch)
+        return merge(results)
+
+    async def process_async(self, documents, submit, merge=merge_results):
+        '''
+        asyncio variant of :meth:`process`; `submit` returns a coroutine.
+        '''
+        results = []
+        start = 0
+        while start < len(documents):
+            batch = self.next_batch(documents, start)
+            start_time = time()
+            try:
+                result = await submit(batch)
+            except Exception as e:
+                self.record_error()
+                if self._is_retryable(e, batch):
+                    logger.info('Payload too large; reducing batch size to '
+                                '%d', self.batch_size)
+                    continue
+                raise
+            self.record_latency(len(batch), time() - start_time)
+            results.append(result)
+            start += len(batch)
+        return merge(results)
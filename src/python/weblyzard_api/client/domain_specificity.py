@@ -4,7 +4,7 @@
 .. codeauthor:: Albert Weichselbraun <albert.weichselbraun@htwchur.ch>
 '''
 from __future__ import unicode_literals
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 
 from weblyzard_api.client import (
     WEBLYZARD_API_URL, WEBLYZARD_API_USER, WEBLYZARD_API_PASS)
@@ -45,6 +45,7 @@ class DomainSpecificity(MultiRESTClient):
         :param profile_name: the name of the domain specificity profile
         :param profile_mapping: a dictionary of keywords and their \
                                respective domain specificity values.
+        :returns: a list with the response of every successful node
         '''
         return self.request('add_or_refresh_profile/%s' % profile_name,
                             profile_mapping, execute_all_services=True)
@@ -68,19 +69,28 @@ class DomainSpecificity(MultiRESTClient):
                              for domain specificity.
         :param documents: a list of dictionaries containing the document
         :param is_case_sensitive: case sensitive or not
+        :param batch_size: optional fixed batch size; by default the batch \
+                           size adapts to the service's latency
         :returns: dict (profilename: (content_id, dom_spec))  
         '''
+        path = 'parse_documents/%s/%s' % (matview_name, is_case_sensitive)
+        if not batch_size:
+            return self.batcher.process(
+                documents, lambda batch: self._get_found_tags(
+                    matview_name, self.request(path, batch))) or {}
+
         found_tags = {}
         for document_batch in self.get_document_batch(documents=documents,
                                                       batch_size=batch_size):
-            result = self.request('parse_documents/%s/%s' %
-                                  (matview_name, is_case_sensitive),
-                                  document_batch)
-            if result:
-                found_tags.update(result[matview_name])
+            found_tags.update(self._get_found_tags(
+                matview_name, self.request(path, document_batch)))
 
         return found_tags
 
+    @staticmethod
+    def _get_found_tags(matview_name, result):
+        return result[matview_name] if result else {}
+
     def search_documents(self, profile_name, documents, is_case_sensitive=False):
         return self.request('search_documents/%s/%s' % (profile_name,
                                                         is_case_sensitive),
@@ -107,3 +117,32 @@ class DomainSpecificity(MultiRESTClient):
         :returns: Information on the web service's memory consumption
         '''
         return self.request('meminfo')
+
+
+class AsyncDomainSpecificity(AsyncMultiRESTClient, DomainSpecificity):
+    '''
+    asyncio variant of :class:`DomainSpecificity`; all service methods
+    return coroutines.
+    '''
+
+    async def parse_documents(self, matview_name, documents,
+                              is_case_sensitive=False, batch_size=None):
+        ''' see :meth:`DomainSpecificity.parse_documents` '''
+        path = 'parse_documents/%s/%s' % (matview_name, is_case_sensitive)
+        if not batch_size:
+            async def submit(batch):
+                return self._get_found_tags(matview_name,
+                                            await self.request(path, batch))
+            return await self.batcher.process_async(documents, submit) or {}
+
+        found_tags = {}
+        for document_batch in self.get_document_batch(documents=documents,
+                                                      batch_size=batch_size):
+            found_tags.update(self._get_found_tags(
+                matview_name, await self.request(path, document_batch)))
+
+        return found_tags
+
+    async def has_profile(self, profile_name):
+        ''' see :meth:`DomainSpecificity.has_profile` '''
+        return profile_name in await self.list_profiles()
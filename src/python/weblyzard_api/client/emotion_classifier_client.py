@@ -7,7 +7,7 @@ Created on April 15, 2021
 '''
 import logging
 
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 from weblyzard_api.client import (
     WEBLYZARD_API_URL, WEBLYZARD_API_USER, WEBLYZARD_API_PASS)
 
@@ -20,6 +20,8 @@ logger = logging.getLogger(__name__)
 class EmotionClassifierClient(MultiRESTClient):
     URL_PATH = '/'.join(SERVER_URL_PATH.split('/')[:-1])
     DEFAULT_EMOTIONAL_CATEGORIES = 'glove_lemmatized'
+    # number of attempts of a request before an error result is returned
+    MAX_ATTEMPTS = 2
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
                  pwd=WEBLYZARD_API_PASS, default_timeout=None):
@@ -45,28 +47,46 @@ class EmotionClassifierClient(MultiRESTClient):
             ocurred, it is also contained in the dict with the 'error' key.
         :rtype: dict
         '''
-        result = None
-        retrycount = 1
-        retries = 0
-        while retries <= retrycount:
-            retries += 1
+        parameters = {'format': content_format,
+                      'content': content,
+                      'emotional_categories': emotional_categories}
+        for _ in range(self.MAX_ATTEMPTS):
             try:
-                result = self.request('document',
-                                      parameters={'format': content_format,
-                                                  'content': content,
-                                                  'emotional_categories': emotional_categories},
-                                      return_plain=False)
-                break
+                return self.request('document', parameters=parameters,
+                                    return_plain=False)
             except Exception as e:
-                if retries <= retrycount:
-                    pass  # silently retry
-                else:
-                    msg = f'Request to emotions webservice ' \
-                          f'failed {retries} times, latest error was {e}'
-                    logger.warning(msg, exc_info=True)
-                    result = {
-                        'error': msg}
-        return result
+                error = e
+        return self._get_error_result(error)
+
+    @classmethod
+    def _get_error_result(cls, error):
+        ''' :returns: the result of a request which has failed \
+            `MAX_ATTEMPTS` times with `error` as latest error '''
+        msg = f'Request to emotions webservice ' \
+              f'failed {cls.MAX_ATTEMPTS} times, latest error was {error}'
+        logger.warning(msg, exc_info=error)
+        return {'error': msg}
 
     def status(self):
         return self.request('config')
+
+
+class AsyncEmotionClassifierClient(AsyncMultiRESTClient,
+                                   EmotionClassifierClient):
+    '''
+    asyncio variant of :class:`EmotionClassifierClient`.
+    '''
+
+    async def get_emotions(self, content, content_format,
+                           emotional_categories=EmotionClassifierClient.DEFAULT_EMOTIONAL_CATEGORIES):
+        ''' see :meth:`EmotionClassifierClient.get_emotions` '''
+        parameters = {'format': content_format,
+                      'content': content,
+                      'emotional_categories': emotional_categories}
+        for _ in range(self.MAX_ATTEMPTS):
+            try:
+                return await self.request('document', parameters=parameters,
+                                          return_plain=False)
+            except Exception as e:
+                error = e
+        return self._get_error_result(error)
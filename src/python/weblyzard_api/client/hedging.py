@@ -0,0 +1,116 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Hedged requests for latency critical :class:`MultiRESTClient` calls.
+
+If a node has not answered a hedged request within a delay derived from
+a percentile of the recently observed latencies, the same request is sent
+to a second node. The first successful response wins. The number of
+extra requests is capped by a budget relative to the number of hedged
+requests.
+
+Hedging must only be used for idempotent requests, since both nodes may
+process the request.
+'''
+from bisect import insort
+from collections import deque
+from threading import Lock
+
+DEFAULT_HEDGING_PERCENTILE = 95
+DEFAULT_HEDGING_BUDGET = 0.1
+DEFAULT_INITIAL_DELAY = 1.0
+DEFAULT_MIN_DELAY = 0.01
+DEFAULT_WINDOW_SIZE = 1000
+DEFAULT_MIN_SAMPLES = 20
+
+
+class HedgedRequestError(Exception):
+    '''
+    Raised if all nodes involved in a hedged request have failed.
+
+    :param errors: a list of (client, exception) tuples
+    '''
+
+    def __init__(self, errors):
+        Exception.__init__(self, '; '.join('%s: %s' % (client.service_url, e)
+                                           for client, e in errors))
+        self.errors = errors
+
+
+class HedgingPolicy(object):
+    '''
+    Determines when and how often requests are hedged.
+
+    :param percentile: the latency percentile after which a hedge request \
+        is sent
+    :param budget: max. ratio of hedge requests to hedged requests
+    :param initial_delay: delay used until `min_samples` latencies have \
+        been observed
+    :param min_delay: lower bound for the hedging delay in seconds
+    :param window_size: number of recent latencies and requests considered
+    :param min_samples: number of latencies required for computing the \
+        percentile
+    '''
+
+    def __init__(self, percentile=DEFAULT_HEDGING_PERCENTILE,
+                 budget=DEFAULT_HEDGING_BUDGET,
+                 initial_delay=DEFAULT_INITIAL_DELAY,
+                 min_delay=DEFAULT_MIN_DELAY,
+                 window_size=DEFAULT_WINDOW_SIZE,
+                 min_samples=DEFAULT_MIN_SAMPLES):
+        if not 0 < percentile <= 100:
+            raise ValueError('percentile must be within (0, 100]')
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.window_size = window_size
+        self.min_samples = min_samples
+
+        self.requests = 0
+        self.hedges = 0
+        self._latencies = deque()
+        self._sorted_latencies = []
+        self._lock = Lock()
+
+    def record_latency(self, latency):
+        ''' records the latency of a successful request '''
+        with self._lock:
+            if len(self._latencies) >= self.window_size:
+                oldest = self._latencies.popleft()
+                del self._sorted_latencies[
+                    self._sorted_latencies.index(oldest)]
+            self._latencies.append(latency)
+            insort(self._sorted_latencies, latency)
+
+    def get_delay(self):
+        ''' :returns: the time in seconds to wait before hedging a request '''
+        with self._lock:
+            if len(self._sorted_latencies) < self.min_samples:
+                return self.initial_delay
+            index = int(round(self.percentile / 100. *
+                              (len(self._sorted_latencies) - 1)))
+            return max(self.min_delay, self._sorted_latencies[index])
+
+    def start_request(self):
+        ''' registers a new hedged request '''
+        with self._lock:
+            self.requests += 1
+            if self.requests > self.window_size:
+                # only consider recent requests for the budget
+                self.requests = (self.requests + 1) // 2
+                self.hedges = self.hedges // 2
+
+    def acquire_hedge(self):
+        ''' :returns: True if the budget allows another hedge request '''
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests + 1:
+                return False
+            self.hedges += 1
+            return True
+
+    def as_dict(self):
+        ''' :returns: a dictionary with the policy's counters '''
+        return {'requests': self.requests,
+                'hedges': self.hedges,
+                'delay': self.get_delay()}
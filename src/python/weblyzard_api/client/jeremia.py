@@ -6,13 +6,13 @@
 """
 from __future__ import unicode_literals
 
-import urllib.error
+import asyncio
 
+from functools import partial
 from future import standard_library
-from time import sleep, time
-from random import random
+from time import sleep
 
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 from weblyzard_api.model.xml_content import XMLContent
 from weblyzard_api.client import (
     WEBLYZARD_API_URL, WEBLYZARD_API_USER, WEBLYZARD_API_PASS)
@@ -80,15 +80,20 @@ class Jeremia(MultiRESTClient):
                                            'md5sum': 'id'}}
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
-                 pwd=WEBLYZARD_API_PASS, default_timeout=None):
+                 pwd=WEBLYZARD_API_PASS, default_timeout=None,
+                 admission_control=True):
         '''
         :param url: URL of the jeremia web service
         :param usr: optional user name
         :param pwd: optional password
+        :param admission_control: limit the number of concurrent requests
+            per node based on the service's back-pressure (see
+            :class:`~weblyzard_api.client.admission.AdmissionController`)
         '''
         MultiRESTClient.__init__(self, service_urls=url,
                                  default_timeout=default_timeout,
-                                 user=usr, password=pwd)
+                                 user=usr, password=pwd,
+                                 admission_control=admission_control)
 
     def submit_document(self, document, source_id:int=None,
                         wait_time=DEFAULT_WAIT_TIME,
@@ -102,22 +107,16 @@ class Jeremia(MultiRESTClient):
 
         # wait until the web service has available threads for processing
         # the request
-        attempts = 0
-        start_time = time()
-        while time() - start_time < wait_time and attempts < max_retry_attempts:
-
-            # submit the request
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
             try:
                 logger.debug('Submit_document: %s', document)
-                result = self.request(path='submit_document',
-                                      source_id=source_id,
-                                      parameters=document,
-                                      pass_through_exceptions=True)
-                return result
-            except (urllib.error.HTTPError, urllib.error.URLError) as e:
+                return self.request(path='submit_document',
+                                    source_id=source_id,
+                                    parameters=document,
+                                    pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
                 logger.warning('Submit_document failed... Sleeping before retry...')
-                sleep(max_retry_delay * random())
-                attempts = attempts + 1
+                sleep(self._get_retry_delay(e, max_retry_delay))
 
         # this access most certainly causes an exception since the
         # requests above have failed.
@@ -132,34 +131,34 @@ class Jeremia(MultiRESTClient):
         '''
         :param batch_id: batch_id to use for the given submission
         :param documents: a list of dictionaries containing the document
+
+        .. note::
+            Large document lists are split into batches whose size adapts
+            to the service's latency (see :attr:`batcher`); the results are
+            returned in the order of `documents`.
         '''
         if not documents:
             raise ValueError('Cannot process an empty document list')
 
         request = 'submit_documents/%s/%d' % (source_id,
                                               double_sentence_threshold)
-
-        # wait until the web service has available threads for processing
-        # the request
-        attempts = 0
-        start_time = time()
-        while time() - start_time < wait_time and attempts < max_retry_attempts:
-            # wait until threads are available
-            while self.has_queued_threads(source_id=source_id) and time() - start_time < wait_time:
-                sleep(max_retry_delay * random())
-
-            # submit the request
-            # - here we need to check for a 502 and 503 error in
-            #   case that has_queued_threads has not been
-            #   up to date.
+        return self.batcher.process(documents, partial(
+            self._submit_document_batch, request, source_id, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    def _submit_document_batch(self, request, source_id, wait_time,
+                               max_retry_delay, max_retry_attempts,
+                               documents):
+        ''' submits a single batch of documents '''
+        for attempts in self._retry_attempts(wait_time, max_retry_attempts):
             try:
-                result = self.request(path=request, source_id=source_id,
-                                      parameters=documents,
-                                      pass_through_exceptions=True)
-                return result
-            except (urllib.error.HTTPError, urllib.error.URLError) as e:
+                return self.request(path=request, source_id=source_id,
+                                    parameters=documents,
+                                    pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
+                delay = self._get_batch_retry_delay(e, max_retry_delay)
                 logger.warning(f'will retry (num_attempts:{attempts}) due to {e}')
-                attempts = attempts + 1
+                sleep(delay)
 
         # this access most certainly causes an exception since the
         # requests above have failed.
@@ -236,3 +235,97 @@ class Jeremia(MultiRESTClient):
         except Exception as e:
             result = True
         return result
+
+
+class AsyncJeremia(AsyncMultiRESTClient, Jeremia):
+    '''
+    asyncio variant of :class:`Jeremia`; all service methods return
+    coroutines.
+    '''
+
+    async def submit_document(self, document, source_id: int=None,
+                              wait_time=DEFAULT_WAIT_TIME,
+                              max_retry_delay=DEFAULT_MAX_RETRY_DELAY,
+                              max_retry_attempts=DEFAULT_MAX_RETRY_ATTEMPTS):
+        '''
+        processes a single document with jeremia (annotates a single document)
+
+        :param document: the document to be processed
+        '''
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
+            try:
+                logger.debug('Submit_document: %s', document)
+                return await self.request(path='submit_document',
+                                          source_id=source_id,
+                                          parameters=document,
+                                          pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
+                logger.warning('Submit_document failed... Sleeping before retry...')
+                await asyncio.sleep(self._get_retry_delay(e, max_retry_delay))
+
+        return await self.request(path='submit_document', source_id=source_id,
+                                  parameters=document)
+
+    async def submit_documents(self, documents, source_id=-1,
+                               double_sentence_threshold=10,
+                               wait_time=DEFAULT_WAIT_TIME,
+                               max_retry_delay=DEFAULT_MAX_RETRY_DELAY,
+                               max_retry_attempts=DEFAULT_MAX_RETRY_ATTEMPTS):
+        '''
+        :param batch_id: batch_id to use for the given submission
+        :param documents: a list of dictionaries containing the document
+        '''
+        if not documents:
+            raise ValueError('Cannot process an empty document list')
+
+        request = 'submit_documents/%s/%d' % (source_id,
+                                              double_sentence_threshold)
+        return await self.batcher.process_async(documents, partial(
+            self._submit_document_batch, request, source_id, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    async def _submit_document_batch(self, request, source_id, wait_time,
+                                     max_retry_delay, max_retry_attempts,
+                                     documents):
+        ''' submits a single batch of documents '''
+        for attempts in self._retry_attempts(wait_time, max_retry_attempts):
+            try:
+                return await self.request(path=request, source_id=source_id,
+                                          parameters=documents,
+                                          pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
+                delay = self._get_batch_retry_delay(e, max_retry_delay)
+                logger.warning(f'will retry (num_attempts:{attempts}) due to {e}')
+                await asyncio.sleep(delay)
+
+        return await self.request(path=request, source_id=source_id,
+                                  parameters=documents)
+
+    async def get_xml_doc(self, text, content_id='1'):
+        '''
+        Processes text and returns a XMLContent object.
+
+        :param text: the text to process
+        :param content_id: optional content id
+        '''
+        batch = [{'id': content_id,
+                  'title': '',
+                  'body': text,
+                  'format': 'text/plain'}]
+
+        results = await self.submit_documents(batch)
+        return XMLContent(results[0]['xml_content'])
+
+    async def has_queued_threads(self, source_id: int=None):
+        '''
+        :param source_id: source id
+        :returns:
+            True if Jeremia still has queued (i.e. unprocessed) threads or
+            False otherwise.
+        '''
+        try:
+            result = await self.request('has_queued_threads',
+                                        source_id=source_id)
+        except Exception as e:
+            result = True
+        return result
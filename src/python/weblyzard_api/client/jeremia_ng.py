@@ -8,12 +8,12 @@ from __future__ import unicode_literals
 from future import standard_library
 standard_library.install_aliases()
 
-import urllib.request, urllib.error, urllib.parse
+import asyncio
 
-from time import sleep, time
-from random import random
+from functools import partial
+from time import sleep
 
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 
 from weblyzard_api.model.xml_content import XMLContent
 from weblyzard_api.client import (
@@ -80,14 +80,19 @@ class JeremiaNg(MultiRESTClient):
                                            'md5sum': 'id'}}
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
-                 pwd=WEBLYZARD_API_PASS, default_timeout=None):
+                 pwd=WEBLYZARD_API_PASS, default_timeout=None,
+                 admission_control=True):
         """
         :param url: URL of the jeremia web service
         :param usr: optional user name
         :param pwd: optional password
+        :param admission_control: limit the number of concurrent requests
+            per node based on the service's back-pressure (see
+            :class:`~weblyzard_api.client.admission.AdmissionController`)
         """
         MultiRESTClient.__init__(self, service_urls=url, user=usr, password=pwd,
-                                 default_timeout=default_timeout)
+                                 default_timeout=default_timeout,
+                                 admission_control=admission_control)
 
     def submit_document(self, document):
         """ Process a single document with jeremia (annotates a single document)
@@ -108,30 +113,30 @@ class JeremiaNg(MultiRESTClient):
         :param wait_time:
         :param max_retry_delay:
         :param max_retry_attempts:
+
+        .. note::
+            Large document lists are split into batches whose size adapts
+            to the service's latency (see :attr:`batcher`); the results are
+            returned in the order of `documents`.
         """
         if not documents:
             raise ValueError('Cannot process an empty document list')
 
         request = 'submit_documents/%s/%d' % (source_id,
                                               double_sentence_threshold)
-
-        # wait until the web service has available threads for processing
-        # the request
-        attempts = 0
-        start_time = time()
-        while time() - start_time < wait_time and attempts < max_retry_attempts:
-
-            # submit the request
-            # - here we need to check for a 502 and 503 error in
-            #   case that has_queued_threads has not been
-            #   up to date.
+        return self.batcher.process(documents, partial(
+            self._submit_document_batch, request, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    def _submit_document_batch(self, request, wait_time, max_retry_delay,
+                               max_retry_attempts, documents):
+        """ submits a single batch of documents """
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
             try:
-                result = self.request(request, documents,
-                                      pass_through_exceptions=True)
-                return result
-            except (urllib.error.HTTPError, urllib.error.URLError) as e:
-                sleep(max_retry_delay * random())
-                attempts = attempts + 1
+                return self.request(request, documents,
+                                    pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
+                sleep(self._get_batch_retry_delay(e, max_retry_delay))
 
         # this access most certainly causes an exception since the
         # requests above have failed.
@@ -203,3 +208,68 @@ class JeremiaNg(MultiRESTClient):
         except Exception as e:
             result = True
         return result
+
+
+class AsyncJeremiaNg(AsyncMultiRESTClient, JeremiaNg):
+    """
+    asyncio variant of :class:`JeremiaNg`; all service methods return
+    coroutines.
+    """
+
+    async def submit_documents(self, documents, source_id=-1,
+                               double_sentence_threshold=10,
+                               wait_time=DEFAULT_WAIT_TIME,
+                               max_retry_delay=DEFAULT_MAX_RETRY_DELAY,
+                               max_retry_attempts=DEFAULT_MAX_RETRY_ATTEMPTS):
+        """ Batch submit documents to the Jeremia Web Service. Supports retry
+        with backoff mechanism (see :meth:`JeremiaNg.submit_documents`).
+        """
+        if not documents:
+            raise ValueError('Cannot process an empty document list')
+
+        request = 'submit_documents/%s/%d' % (source_id,
+                                              double_sentence_threshold)
+        return await self.batcher.process_async(documents, partial(
+            self._submit_document_batch, request, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    async def _submit_document_batch(self, request, wait_time,
+                                     max_retry_delay, max_retry_attempts,
+                                     documents):
+        """ submits a single batch of documents """
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
+            try:
+                return await self.request(request, documents,
+                                          pass_through_exceptions=True)
+            except self.RETRYABLE_ERRORS as e:
+                await asyncio.sleep(
+                    self._get_batch_retry_delay(e, max_retry_delay))
+
+        return await self.request(request, documents)
+
+    async def get_xml_doc(self, text, content_id='1'):
+        """
+        Processes text and returns a XMLContent object.
+
+        :param text: the text to process
+        :param content_id: optional content id
+        """
+        batch = [{'id': content_id,
+                  'title': '',
+                  'body': text,
+                  'format': 'text/plain'}]
+
+        results = await self.submit_documents(batch)
+        return XMLContent(results[0]['xml_content'])
+
+    async def has_queued_threads(self):
+        """
+        :returns:
+            True if Jeremia still has queued (i.e. unprocessed) threads or
+            False otherwise.
+        """
+        try:
+            result = await self.request('has_queued_threads')
+        except Exception as e:
+            result = True
+        return result
@@ -7,10 +7,14 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from weblyzard_api.client import MultiRESTClient
+import logging
+
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 from weblyzard_api.client import (
     WEBLYZARD_API_URL, WEBLYZARD_API_USER, WEBLYZARD_API_PASS)
 
+logger = logging.getLogger(__name__)
+
 
 class JesajaNg(MultiRESTClient):
     '''
@@ -22,17 +26,21 @@ class JesajaNg(MultiRESTClient):
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
                  pwd=WEBLYZARD_API_PASS, default_timeout=None,
-                 use_random_server=True):
+                 use_random_server=True, hedging_policy=None):
         '''
         :param url: URL of the jeremia web service
         :param usr: optional user name
         :param pwd: optional password
+        :param hedging_policy: an optional \
+            :class:`~weblyzard_api.client.hedging.HedgingPolicy` for hedging \
+            :meth:`get_keyword_annotations` requests which do not add ngrams
         '''
         # url = 'localhost
         # url = 'localhost:63002'
         MultiRESTClient.__init__(self, service_urls=url, user=usr, password=pwd,
                                  default_timeout=default_timeout,
-                                 use_random_server=use_random_server)
+                                 use_random_server=use_random_server,
+                                 hedging_policy=hedging_policy)
 
     def set_keyword_profile(self, profile_name, keyword_calculation_profile):
         ''' Add a keyword profile to the server
@@ -109,6 +117,15 @@ class JesajaNg(MultiRESTClient):
             raise Exception(
                 'Cannot compute keywords - unknown profile_name {}'.format(profile_name))
 
+        # requests which add ngrams to the reference corpus are not
+        # idempotent and, therefore, must not be hedged
+        return self.request(self._get_keyword_annotations_endpoint(
+            profile_name, num_keywords, add_ngrams), documents,
+            hedge=not add_ngrams)
+
+    @staticmethod
+    def _get_keyword_annotations_endpoint(profile_name, num_keywords,
+                                          add_ngrams):
         endpoint = f'get_nek_annotations/{profile_name}'
         if num_keywords is not None and int(num_keywords) > 0:
             endpoint = f'{endpoint}?num_keywords={num_keywords}'
@@ -117,8 +134,7 @@ class JesajaNg(MultiRESTClient):
             if '?' in endpoint:
                 separator = '&'
             endpoint = f'{endpoint}{separator}add_ngrams=false'
-
-        return self.request(endpoint, documents)
+        return endpoint
 
     def get_keywords(self, profile_name, documents):
         '''
@@ -130,7 +146,9 @@ class JesajaNg(MultiRESTClient):
         if not self.has_profile(profile_name):
             raise Exception(
                 'Cannot compute keywords - unknown profile_name {}'.format(profile_name))
-        return self.request('get_keywords/{}'.format(profile_name), documents)
+        # large document lists are submitted in adaptive batches
+        return self.batcher.process(documents, lambda batch: self.request(
+            'get_keywords/{}'.format(profile_name), batch))
 
     def has_profile(self, profile_name):
         return profile_name in self.list_profiles()
@@ -200,3 +218,59 @@ class JesajaNg(MultiRESTClient):
             return self.request('rotate_shard')
         else:
             return self.request('rotate_shard/{}'.format(profile_name))
+
+
+
+class AsyncJesajaNg(AsyncMultiRESTClient, JesajaNg):
+    '''
+    asyncio variant of :class:`JesajaNg`; all service methods return
+    coroutines.
+    '''
+
+    async def get_keyword_annotations(self, profile_name, documents,
+                                      num_keywords: int=None, add_ngrams=True):
+        ''' see :meth:`JesajaNg.get_keyword_annotations` '''
+        if not await self.has_profile(profile_name):
+            raise Exception(
+                'Cannot compute keywords - unknown profile_name {}'.format(profile_name))
+        return await self.request(self._get_keyword_annotations_endpoint(
+            profile_name, num_keywords, add_ngrams), documents,
+            hedge=not add_ngrams)
+
+    async def get_keywords(self, profile_name, documents):
+        ''' see :meth:`JesajaNg.get_keywords` '''
+        if not await self.has_profile(profile_name):
+            raise Exception(
+                'Cannot compute keywords - unknown profile_name {}'.format(profile_name))
+        return await self.batcher.process_async(
+            documents, lambda batch: self.request(
+                'get_keywords/{}'.format(profile_name), batch))
+
+    async def has_profile(self, profile_name):
+        return profile_name in await self.list_profiles()
+
+    async def has_corpus(self, profile_name):
+        available_completed_shards = await self.request(
+            'list_shards/complete/{}'.format(profile_name))
+        return len(available_completed_shards[profile_name]) > 0
+
+    async def remove_matview_profile(self, profile_name):
+        if not await self.has_profile(profile_name):
+            logger.warning('No profile %s found', profile_name)
+            return
+        return await self.request('remove_profile/{}'.format(profile_name),
+                                  return_plain=True)
+
+    async def get_corpus_size(self, profile_name):
+        available_completed_shards = await self.request(
+            'list_shards/complete/{}'.format(profile_name))
+        total = 0
+        for shard in available_completed_shards[profile_name]:
+            total = total + shard['wordCount']
+        return total
+
+    async def rotate_shard(self, profile_name=None):
+        ''' see :meth:`JesajaNg.rotate_shard` '''
+        if not profile_name:
+            return await self.request('rotate_shard')
+        return await self.request('rotate_shard/{}'.format(profile_name))
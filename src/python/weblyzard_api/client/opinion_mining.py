@@ -6,7 +6,7 @@ Created on 15.12.2014
 '''
 import logging
 
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 from weblyzard_api.client import (
     WEBLYZARD_API_URL, WEBLYZARD_API_USER, WEBLYZARD_API_PASS)
 
@@ -18,6 +18,8 @@ logger = logging.getLogger(__name__)
 
 class OpinionClient(MultiRESTClient):
     URL_PATH = '/'.join(SERVER_URL_PATH.split('/')[:-1])
+    # number of attempts of a request before an error result is returned
+    MAX_ATTEMPTS = 2
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
                  pwd=WEBLYZARD_API_PASS, default_timeout=None):
@@ -45,35 +47,64 @@ class OpinionClient(MultiRESTClient):
             ocurred, it is also contained in the dict with the 'error' key.
         :rtype: dict
         '''
-        result = None
-        retrycount = 1
-        retries = 0
-        while retries <= retrycount:
-            retries += 1
+        parameters = self._get_polarity_parameters(
+            content, content_format, annotations, allow_unsupported,
+            ignored_entity_regexp, extra_categories, textblob_method,
+            textblob_threshold)
+        for _ in range(self.MAX_ATTEMPTS):
             try:
-                result = self.request(
-                    'document',
-                    parameters={'format': content_format,
-                                'content': content,
-                                'annotations': annotations,
-                                'allow_unsupported': allow_unsupported,
-                                'ignored_entity_regexp': ignored_entity_regexp,
-                                'extra_categories': extra_categories,
-                                'use_textblob': textblob_method,
-                                'textblob_threshold': textblob_threshold},
-                    return_plain=False
-                )
-                break
+                return self.request('document', parameters=parameters,
+                                    return_plain=False)
             except Exception as e:
-                if retries <= retrycount:
-                    pass  # silently retry
-                else:
-                    msg = f'Request to sentiment webservice ' \
-                          f'failed {retries} times, latest error was {e}'
-                    logger.warning(msg, exc_info=True)
-                    result = {
-                        'error': msg}
-        return result
+                error = e
+        return self._get_error_result(error)
+
+    @staticmethod
+    def _get_polarity_parameters(content, content_format, annotations,
+                                 allow_unsupported, ignored_entity_regexp,
+                                 extra_categories, textblob_method,
+                                 textblob_threshold):
+        ''' :returns: the parameters of a `get_polarity` request '''
+        return {'format': content_format,
+                'content': content,
+                'annotations': annotations,
+                'allow_unsupported': allow_unsupported,
+                'ignored_entity_regexp': ignored_entity_regexp,
+                'extra_categories': extra_categories,
+                'use_textblob': textblob_method,
+                'textblob_threshold': textblob_threshold}
+
+    @classmethod
+    def _get_error_result(cls, error):
+        ''' :returns: the result of a request which has failed \
+            `MAX_ATTEMPTS` times with `error` as latest error '''
+        msg = f'Request to sentiment webservice ' \
+              f'failed {cls.MAX_ATTEMPTS} times, latest error was {error}'
+        logger.warning(msg, exc_info=error)
+        return {'error': msg}
 
     def status(self):
         return self.request('config')
+
+
+class AsyncOpinionClient(AsyncMultiRESTClient, OpinionClient):
+    '''
+    asyncio variant of :class:`OpinionClient`.
+    '''
+
+    async def get_polarity(self, content, content_format, annotations=None,
+                           allow_unsupported=False, ignored_entity_regexp=None,
+                           extra_categories=None, textblob_method=0,
+                           textblob_threshold=None):
+        ''' see :meth:`OpinionClient.get_polarity` '''
+        parameters = self._get_polarity_parameters(
+            content, content_format, annotations, allow_unsupported,
+            ignored_entity_regexp, extra_categories, textblob_method,
+            textblob_threshold)
+        for _ in range(self.MAX_ATTEMPTS):
+            try:
+                return await self.request('document', parameters=parameters,
+                                          return_plain=False)
+            except Exception as e:
+                error = e
+        return self._get_error_result(error)
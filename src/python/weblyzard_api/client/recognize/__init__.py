@@ -6,7 +6,7 @@
 from __future__ import unicode_literals
 
 from weblyzard_api.util.http import Retrieve
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 
 from weblyzard_api.model.xml_content import XMLContent
 from weblyzard_api.client import (WEBLYZARD_API_URL, WEBLYZARD_API_USER,
@@ -67,14 +67,19 @@ class Recognize(MultiRESTClient):
                                            'value': 'value'}}
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
-                 pwd=WEBLYZARD_API_PASS, default_timeout=None):
+                 pwd=WEBLYZARD_API_PASS, default_timeout=None,
+                 hedging_policy=None):
         '''
         :param url: URL of the jeremia web service
         :param usr: optional user name
         :param pwd: optional password
+        :param hedging_policy: an optional \
+            :class:`~weblyzard_api.client.hedging.HedgingPolicy` for hedging \
+            :meth:`search_text` requests
         '''
         MultiRESTClient.__init__(self, service_urls=url, user=usr, password=pwd,
-                                 default_timeout=default_timeout)
+                                 default_timeout=default_timeout,
+                                 hedging_policy=hedging_policy)
         self.profile_cache = []
 
     @classmethod
@@ -190,7 +195,8 @@ class Recognize(MultiRESTClient):
                                               'buckets': buckets,
                                               'limit': limit,
                                               'wt': output_format,
-                                              'debug': debug})
+                                              'debug': debug},
+                            hedge=True)
 
     def search_document(self, profile_names, document, debug=False,
                         max_entities=1, buckets=1, limit=1,
@@ -289,6 +295,41 @@ class Recognize(MultiRESTClient):
         if isinstance(profile_names, str):
             profile_names = (profile_names,)
 
+        # add required profiles
+        for profile_name in self._get_required_profiles(profile_names,
+                                                        doc_list):
+            self.add_profile(profile_name)
+
+        content_type = 'application/json'
+        if len(doc_list) and isinstance(doc_list[0], str):
+            content_type = 'application/xml'
+
+#         if 'content_id' in doc_list[0]:
+#             search_command = 'searchDocuments'
+
+        if 'id' in doc_list[0]:
+            search_command = 'searchXmlDocuments'
+        else:
+            raise ValueError("Unsupported input format.")
+
+        # large document lists are submitted in adaptive batches
+        query_parameters = {'profileNames': profile_names,
+                            'rescore': max_entities,
+                            'buckets': buckets,
+                            'limit': limit,
+                            'wt': output_format,
+                            'debug': debug}
+        return self.batcher.process(
+            doc_list, lambda batch: self.request(
+                path=search_command,
+                parameters=batch,
+                content_type=content_type,
+                query_parameters=query_parameters))
+
+    @staticmethod
+    def _get_required_profiles(profile_names, doc_list):
+        ''' :returns: the set of profiles required for processing the \
+                given documents '''
         profiles_to_add = []
         for profile_name in profile_names:
             for lang in SUPPORTED_LANGS:
@@ -313,33 +354,7 @@ class Recognize(MultiRESTClient):
             else:
                 for profile_name in profile_names:
                     profiles_to_add.append(profile_name)
-
-        # add required profiles
-        for profile_name in set(profiles_to_add):
-            self.add_profile(profile_name)
-
-        content_type = 'application/json'
-        if len(doc_list) and isinstance(doc_list[0], str):
-            content_type = 'application/xml'
-
-#         if 'content_id' in doc_list[0]:
-#             search_command = 'searchDocuments'
-
-        if 'id' in doc_list[0]:
-            search_command = 'searchXmlDocuments'
-        else:
-            raise ValueError("Unsupported input format.")
-
-        return self.request(path=search_command,
-                            parameters=doc_list,
-                            content_type=content_type,
-                            query_parameters={
-                                'profileNames': profile_names,
-                                'rescore': max_entities,
-                                'buckets': buckets,
-                                'limit': limit,
-                                'wt': output_format,
-                                'debug': debug})
+        return set(profiles_to_add)
 
     def get_focus(self, profile_names, doc_list, max_results=1):
         '''
@@ -383,3 +398,166 @@ class Recognize(MultiRESTClient):
         :returns: the version of the Recognize web service.
         '''
         return self.request(path='version', return_plain=True)
+
+
+class AsyncRecognize(AsyncMultiRESTClient, Recognize):
+    '''
+    asyncio variant of :class:`Recognize`; all service methods return
+    coroutines.
+    '''
+
+    async def add_profile(self, profile_name, force=False):
+        ''' pre-loads the given profile
+
+        ::param profile_name: name of the profile to load.
+        '''
+        if profile_name.startswith(INTERNAL_PROFILE_PREFIX):
+            return
+
+        profile_exists = profile_name in self.profile_cache and not force
+        if not profile_exists:
+            profile_exists = profile_name in await self.list_profiles() \
+                and not force
+
+        if profile_exists and not profile_name in self.profile_cache:
+            self.profile_cache.append(profile_name)
+
+        if not profile_exists:
+            self.profile_cache.append(profile_name)  # only try to add once
+            return await self.request('add_profile/%s' % profile_name)
+
+    async def extract_geo_location(self, text, language='en'):
+        ''' convenience method to extract a GEO location from free text '''
+        profile_names = ['%s.geo.500000.ng' % language]
+        for profile_name in profile_names:
+            await self.add_profile(profile_name)
+        return await self.request(path='search',
+                                  parameters=text,
+                                  query_parameters={'profileNames': profile_names,
+                                                    'rescore': 1,
+                                                    'buckets': 1,
+                                                    'limit': 1,
+                                                    'wt': 'compact',
+                                                    'debug': False})
+
+    async def search_text(self, profile_names, text, debug=False,
+                          max_entities=1, buckets=1, limit=1,
+                          output_format='minimal'):
+        '''
+        Search text for entities specified in the given profiles
+        (see :meth:`Recognize.search_text`).
+        '''
+        assert output_format in self.OUTPUT_FORMATS
+        if isinstance(profile_names, str):
+            profile_names = (profile_names,)
+
+        for profile_name in profile_names:
+            await self.add_profile(profile_name)
+
+        return await self.request(path='search',
+                                  parameters=text,
+                                  query_parameters={'profileNames': profile_names,
+                                                    'rescore': max_entities,
+                                                    'buckets': buckets,
+                                                    'limit': limit,
+                                                    'wt': output_format,
+                                                    'debug': debug},
+                                  hedge=True)
+
+    async def search_document(self, profile_names, document, debug=False,
+                              max_entities=1, buckets=1, limit=1,
+                              output_format='minimal'):
+        '''
+        Search a single document (see :meth:`Recognize.search_document`).
+        '''
+        assert output_format in self.OUTPUT_FORMATS
+        if not document:
+            return
+        if isinstance(profile_names, str):
+            profile_names = [profile_names, ]
+
+        for profile_name in list(profile_names):
+            try:
+                await self.add_profile(profile_name)
+            except Exception:
+                profile_names.remove(profile_name)
+                msg = 'Could not load profile %s, skipping' % profile_name
+                logger.warning(msg)
+
+        if 'content_id' in document:
+            search_command = 'search'
+        elif 'id' in document:
+            search_command = 'searchXml'
+        else:
+            raise ValueError("Unsupported input format.")
+
+        return await self.request(path=search_command,
+                                  parameters=document,
+                                  content_type='application/json',
+                                  query_parameters={'profileNames': profile_names,
+                                                    'rescore': max_entities,
+                                                    'buckets': buckets,
+                                                    'limit': limit,
+                                                    'wt': output_format,
+                                                    'debug': debug})
+
+    async def search_documents(self, profile_names, doc_list, debug=False,
+                               max_entities=1, buckets=1, limit=1,
+                               output_format='compact'):
+        '''
+        Search a list of documents (see :meth:`Recognize.search_documents`).
+        '''
+        assert output_format in self.OUTPUT_FORMATS
+        if not doc_list or len(doc_list) == 0:
+            return
+        if isinstance(profile_names, str):
+            profile_names = (profile_names,)
+
+        for profile_name in self._get_required_profiles(profile_names,
+                                                        doc_list):
+            await self.add_profile(profile_name)
+
+        content_type = 'application/json'
+        if len(doc_list) and isinstance(doc_list[0], str):
+            content_type = 'application/xml'
+
+        if 'id' in doc_list[0]:
+            search_command = 'searchXmlDocuments'
+        else:
+            raise ValueError("Unsupported input format.")
+
+        query_parameters = {'profileNames': profile_names,
+                            'rescore': max_entities,
+                            'buckets': buckets,
+                            'limit': limit,
+                            'wt': output_format,
+                            'debug': debug}
+        return await self.batcher.process_async(
+            doc_list, lambda batch: self.request(
+                path=search_command,
+                parameters=batch,
+                content_type=content_type,
+                query_parameters=query_parameters))
+
+    async def get_focus(self, profile_names, doc_list, max_results=1):
+        '''
+        :returns: the focus and annotation of the given document
+            (see :meth:`Recognize.get_focus`)
+        '''
+        if isinstance(profile_names, str):
+            profile_names = (profile_names,)
+
+        if not doc_list:
+            return
+        elif 'id' not in doc_list[0]:
+            raise ValueError('Unsupported input format.')
+
+        for profile_name in profile_names:
+            await self.add_profile(profile_name)
+
+        return await self.request(path='focusDocuments',
+                                  parameters=doc_list,
+                                  query_parameters={'profiles': profile_names,
+                                                    'rescore': max_results,
+                                                    'buckets': max_results,
+                                                    'limit': max_results})
@@ -5,12 +5,12 @@
 """
 from __future__ import unicode_literals
 
-import urllib.error
+import asyncio
 
-from time import sleep, time
-from random import random
+from functools import partial
+from time import sleep
 
-from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
 from weblyzard_api.client import (WEBLYZARD_API_URL, WEBLYZARD_API_USER,
                                   WEBLYZARD_API_PASS)
 
@@ -52,14 +52,19 @@ class Recognize(MultiRESTClient):
                                            'dependency': 'dependency'}}
 
     def __init__(self, url=WEBLYZARD_API_URL, usr=WEBLYZARD_API_USER,
-                 pwd=WEBLYZARD_API_PASS, default_timeout=None):
+                 pwd=WEBLYZARD_API_PASS, default_timeout=None,
+                 admission_control=True):
         """
         :param url: URL of the jeremia web service
         :param usr: optional user name
         :param pwd: optional password
+        :param admission_control: limit the number of concurrent requests
+            per node based on the service's back-pressure (see
+            :class:`~weblyzard_api.client.admission.AdmissionController`)
         """
         MultiRESTClient.__init__(self, service_urls=url, user=usr, password=pwd,
-                                 default_timeout=default_timeout)
+                                 default_timeout=default_timeout,
+                                 admission_control=admission_control)
         self.profile_cache = []
 
     def status(self):
@@ -189,38 +194,101 @@ class Recognize(MultiRESTClient):
         :param document_list: a list of documents to search in
         :param limit: maximum number of results to return
         :rtype: the tagged text
+
+        .. note::
+            Large document lists are split into batches whose size adapts
+            to the service's latency (see :attr:`batcher`); the results are
+            returned in the order of `document_list`.
         """
         if not document_list:
             return
 
-        content_type = 'application/json'
-        search_command = 'search_documents'
-
-        # wait until the web service has available threads for processing
-        # the request
-        attempts = 0
-        start_time = time()
-        while time() - start_time < wait_time and attempts < max_retry_attempts:
-
-            # submit the request
-            # - here we need to check for a 502 and 503 error in
-            #   case that has_queued_threads has not been
-            #   up to date.
+        return self.batcher.process(document_list, partial(
+            self._search_document_batch, profile_name, limit, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    def _search_document_batch(self, profile_name, limit, wait_time,
+                               max_retry_delay, max_retry_attempts,
+                               document_list):
+        """ searches a single batch of documents """
+        parameters = self._get_search_parameters(profile_name, limit,
+                                                 document_list)
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
             try:
-                result = self.request(path=search_command,
-                            parameters=document_list,
-                            content_type=content_type,
-                            query_parameters={'profileName': profile_name,
-                                              'limit': limit
-                                              })
-                return result
-            except (urllib.error.HTTPError, urllib.error.URLError) as e:
-                sleep(max_retry_delay * random())
-                attempts = attempts + 1
+                return self.request(pass_through_exceptions=True,
+                                    **parameters)
+            except self.RETRYABLE_ERRORS as e:
+                sleep(self._get_batch_retry_delay(e, max_retry_delay))
 
-        return self.request(path=search_command,
-                            parameters=document_list,
-                            content_type=content_type,
-                            query_parameters={'profileName': profile_name,
-                                              'limit': limit
-                                              })
+        return self.request(**parameters)
+
+    @staticmethod
+    def _get_search_parameters(profile_name, limit, document_list):
+        """ :returns: the request arguments for searching a batch """
+        return dict(path='search_documents',
+                    parameters=document_list,
+                    content_type='application/json',
+                    query_parameters={'profileName': profile_name,
+                                      'limit': limit})
+
+
+class AsyncRecognize(AsyncMultiRESTClient, Recognize):
+    """
+    asyncio variant of the RecognizeNg client; all service methods return
+    coroutines.
+    """
+
+    async def load_profile(self, profile_name):
+        """ Load a given profile.
+        :param profile_name: name of the profile to load.
+        """
+        if profile_name in self.profile_cache:
+            return
+
+        self.profile_cache.append(profile_name)  # only try to add once
+        return await self.request(path='load_profile/{}'.format(profile_name))
+
+    async def search_document(self, profile_name, document, limit=0):
+        """ see :meth:`Recognize.search_document` """
+        if not document:
+            return
+        return await Recognize.search_document(self, profile_name, document,
+                                               limit)
+
+    async def search_xmldocument(self, profile_name, document, limit):
+        """ see :meth:`Recognize.search_xmldocument` """
+        if not document:
+            return
+        return await Recognize.search_xmldocument(self, profile_name,
+                                                  document, limit)
+
+    async def search_documents(self, profile_name, document_list, limit,
+                               wait_time=DEFAULT_WAIT_TIME,
+                               max_retry_delay=DEFAULT_MAX_RETRY_DELAY,
+                               max_retry_attempts=DEFAULT_MAX_RETRY_ATTEMPTS):
+        """
+        Search the given document for entities specified in the given profiles
+        (see :meth:`Recognize.search_documents`).
+        """
+        if not document_list:
+            return
+
+        return await self.batcher.process_async(document_list, partial(
+            self._search_document_batch, profile_name, limit, wait_time,
+            max_retry_delay, max_retry_attempts))
+
+    async def _search_document_batch(self, profile_name, limit, wait_time,
+                                     max_retry_delay, max_retry_attempts,
+                                     document_list):
+        """ searches a single batch of documents """
+        parameters = self._get_search_parameters(profile_name, limit,
+                                                 document_list)
+        for _ in self._retry_attempts(wait_time, max_retry_attempts):
+            try:
+                return await self.request(pass_through_exceptions=True,
+                                          **parameters)
+            except self.RETRYABLE_ERRORS as e:
+                await asyncio.sleep(
+                    self._get_batch_retry_delay(e, max_retry_delay))
+
+        return await self.request(**parameters)
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Serialization and compression of request bodies.
+
+A :class:`Serializer` encodes the request parameters (e.g. as JSON or
+MessagePack); an optional compression ('gzip' or 'zstd') is applied to
+the encoded body and announced using the `Content-Encoding` header.
+
+Both are negotiated per :class:`~weblyzard_api.client.RESTClient`: if a
+service rejects a request with `415 Unsupported Media Type` (or `400 Bad
+Request` for compressed bodies), the client falls back to uncompressed
+JSON and resubmits the request.
+
+.. note::
+    MessagePack and zstd require the optional `msgpack` and `zstandard`
+    packages.
+'''
+import gzip
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from weblyzard_api.util import json_codec
+
+# request bodies smaller than this number of bytes are not compressed
+DEFAULT_MIN_COMPRESSION_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+
+
+class Serializer(object):
+    ''' Encodes request parameters and decodes responses. '''
+    name = None
+    content_type = None
+    # content types of responses which are decoded by this serializer
+    response_content_types = ()
+
+    def dumps(self, obj):
+        ''' :returns: the encoded object as bytes '''
+        raise NotImplementedError
+
+    def loads(self, data):
+        ''' :returns: the decoded object '''
+        raise NotImplementedError
+
+
+class JSONSerializer(Serializer):
+    '''
+    Encodes requests as UTF-8 JSON.
+
+    :param dumps: optional function used for encoding objects, which \
+        returns str or bytes (default: :func:`json_codec.dumpb`)
+    :param loads: optional function used for decoding responses \
+        (default: :func:`json_codec.loads`)
+    '''
+    name = 'json'
+    content_type = 'application/json'
+    response_content_types = ('application/json', )
+
+    def __init__(self, dumps=None, loads=None):
+        self._dumps = dumps or json_codec.dumpb
+        self._loads = loads or json_codec.loads
+
+    def dumps(self, obj):
+        data = self._dumps(obj)
+        return data.encode('utf-8') if isinstance(data, str) else data
+
+    def loads(self, data):
+        return self._loads(data)
+
+
+class MsgPackSerializer(Serializer):
+    ''' Encodes requests using MessagePack (requires `msgpack`). '''
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+    response_content_types = ('application/msgpack', 'application/x-msgpack')
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError('MessagePack serialization requires the '
+                              'msgpack package.')
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+
+SERIALIZERS = {'json': JSONSerializer,
+               'msgpack': MsgPackSerializer}
+
+
+def get_serializer(serializer=None):
+    '''
+    :param serializer: a :class:`Serializer`, the name of one of the \
+        `SERIALIZERS` or None for the default JSON serializer
+    :returns: the corresponding :class:`Serializer` instance
+    '''
+    if serializer is None:
+        return JSONSerializer()
+    if isinstance(serializer, Serializer):
+        return serializer
+    if serializer not in SERIALIZERS:
+        raise ValueError('Unknown serializer %s (supported: %s)' % (
+            serializer, ', '.join(sorted(SERIALIZERS))))
+    return SERIALIZERS[serializer]()
+
+
+def gzip_compress(data):
+    return gzip.compress(data, compresslevel=DEFAULT_GZIP_LEVEL)
+
+
+def zstd_compress(data):
+    return zstandard.ZstdCompressor(level=DEFAULT_ZSTD_LEVEL).compress(data)
+
+
+COMPRESSORS = {'gzip': gzip_compress,
+               'zstd': zstd_compress}
+
+
+def check_compression(compression):
+    '''
+    :param compression: None, 'gzip' or 'zstd'
+    :returns: the given compression, if it is supported
+    '''
+    if compression is None:
+        return None
+    if compression not in COMPRESSORS:
+        raise ValueError('Unknown compression %s (supported: %s)' % (
+            compression, ', '.join(sorted(COMPRESSORS))))
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError('zstd compression requires the zstandard package.')
+    return compression
+
+
+def compress(data, compression):
+    ''' :returns: the data compressed with the given compression '''
+    return COMPRESSORS[compression](data)
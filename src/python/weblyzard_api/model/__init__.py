@@ -14,18 +14,82 @@ import json
 import hashlib
 import logging
 
+from array import array
 from collections import namedtuple
+from functools import lru_cache
+from itertools import chain
 
 from weblyzard_api.model.parsers.xml_2005 import XML2005
 from weblyzard_api.model.parsers.xml_2013 import XML2013
 from weblyzard_api.model.parsers.xml_deprecated import XMLDeprecated
+from weblyzard_api.util import json_codec
 
 LabeledDependency = namedtuple("LabeledDependency", "parent pos label")
 
 logger = logging.getLogger(__name__)
 
 
-class CharSpan(object):
+@lru_cache(maxsize=None)
+def get_slot_names(cls):
+    '''
+    :returns: the names of all slots of the given class (base classes \
+        first); private slots (e.g. caches) are not part of the model's \
+        attributes and therefore omitted
+    '''
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots, )
+        names.extend(name for name in slots if not name.startswith('_'))
+    return tuple(names)
+
+
+def get_attributes(obj):
+    '''
+    :returns: a list of the object's (name, value) attribute tuples in the \
+        order of their assignment in the constructor; supports objects \
+        with __slots__ and __dict__
+    '''
+    result = []
+    for name in get_slot_names(obj.__class__):
+        try:
+            result.append((name, getattr(obj, name)))
+        except AttributeError:
+            # unset slot
+            continue
+    instance_dict = getattr(obj, '__dict__', None)
+    if instance_dict:
+        result.extend(instance_dict.items())
+    return result
+
+
+class SlottedModel(object):
+    '''
+    Base class of the compact model classes, which store their attributes
+    in __slots__ rather than in a per-instance __dict__.
+
+    The slots need to be declared in the order in which the constructor
+    assigns the attributes, since this order determines the order of the
+    serialized attributes (see :func:`get_attributes`).
+    '''
+    __slots__ = ()
+
+    def __getstate__(self):
+        return dict(get_attributes(self))
+
+    def __setstate__(self, state):
+        # supports the (dict, slots) state of the default pickle protocol
+        # as well as pickles of the former __dict__ based classes
+        if isinstance(state, tuple):
+            state = dict(chain(*(part.items() for part in state if part)))
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class CharSpan(SlottedModel):
+
+    __slots__ = ('span_type', 'start', 'end')
 
     SPAN_TYPE = 'CharSpan'
 
@@ -75,6 +139,8 @@ class CharSpan(object):
 
 class TokenCharSpan(CharSpan):
 
+    __slots__ = ('pos', 'dependency')
+
     SPAN_TYPE = 'TokenCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -106,6 +172,8 @@ class TokenCharSpan(CharSpan):
 
 class SentenceCharSpan(CharSpan):
 
+    __slots__ = ('md5sum', 'sem_orient', 'significance', 'emotions')
+
     SPAN_TYPE = 'SentenceCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -139,6 +207,8 @@ class SentenceCharSpan(CharSpan):
 
 class MultiplierCharSpan(CharSpan):
 
+    __slots__ = ('value', )
+
     SPAN_TYPE = 'MultiplierCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -155,6 +225,8 @@ class MultiplierCharSpan(CharSpan):
 
 class SentimentCharSpan(CharSpan):
 
+    __slots__ = ('value', 'modality')
+
     SPAN_TYPE = 'SentimentCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -172,6 +244,8 @@ class SentimentCharSpan(CharSpan):
 
 class NerCharSpan(CharSpan):
 
+    __slots__ = ('label', )
+
     SPAN_TYPE = 'NamedEntityCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -188,6 +262,8 @@ class NerCharSpan(CharSpan):
 
 class LayoutCharSpan(CharSpan):
 
+    __slots__ = ('layout', 'title', 'level')
+
     SPAN_TYPE = 'LayoutCharSpan'
 
     DICT_MAPPING = {'@type': 'span_type',
@@ -268,7 +344,11 @@ class SpanFactory(object):
 #         raise Exception('Invalid Span Type: {}'.format(span['span_type']))
 
 
-class Annotation(object):
+class Annotation(SlottedModel):
+
+    __slots__ = ('annotation_type', 'surfaceForm', 'start', 'end', 'key',
+                 'sentence', 'md5sum', 'sem_orient', 'preferredName',
+                 'confidence')
 
     def __init__(self, annotation_type=None, start=None, end=None, key=None,
                  sentence=None, surfaceForm=None, md5sum=None, sem_orient=None,
@@ -285,7 +365,7 @@ class Annotation(object):
         self.confidence = confidence
 
 
-class Sentence(object):
+class Sentence(SlottedModel):
     '''
     The sentence class used for accessing single sentences.
 
@@ -296,7 +376,16 @@ class Sentence(object):
         * s.sentence: sentence text
         * s.tokens  : provides a list of tokens (e.g. ['A', 'new', 'day'])
         * s.pos_tags: provides a list of pos tags (e.g. ['DET', 'CC', 'NN'])
+
+        The parsed POS tags, token offsets and dependencies are cached
+        together with the strings they have been parsed from, i.e. the
+        caches are invalidated by assigning new `pos`, `token`, `value` or
+        `dependency` strings.
     '''
+    __slots__ = ('md5sum', 'pos', 'sem_orient', 'significance', 'token',
+                 'value', 'is_title', 'dependency', 'emotions',
+                 '_pos_cache', '_token_cache', '_dependency_cache')
+
     # :  Maps the keys of the attributes to the corresponding key for the API JSON
     API_MAPPINGS = {
         1.0: {
@@ -349,7 +438,7 @@ class Sentence(object):
         '''
         :returns: a dictionary representation of the sentence object.
         '''
-        return dict((k, v) for k, v in self.__dict__.items() if
+        return dict((k, v) for k, v in get_attributes(self) if
                     not k.startswith('_'))
 
     def get_sentence(self):
@@ -366,10 +455,18 @@ class Sentence(object):
         >>> sentence.get_pos_tags()
         ['PRP', 'ADV', 'NN']
         '''
-        if self.pos:
-            return self.pos.strip().split(self.ITEM_DELIMITER)
-        else:
-            return None
+        pos_tags = self._get_pos_tags()
+        return None if pos_tags is None else list(pos_tags)
+
+    def _get_pos_tags(self):
+        ''' :returns: the (cached) tuple of POS tags or None '''
+        pos = self.pos
+        cache = getattr(self, '_pos_cache', None)
+        if cache is None or cache[0] is not pos:
+            pos_tags = tuple(pos.strip().split(self.ITEM_DELIMITER)) \
+                if pos else None
+            cache = self._pos_cache = (pos, pos_tags)
+        return cache[1]
 
     def set_pos_tags(self, new_pos_tags):
         if isinstance(new_pos_tags, list):
@@ -384,7 +481,7 @@ class Sentence(object):
         >>> sentence.get_pos_tags_list()
         ['PRP', 'ADV', 'NN']
         '''
-        return [] if not self.pos_tag_string else self.get_pos_tags()
+        return list(self._get_pos_tags() or ())
 
     def set_pos_tags_list(self, pos_tags_list):
         self.set_pos_tags(pos_tags_list)
@@ -406,8 +503,31 @@ class Sentence(object):
         '''
         :returns: an iterator providing the sentence's tokens 
         '''
-        if not self.token:
+        offsets = self.get_token_offsets()
+        if offsets is None:
             return
+        sentence = str(self.sentence)
+        for start, end in zip(*offsets):
+            yield sentence[start:end]
+
+    def get_token_offsets(self):
+        '''
+        :returns: a tuple of `array('i')` objects with the start and end \
+            offsets of the sentence's tokens relative to the sentence \
+            text or None, if the sentence has no tokens. The arrays are \
+            cached and must not be modified.
+        '''
+        token, value = self.token, self.value
+        cache = getattr(self, '_token_cache', None)
+        if cache is None or cache[0] is not token or cache[1] is not value:
+            offsets = self._parse_token_offsets() if token else None
+            cache = self._token_cache = (token, value, offsets)
+        return cache[2]
+
+    def _parse_token_offsets(self):
+        ''' parses the token string into arrays of start and end offsets '''
+        starts, ends = array('i'), array('i')
+        sentence = str(self.sentence)
         correction_offset = int(self.token.split(',')[0] or 0)
         for token_pos in self.token.split(self.ITEM_DELIMITER):
             token_indices = token_pos.split(self.TOKEN_DELIMITER)
@@ -424,13 +544,44 @@ class Sentence(object):
                 ), exc_info=True)
                 token_indices = [int(tok) for tok in token_indices]
                 start, end = token_indices[0], token_indices[-1]
-            res = str(self.sentence)[start:end]
+            # normalize negative and out of range offsets like slicing does
+            start, end, _ = slice(start, end).indices(len(sentence))
+            end = max(start, end)
+            res = sentence[start:end]
             # de- and encoding sometimes leads to index errors with double-width
             # characters - here we attempt to detect such cases and correct
-            if res.strip() != res:
-                correction_offset += len(res) - len(res.strip())
-                res = res.strip()
-            yield res
+            stripped = res.strip()
+            if stripped != res:
+                correction_offset += len(res) - len(stripped)
+                start += len(res) - len(res.lstrip())
+                end = start + len(stripped)
+            starts.append(start)
+            ends.append(end)
+        return starts, ends
+
+    @staticmethod
+    def get_all_token_offsets(sentences):
+        '''
+        :param sentences: a list of sentences
+        :returns: a tuple of three `array('i')` objects: the boundaries of \
+            the sentences' tokens (the tokens of sentence `i` are stored at \
+            the positions `boundaries[i]` to `boundaries[i + 1]`) and the \
+            tokens' start and end offsets relative to their sentence
+
+        >>> boundaries, starts, ends = Sentence.get_all_token_offsets(
+        ...     [Sentence(value='A day.', token='0,1 2,5 5,6'),
+        ...      Sentence(value='Hi', token='0,2')])
+        >>> list(boundaries), list(starts), list(ends)
+        ([0, 3, 4], [0, 2, 5, 0], [1, 5, 6, 2])
+        '''
+        boundaries, starts, ends = array('i', [0]), array('i'), array('i')
+        for sentence in sentences:
+            offsets = sentence.get_token_offsets()
+            if offsets is not None:
+                starts.extend(offsets[0])
+                ends.extend(offsets[1])
+            boundaries.append(len(starts))
+        return boundaries, starts, ends
 
     def is_digit(self, x):
         """built in is_digit rejects negative number strings like -1 (used for
@@ -456,48 +607,73 @@ class Sentence(object):
         LabeledDependency(parent='1', pos='MD', label='OBJ')
         ]
         '''
-        if self.dependency:
-            result = []
-            deps = self.dependency.strip().split(self.ITEM_DELIMITER)
-            for index, dep in enumerate(deps):
-                if self.DEPENDENCY_DELIMITER in dep:
-
-                    parent, label = dep.split(self.DEPENDENCY_DELIMITER, 1)
-                    if not self.is_digit(parent):
-                        try:
-                            label, parent = parent, label
-                            assert self.is_digit(parent)
-                        except AssertionError:
-                            logger.info(
-                                'Unable to parse dependeny annotation {} for sentence '
-                                '{} with dependency string {} as tuple of '
-                                '(parent index, dependency label), treating it as '
-                                'parent index only'.format(dep, self.value,
-                                                           self.dependency))
-                            parent, label = -1, 'XX'
-                elif self.is_digit(dep):
-                    parent, label = dep, None
-                    logger.info(
-                        'Unable to parse dependeny annotation {} for sentence '
-                        '{} with dependency string {} as tuple of '
-                        '(parent index, dependency label), treating it as '
-                        'parent index only'.format(dep, self.value,
-                                                   self.dependency))
-                else:
-                    parent, dep = -1, dep
-                    logger.info(
-                        'Unable to parse dependeny annotation {} for sente'
-                        'nce '
-                        '{} with dependency string {} as tuple of '
-                        '(parent index, dependency label), treating it as '
-                        'dependency label only'.format(dep, self.value,
+        dependencies = self._get_dependencies()
+        return None if dependencies is None else list(dependencies[0])
+
+    def get_dependency_parents(self):
+        '''
+        :returns: an `array('i')` of the tokens' dependency parents \
+            (cached, must not be modified) or None, if the sentence has no \
+            dependencies
+
+        >>> s = Sentence(pos='RB PRP MD', dependency='1:SUB -1:ROOT 1:OBJ')
+        >>> list(s.get_dependency_parents())
+        [1, -1, 1]
+        '''
+        dependencies = self._get_dependencies()
+        return None if dependencies is None else dependencies[1]
+
+    def _get_dependencies(self):
+        ''' :returns: the (cached) tuple of LabeledDependency objects and \
+            the parents array or None '''
+        dependency, pos = self.dependency, self.pos
+        cache = getattr(self, '_dependency_cache', None)
+        if cache is None or cache[0] is not dependency or cache[1] is not pos:
+            dependencies = self._parse_dependencies() if dependency else None
+            cache = self._dependency_cache = (dependency, pos, dependencies)
+        return cache[2]
+
+    def _parse_dependencies(self):
+        ''' parses the dependency string (see :meth:`get_dependency_list`) '''
+        result = []
+        pos_tags = self._get_pos_tags() or ()
+        deps = self.dependency.strip().split(self.ITEM_DELIMITER)
+        for index, dep in enumerate(deps):
+            if self.DEPENDENCY_DELIMITER in dep:
+
+                parent, label = dep.split(self.DEPENDENCY_DELIMITER, 1)
+                if not self.is_digit(parent):
+                    try:
+                        label, parent = parent, label
+                        assert self.is_digit(parent)
+                    except AssertionError:
+                        logger.info(
+                            'Unable to parse dependeny annotation {} for sentence '
+                            '{} with dependency string {} as tuple of '
+                            '(parent index, dependency label), treating it as '
+                            'parent index only'.format(dep, self.value,
                                                        self.dependency))
-                result.append(LabeledDependency(parent,
-                                                self.pos_tags_list[index],
-                                                label))
-            return result
-        else:
-            return None
+                        parent, label = -1, 'XX'
+            elif self.is_digit(dep):
+                parent, label = dep, None
+                logger.info(
+                    'Unable to parse dependeny annotation {} for sentence '
+                    '{} with dependency string {} as tuple of '
+                    '(parent index, dependency label), treating it as '
+                    'parent index only'.format(dep, self.value,
+                                               self.dependency))
+            else:
+                parent, label = -1, dep
+                logger.info(
+                    'Unable to parse dependeny annotation {} for sente'
+                    'nce '
+                    '{} with dependency string {} as tuple of '
+                    '(parent index, dependency label), treating it as '
+                    'dependency label only'.format(dep, self.value,
+                                                   self.dependency))
+            result.append(LabeledDependency(parent, pos_tags[index], label))
+        parents = array('i', [int(dependency.parent) for dependency in result])
+        return tuple(result), parents
 
     def set_dependency_list(self, dependencies):
         '''
@@ -539,7 +715,7 @@ class Sentence(object):
         :returns: A JSON string.
         :rtype: str
         '''
-        return json.dumps(self.to_api_dict(version))
+        return json_codec.dumps(self.to_api_dict(version), compatible=True)
 
     def to_api_dict(self, version=1.0):
         '''
@@ -0,0 +1,386 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Memory mapped binary corpora of documents.
+
+A binary corpus stores :class:`~weblyzard_api.model.document.Document`
+objects in a single file, which is read through `mmap`:
+
+* every document is stored as one record consisting of its content
+  (UTF-8), its metadata (id, format, language, nilsimsa, header and
+  annotations as JSON) and its partitions as packed columns,
+* a hash table maps content ids to records, i.e. a document is loaded in
+  O(1) without reading any other part of the file,
+* the partitions are only decoded when they are accessed (see
+  :class:`~weblyzard_api.model.partitions.LazyPartitions`).
+
+File layout (little endian)::
+
+    header   MAGIC, version
+    records  per document: RECORD header, content, metadata, partitions
+             (PARTITION header, label, data)
+    index    record offsets (in file order), hash table of content ids
+             and record numbers
+    footer   index offset, number of documents, hash table size, MAGIC
+
+Example::
+
+    >>> write_corpus('corpus.wlc', documents)
+    >>> with BinaryCorpus('corpus.wlc') as corpus:
+    ...     document = corpus[4711]
+    ...     for document in corpus:
+    ...         print(document.content_id)
+'''
+import mmap
+import operator
+import os
+import struct
+import sys
+
+from array import array
+
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.partitions import LazyPartitions
+from weblyzard_api.model.token_partition import TokenPartition
+from weblyzard_api.util import json_codec
+
+MAGIC = b'WLCORPUS'
+VERSION = 1
+FILE_HEADER = struct.Struct('<8sI')
+# content id, content size, metadata size, number of partitions
+RECORD = struct.Struct('<qIIH')
+# label size, kind, number of spans, data size
+PARTITION = struct.Struct('<HBII')
+# index offset, number of documents, hash table size
+FOOTER = struct.Struct('<QQQ8s')
+
+# partition kinds
+JSON_SPANS, COLUMN_SPANS, TOKEN_COLUMNS = range(3)
+TOKEN_COLUMN_TYPES = 'iiHiH'
+
+# Fibonacci hashing of content ids
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+EMPTY_SLOT = 0
+
+
+def get_slot(content_id, bits):
+    ''' :returns: the hash table slot of the given content id '''
+    return ((content_id * HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+
+def _get_array(typecode, data):
+    ''' :returns: an array of the given type read from the bytes '''
+    result = array(typecode)
+    result.frombytes(data)
+    if sys.byteorder != 'little':
+        result.byteswap()
+    return result
+
+
+def _to_bytes(column):
+    ''' :returns: the little endian bytes of the given array '''
+    if sys.byteorder != 'little':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _encode_partition(spans, serialized):
+    '''
+    :param spans: the partition
+    :param serialized: the partition's serialized spans
+    :returns: the partition's kind and data
+    '''
+    if isinstance(spans, TokenPartition):
+        columns = spans.get_columns()
+        if columns is not None:
+            columns, values = columns
+            return TOKEN_COLUMNS, b''.join(
+                [_to_bytes(column) for column in columns] +
+                [json_codec.dumpb(values)])
+    try:
+        starts = array('i', [span['start'] for span in serialized])
+        ends = array('i', [span['end'] for span in serialized])
+    except (KeyError, TypeError, OverflowError):
+        return JSON_SPANS, json_codec.dumpb(serialized)
+    extras = [{key: value for key, value in span.items()
+               if key not in ('start', 'end')} for span in serialized]
+    return COLUMN_SPANS, b''.join((_to_bytes(starts), _to_bytes(ends),
+                                   json_codec.dumpb(extras)))
+
+
+def _decode_partition(kind, count, data):
+    '''
+    :returns: the raw spans of the given partition data, i.e. a \
+        TokenPartition or a list of serialized spans
+    '''
+    if kind == TOKEN_COLUMNS:
+        columns = []
+        pos = 0
+        for typecode in TOKEN_COLUMN_TYPES:
+            size = array(typecode).itemsize * count
+            columns.append(_get_array(typecode, data[pos:pos + size]))
+            pos += size
+        return TokenPartition.from_columns(*columns,
+                                           json_codec.loads(data[pos:]))
+    if kind == COLUMN_SPANS:
+        size = 4 * count
+        starts = _get_array('i', data[:size])
+        ends = _get_array('i', data[size:2 * size])
+        extras = json_codec.loads(data[2 * size:])
+        return [dict(extra, start=start, end=end)
+                for extra, start, end in zip(extras, starts, ends)]
+    return json_codec.loads(data)
+
+
+def encode_document(document):
+    ''' :returns: the binary record of the given document '''
+    serialized = document.to_dict()
+    content = (document.content or '').encode('utf-8')
+    serialized.pop('content', None)
+    serialized.pop('id', None)
+    serialized_partitions = serialized.pop('partitions', None) or {}
+    metadata = json_codec.dumpb(serialized)
+
+    partitions = []
+    for label, spans in document.partitions.items():
+        if spans is None:
+            continue
+        kind, data = _encode_partition(spans, serialized_partitions[label])
+        label = label.encode('utf-8')
+        partitions.append(PARTITION.pack(len(label), kind, len(spans),
+                                         len(data)))
+        partitions.append(label)
+        partitions.append(data)
+    return b''.join([RECORD.pack(int(document.content_id), len(content),
+                                 len(metadata), len(partitions) // 3),
+                     content, metadata] + partitions)
+
+
+def write_corpus(path, documents):
+    '''
+    Writes the given documents to a binary corpus.
+
+    The corpus is written to a temporary file, which replaces the given
+    file only after all documents have been written successfully.
+
+    :param path: the corpus file name
+    :param documents: an iterable of Document objects with unique \
+        (64 bit integer) content ids
+    :returns: the number of documents written
+    :raises ValueError: for invalid or duplicate content ids
+    '''
+    offsets = array('Q')
+    content_ids = array('q')
+    seen = set()
+    temp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(temp_path, 'wb') as fp:
+            fp.write(FILE_HEADER.pack(MAGIC, VERSION))
+            for document in documents:
+                content_id = int(document.content_id)
+                if content_id in seen:
+                    raise ValueError('Duplicate content id %s' % content_id)
+                seen.add(content_id)
+                offsets.append(fp.tell())
+                content_ids.append(content_id)
+                fp.write(encode_document(document))
+
+            # hash table with a load factor <= 0.5
+            bits = max(1, (2 * len(offsets)).bit_length())
+            table_ids = array('q', [0]) * (1 << bits)
+            table_records = array('Q', [EMPTY_SLOT]) * (1 << bits)
+            for record, content_id in enumerate(content_ids):
+                slot = get_slot(content_id, bits)
+                while table_records[slot] != EMPTY_SLOT:
+                    slot = (slot + 1) & ((1 << bits) - 1)
+                table_ids[slot] = content_id
+                table_records[slot] = record + 1
+
+            # align the index
+            fp.write(b'\0' * (-fp.tell() % 8))
+            index_offset = fp.tell()
+            for column in (offsets, table_ids, table_records):
+                fp.write(_to_bytes(column))
+            fp.write(FOOTER.pack(index_offset, len(offsets), 1 << bits,
+                                 MAGIC))
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(offsets)
+
+
+class BinaryCorpus(object):
+    '''
+    Provides random and sequential access to the documents of a binary
+    corpus.
+
+    :param path: the corpus file name
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mmap)
+        if len(self._data) < FILE_HEADER.size + FOOTER.size or \
+                FILE_HEADER.unpack_from(self._data) != (MAGIC, VERSION):
+            self.close()
+            raise ValueError('%s is not a binary corpus' % path)
+        index_offset, self._size, table_size, magic = FOOTER.unpack_from(
+            self._data, len(self._data) - FOOTER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('Incomplete binary corpus %s' % path)
+        self._bits = table_size.bit_length() - 1
+        self._offsets = self._get_column('Q', index_offset, self._size)
+        index_offset += 8 * self._size
+        self._table_ids = self._get_column('q', index_offset, table_size)
+        self._table_records = self._get_column('Q', index_offset + 8 *
+                                               table_size, table_size)
+
+    def _get_column(self, typecode, offset, count):
+        data = self._data[offset:offset + 8 * count]
+        if sys.byteorder == 'little':
+            return data.cast(typecode)
+        return _get_array(typecode, data)
+
+    def close(self):
+        '''
+        Closes the corpus. Views returned by :meth:`get_content_bytes` \
+        remain valid; the file is unmapped, once they have been released.
+        '''
+        for name in ('_offsets', '_table_ids', '_table_records'):
+            column = self.__dict__.pop(name, None)
+            if isinstance(column, memoryview):
+                column.release()
+        self._data.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # content views are still in use, the mmap is closed when it
+            # is garbage collected
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def _find_record(self, content_id):
+        ''' :returns: the offset of the given document's record or None '''
+        mask = (1 << self._bits) - 1
+        slot = get_slot(content_id, self._bits)
+        while True:
+            record = self._table_records[slot]
+            if record == EMPTY_SLOT:
+                return None
+            if self._table_ids[slot] == content_id:
+                return self._offsets[record - 1]
+            slot = (slot + 1) & mask
+
+    def __contains__(self, content_id):
+        try:
+            content_id = operator.index(content_id)
+        except TypeError:
+            return False
+        return self._find_record(content_id) is not None
+
+    def _get_content_view(self, offset):
+        ''' :returns: the record header and a view on the content '''
+        header = RECORD.unpack_from(self._data, offset)
+        start = offset + RECORD.size
+        return header, self._data[start:start + header[1]]
+
+    def _get_offset(self, content_id):
+        try:
+            offset = self._find_record(operator.index(content_id))
+        except TypeError:
+            offset = None
+        if offset is None:
+            raise KeyError(content_id)
+        return offset
+
+    def get_content_bytes(self, content_id):
+        '''
+        :returns: a memoryview on the UTF-8 encoded content of the given \
+            document (without copying it); the view keeps the file mapped \
+            after :meth:`close` until it is released
+        :raises KeyError: if the corpus does not contain the document
+        '''
+        return self._get_content_view(self._get_offset(content_id))[1]
+
+    def get_content(self, content_id):
+        '''
+        :returns: the content of the given document
+        :raises KeyError: if the corpus does not contain the document
+        '''
+        return str(self.get_content_bytes(content_id), 'utf-8')
+
+    def _load(self, offset):
+        ''' :returns: the document stored at the given offset '''
+        (content_id, content_size, metadata_size, partition_count), \
+            content = self._get_content_view(offset)
+        pos = offset + RECORD.size + content_size
+        document = self._data[pos:pos + metadata_size]
+        document = json_codec.loads(bytes(document))
+        document['id'] = content_id
+        document['content'] = str(content, 'utf-8')
+        pos += metadata_size
+
+        raw_partitions = {}
+        for _ in range(partition_count):
+            label_size, kind, count, data_size = PARTITION.unpack_from(
+                self._data, pos)
+            pos += PARTITION.size
+            label = str(self._data[pos:pos + label_size], 'utf-8')
+            pos += label_size
+            # the partition data is copied, so that the document remains
+            # valid after the corpus has been closed
+            raw_partitions[label] = (kind, count,
+                                     bytes(self._data[pos:pos + data_size]))
+            pos += data_size
+
+        document = Document.from_dict(document)
+        inverse_mapping = Document.get_inverse_mapping()
+
+        def factory(label, raw_partition):
+            spans = _decode_partition(*raw_partition)
+            if isinstance(spans, TokenPartition):
+                return spans
+            return Document.new_partition(label, spans,
+                                          mapping=inverse_mapping)
+
+        document.partitions = LazyPartitions(raw_partitions, factory=factory)
+        return document
+
+    def get_document(self, content_id):
+        '''
+        :returns: the document with the given content id
+        :raises KeyError: if the corpus does not contain the document
+        '''
+        return self._load(self._get_offset(content_id))
+
+    __getitem__ = get_document
+
+    def get(self, content_id, default=None):
+        try:
+            return self.get_document(content_id)
+        except KeyError:
+            return default
+
+    def iter_content_ids(self):
+        ''' yields the content ids in the order of the corpus file '''
+        for offset in self._offsets:
+            yield RECORD.unpack_from(self._data, offset)[0]
+
+    def __iter__(self):
+        ''' yields the documents in the order of the corpus file '''
+        for offset in self._offsets:
+            yield self._load(offset)
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Streaming JSON Lines corpora of documents.
+
+A corpus file contains one document per line:
+
+* :class:`~weblyzard_api.model.document.Document` objects are stored as
+  their JSON representation (:meth:`Document.to_dict`),
+* :class:`~weblyzard_api.model.xml_content.XMLContent` objects as JSON
+  string of their XML representation (:meth:`XMLContent.get_xml_document`).
+
+Corpus files are compressed with gzip or zstd, if their name ends with
+`.gz` or `.zst` (or the compression is given explicitly); zstd requires
+the optional `zstandard` package.
+
+:func:`iter_documents` reads the corpus line by line and optionally
+decodes the documents in worker processes. Only a bounded number of
+chunks is pending at any time and the documents are yielded in the order
+of the corpus file, i.e. the memory usage does not depend on the corpus
+size.
+
+Example::
+
+    >>> write_documents('corpus.jsonl.gz', documents)
+    >>> for document in iter_documents('corpus.jsonl.gz', processes=4):
+    ...     print(document.title)
+'''
+import gzip
+
+from collections import deque
+from multiprocessing import Pool
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.xml_content import XMLContent
+from weblyzard_api.util import json_codec
+
+COMPRESSION_SUFFIXES = {'.gz': 'gzip',
+                        '.gzip': 'gzip',
+                        '.zst': 'zstd',
+                        '.zstd': 'zstd'}
+# number of lines decoded per task
+DEFAULT_CHUNK_SIZE = 64
+# number of pending tasks per worker process
+PENDING_CHUNKS_PER_PROCESS = 2
+
+
+def get_compression(path, compression=None):
+    '''
+    :param path: the corpus file name
+    :param compression: None (derive the compression from the file name), \
+        'gzip', 'zstd' or False (no compression)
+    :returns: the compression of the given corpus file
+    '''
+    if compression is None:
+        for suffix, name in COMPRESSION_SUFFIXES.items():
+            if str(path).endswith(suffix):
+                compression = name
+                break
+    if not compression:
+        return None
+    if compression not in ('gzip', 'zstd'):
+        raise ValueError('Unknown compression %s (supported: gzip, zstd)'
+                         % compression)
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError('zstd compression requires the zstandard package.')
+    return compression
+
+
+def open_corpus(path, mode='rb', compression=None):
+    '''
+    :param path: the corpus file name
+    :param mode: 'rb' or 'wb'
+    :param compression: see :func:`get_compression`
+    :returns: a binary file object for reading or writing the corpus
+    '''
+    compression = get_compression(path, compression)
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        return zstandard.open(path, mode)
+    return open(path, mode)
+
+
+def encode_document(document):
+    '''
+    :param document: a Document or XMLContent object
+    :returns: the corpus line (without line break) of the given document
+    '''
+    if isinstance(document, XMLContent):
+        return json_codec.dumps(document.get_xml_document())
+    return json_codec.dumps(document.to_dict())
+
+
+def decode_document(line, document_class=Document):
+    '''
+    :param line: a corpus line
+    :param document_class: the class of the documents (Document, \
+        XMLContent or one of their subclasses)
+    :returns: the decoded document
+    '''
+    if issubclass(document_class, XMLContent):
+        return document_class(json_codec.loads(line))
+    return document_class.from_json(line)
+
+
+def _decode_lines(lines, document_class):
+    ''' decodes a chunk of corpus lines (in a worker process) '''
+    return [decode_document(line, document_class) for line in lines]
+
+
+def _iter_chunks(fp, chunk_size):
+    ''' yields lists of the non-empty lines of the given file '''
+    chunk = []
+    for line in fp:
+        if line.strip():
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_documents(path, document_class=Document, compression=None,
+                   processes=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Yields the documents of a JSON Lines corpus in the order of the file.
+
+    :param path: the corpus file name
+    :param document_class: the class of the documents (Document, \
+        XMLContent or one of their subclasses)
+    :param compression: see :func:`get_compression`
+    :param processes: the number of worker processes used for decoding \
+        the documents; documents are decoded in the calling process, if \
+        not set
+    :param chunk_size: the number of lines decoded per task
+    '''
+    with open_corpus(path, 'rb', compression) as fp:
+        if not processes:
+            for line in fp:
+                if line.strip():
+                    yield decode_document(line, document_class)
+            return
+
+        pool = Pool(processes)
+        try:
+            pending = deque()
+            max_pending = processes * PENDING_CHUNKS_PER_PROCESS
+            for chunk in _iter_chunks(fp, chunk_size):
+                pending.append(pool.apply_async(_decode_lines,
+                                                (chunk, document_class)))
+                if len(pending) >= max_pending:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+        finally:
+            # also stops the workers, if the generator has been closed
+            pool.terminate()
+            pool.join()
+
+
+def write_documents(path, documents, compression=None):
+    '''
+    Writes the given documents to a JSON Lines corpus.
+
+    :param path: the corpus file name
+    :param documents: an iterable of Document or XMLContent objects
+    :param compression: see :func:`get_compression`
+    :returns: the number of documents written
+    '''
+    count = 0
+    with open_corpus(path, 'wb', compression) as fp:
+        for document in documents:
+            fp.write(encode_document(document).encode('utf-8'))
+            fp.write(b'\n')
+            count += 1
+    return count
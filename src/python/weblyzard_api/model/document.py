@@ -7,11 +7,10 @@ Created on Jan 25, 2018
 '''
 from __future__ import unicode_literals
 from builtins import object
-import json
 import html
 
-from datetime import datetime
-from decimal import Decimal
+from collections import namedtuple
+from functools import partial
 from itertools import chain
 
 from weblyzard_api.model.parsers.xml_2013 import XML2013
@@ -20,8 +19,17 @@ from weblyzard_api.model.parsers.xml_2005 import XML2005
 from weblyzard_api.model.parsers.xml_deprecated import XMLDeprecated
 from weblyzard_api.model.exceptions import (MissingFieldException,
                                             UnexpectedFieldException)
+from weblyzard_api.model.partitions import LazyPartitions
+from weblyzard_api.model.serializer import DocumentSerializer
+from weblyzard_api.model.span_index import SpanIndex
+from weblyzard_api.model.token_partition import TokenPartition
+from weblyzard_api.util import json_codec
 from typing import Dict
 
+# result of Document.align_annotations
+AnnotationAlignment = namedtuple('AnnotationAlignment',
+                                 ['tokens', 'pos', 'sentences'])
+
 
 class Document(object):
     # supported partition keys
@@ -75,11 +83,36 @@ class Document(object):
         # populate default dicts:
         if partitions is None:
             self.partitions = {}
+        elif isinstance(partitions, LazyPartitions):
+            self.partitions = partitions
         else:
-            self.partitions = {label: [SpanFactory.new_span(span) for span in spans]
-                                for label, spans in partitions.items()}
+            # spans are converted on the first access of their partition
+            self.partitions = LazyPartitions(partitions,
+                                             factory=self.new_partition)
         self.header = header if header else {}
         self.annotations = annotations if annotations else []
+        # lazily built SpanIndex objects (see get_partition_index)
+        self._partition_index = {}
+
+    @classmethod
+    def new_partition(cls, label, spans, mapping=None):
+        '''
+        Convert a list of spans (span objects or their dict representation)
+        into a partition.
+        :param label, the partition key
+        :param spans, the spans of the partition
+        :param mapping, an optional mapping applied to the keys of the \
+            dict spans (compare `_dict_transform`)
+        :return a TokenPartition for the TOKEN partition, a list of spans \
+            otherwise
+        '''
+        if mapping is not None:
+            serializer = DocumentSerializer.for_mapping(mapping)
+            spans = (serializer.to_dict(span) for span in spans)
+        spans = (SpanFactory.new_span(span) for span in spans)
+        if label == cls.TOKEN_KEY:
+            return TokenPartition(spans)
+        return list(spans)
 
     def get_body(self):
         if self.content is None or len(self.content) == 0:
@@ -113,7 +146,8 @@ class Document(object):
     title = property(get_title, set_title)
 
     def __repr__(self):
-        return 'Document: {}'.format(self.__dict__)
+        return 'Document: {}'.format({k: v for k, v in self.__dict__.items()
+                                      if not k.startswith('_')})
 
     @classmethod
     def _dict_transform(cls, data, mapping=None):
@@ -125,62 +159,7 @@ class Document(object):
         '''
         if mapping is None:
             mapping = cls.MAPPING
-        if data is None:
-            return None
-        if isinstance(data, str):
-            return data
-        if isinstance(data, int):
-            return data
-        if isinstance(data, float):
-            return data
-        if isinstance(data, int):
-            return data
-        if isinstance(data, bool):
-            return data
-        if isinstance(data, Decimal):
-            return str(data)  # needed for e.g. GEO coordinates
-        if isinstance(data, tuple):
-            if len(data) == 1:
-                return data[0]
-            return data
-        if isinstance(data, memoryview):
-            data = bytes(data)
-        if isinstance(data, bytes):
-            return data.decode("utf-8")
-        if isinstance(data, datetime):
-            return data.strftime("%Y-%m-%d %H:%M:%S")
-        if isinstance(data, list):
-            result = []
-            for item in data:
-                result.append(cls._dict_transform(item, mapping=mapping))
-            return result
-        if isinstance(data, dict):
-            result = {}
-            for key, value in data.items():
-                key = mapping.get(key, key)
-                if value is not None:
-                    value = cls._dict_transform(value, mapping=mapping)
-                    if value is not None:
-                        result[key] = value
-            return result
-
-        if isinstance(data, object):
-            result = {}
-            for key, value in data.__dict__.items():
-                if key in mapping:
-                    key = mapping[key]
-                elif key.startswith('_'):
-                    continue
-
-                if value is not None:
-                    if key == 'lang':
-                        value = value.upper()
-                    value = cls._dict_transform(value, mapping=mapping)
-                    if value is not None:
-                        result[key] = cls._dict_transform(
-                            value, mapping=mapping)
-            return result
-        return None
+        return DocumentSerializer.for_mapping(mapping).to_dict(data)
 
     @classmethod
     def from_json(cls, json_payload):
@@ -188,9 +167,18 @@ class Document(object):
         Convert a JSON object into a content model.
         :param json_payload, the string representation of the JSON content model
         '''
-        parsed_content = json.loads(json_payload, strict=False)
+        parsed_content = json_codec.loads(json_payload, strict=False)
         return cls.from_dict(dict_=parsed_content)
 
+    @classmethod
+    def get_inverse_mapping(cls):
+        '''
+        Return the mapping from serialized JSON fields to attributes.
+        '''
+        # This is tricky ... the mapping cannot be easily inversed
+        # making the md5sum to content_id conversion at the top level necessary
+        return {v: k for k, v in cls.MAPPING.items() if k != 'content_id'}
+
     @classmethod
     def from_dict(cls, dict_):
         '''
@@ -207,18 +195,16 @@ class Document(object):
             if not key in cls.REQUIRED_FIELDS + cls.OPTIONAL_FIELDS:
                 raise UnexpectedFieldException(key)
 
-        # This is tricky ... the mapping cannot be easily inversed
-        # making the md5sum to content_id conversion at the top level necessary
-        inverse_mapping = {v: k for k, v in cls.MAPPING.items() if
-                                                    k != 'content_id'}
-        parsed_content = Document._dict_transform(dict_,
-                                                  mapping=inverse_mapping)
+        inverse_mapping = cls.get_inverse_mapping()
+        # the partitions are only converted on access
+        parsed_content = Document._dict_transform(
+            {key: value for key, value in dict_.items()
+             if key != 'partitions'}, mapping=inverse_mapping)
         parsed_content['content_id'] = parsed_content.pop('md5sum')
-
-        # populate default dicts:
-        partitions = {label: [SpanFactory.new_span(span) for span in spans]
-                      for label, spans in parsed_content['partitions'].items()} \
-            if 'partitions' in parsed_content else {}
+        partitions = LazyPartitions(
+            {label: spans for label, spans
+             in (dict_.get('partitions') or {}).items() if spans is not None},
+            factory=partial(cls.new_partition, mapping=inverse_mapping))
 
         header = parsed_content['header'] \
             if 'header' in parsed_content and parsed_content[
@@ -242,8 +228,8 @@ class Document(object):
 
     def to_json(self):
         '''
-        Serialize a document to JSON '''
-        return json.dumps(self.to_dict())
+        Serialize a document to JSON (in the format of :meth:`dump`) '''
+        return DocumentSerializer.for_mapping(self.MAPPING).dumps(self)
 
     def to_dict(self):
         '''
@@ -252,6 +238,16 @@ class Document(object):
         result = self._dict_transform(self)
         return result
 
+    def dump(self, fp):
+        '''
+        Serialize a document to JSON and write it to the given text file
+        object (e.g. a file or `socket.makefile('w')`) without building
+        the intermediate dict. The output is identical to
+        `json.dump(self.to_dict(), fp)`.
+        :param fp, the file object to write to
+        '''
+        DocumentSerializer.for_mapping(self.MAPPING).dump(self, fp)
+
     def to_xml(self, ignore_title=False, include_fragments=False,
                xml_version=XML2013.VERSION):
         ''' 
@@ -276,7 +272,7 @@ class Document(object):
         return self.SUPPORTED_XML_VERSIONS[xml_version].dump_xml(
             titles=titles,
             attributes=self.header,
-            sentences=self.get_sentences(include_fragments=include_fragments))
+            sentences=self.iter_sentences(include_fragments=include_fragments))
 
     def get_text_by_span(self, span: CharSpan):
         ''' 
@@ -293,39 +289,137 @@ class Document(object):
         return (spanB.start <= spanA.start and spanB.end > spanA.start) or \
                 (spanA.start <= spanB.start and spanA.end > spanB.start)
 
+    def get_partition_index(self, partition_key: str):
+        '''
+        Return the (cached) SpanIndex of the given partition or None, if
+        the document does not have the partition.
+
+        The index is rebuilt, if the partition's span list has been
+        replaced or changed its length; call `invalidate_partition_index`
+        after modifying spans in place.
+        :param partition_key, the partition to index
+        '''
+        spans = self.partitions.get(partition_key)
+        if spans is None:
+            return None
+        cache = self.__dict__.setdefault('_partition_index', {})
+        cached = cache.get(partition_key)
+        if cached is not None and cached[0] is spans and \
+                cached[1] == len(spans):
+            return cached[2]
+
+        if isinstance(spans, TokenPartition):
+            index = SpanIndex(spans, *spans.get_offsets())
+        else:
+            index = SpanIndex([span if isinstance(span, CharSpan) else
+                               SpanFactory.new_span(span) for span in spans])
+        cache[partition_key] = (spans, len(spans), index)
+        return index
+
+    def invalidate_partition_index(self, partition_key: str=None):
+        '''
+        Discard the cached index of the given partition (or of all
+        partitions).
+        :param partition_key, the partition whose spans have changed
+        '''
+        cache = self.__dict__.setdefault('_partition_index', {})
+        if partition_key is None:
+            cache.clear()
+        else:
+            cache.pop(partition_key, None)
+
     def get_partition_overlaps(self, search_span: CharSpan,
                                target_partition_key: str):
         ''' Return all spans from a given target_partition_key that overlap 
         the search span. 
         :param search_span, the span to search for overlaps by.
         :param target_partition_key, the target partition'''
-        result = []
+        index = self.get_partition_index(target_partition_key)
+        if not index:
+            return []
+
+        if not isinstance(search_span, CharSpan):
+            search_span = SpanFactory.new_span(search_span)
+        return index.get_overlaps(search_span.start, search_span.end)
+
+    def get_partition_contained(self, search_span: CharSpan,
+                                target_partition_key: str):
+        ''' Return all spans from a given target_partition_key that lie
+        within the search span.
+        :param search_span, the enclosing span.
+        :param target_partition_key, the target partition'''
+        index = self.get_partition_index(target_partition_key)
+        if not index:
+            return []
 
-        if not target_partition_key in self.partitions:
-            return result
+        if not isinstance(search_span, CharSpan):
+            search_span = SpanFactory.new_span(search_span)
+        return index.get_contained(search_span.start, search_span.end)
 
-        for other_span in self.partitions[target_partition_key]:
-            if not isinstance(other_span, CharSpan):
-                other_span = SpanFactory.new_span(other_span)
-            if not isinstance(search_span, CharSpan):
-                search_span = SpanFactory.new_span(search_span)
-            if self.overlapping(other_span, search_span):
-                result.append(other_span)
+    def get_partition_spans_at(self, position: int,
+                               target_partition_key: str):
+        ''' Return all spans from a given target_partition_key that contain
+        the given character offset.
+        :param position, the character offset.
+        :param target_partition_key, the target partition'''
+        index = self.get_partition_index(target_partition_key)
+        if not index:
+            return []
+        return index.get_at(position)
 
-        return result
+    def align_annotations(self, starts, ends=None):
+        """
+        Align annotations with the document's tokens and sentences.
+
+        All annotations are aligned at once by binary searches over the
+        sorted TOKEN and SENTENCE partitions (see
+        `SpanIndex.get_first_overlaps`).
+        :param starts: a list or array of the annotations' start offsets \
+            or a list of annotations (dicts or Annotation objects), if \
+            `ends` is not given
+        :param ends: a list or array of the annotations' end offsets
+        :return: an AnnotationAlignment with the index of the first token \
+            overlapping each annotation (-1 if there is none), the token's \
+            POS and the sentence span containing the annotation's start
+        """
+        if ends is None:
+            annotations = [annotation if isinstance(annotation, dict) else
+                           {'start': annotation.start, 'end': annotation.end}
+                           for annotation in starts]
+            starts = [annotation['start'] for annotation in annotations]
+            ends = [annotation['end'] for annotation in annotations]
+
+        token_index = self.get_partition_index(self.TOKEN_KEY)
+        if token_index is None:
+            tokens = [-1] * len(starts)
+            pos = [None] * len(starts)
+        else:
+            tokens = token_index.get_first_overlaps(starts, ends)
+            spans = token_index.spans
+            if isinstance(spans, TokenPartition):
+                pos = spans.get_pos(tokens)
+            else:
+                pos = [None if index < 0 else getattr(spans[index], 'pos',
+                                                      None)
+                       for index in tokens]
+
+        sentence_index = self.get_partition_index(self.SENTENCE_KEY)
+        if sentence_index is None:
+            sentences = [None] * len(starts)
+        else:
+            spans = sentence_index.spans
+            sentences = [None if index < 0 else spans[index] for index
+                         in sentence_index.get_containing(starts)]
+        return AnnotationAlignment(tokens, pos, sentences)
 
     def get_pos_for_annotation(self, annotation: Dict):
         """
         Get the part-of-speech for a given annotation.
         :param annotation
-        :return: the POS of the annotation
+        :return: the POS of the first token overlapping the annotation
         """
-        for token_span in self.partitions[self.TOKEN_KEY]:
-            if not isinstance(token_span, CharSpan):
-                token_span = SpanFactory.new_span(token_span)
-            if token_span.start >= annotation['start']:
-                return token_span.pos
-        return None
+        return self.align_annotations([annotation['start']],
+                                      [annotation['end']]).pos[0]
 
     def get_sentences(self, zero_based: bool=False,
                       include_title: bool=True,
@@ -336,35 +430,51 @@ class Document(object):
         :param include_title: if True, include title sentences
         :param include_fragments: if True, include fragments (non-sentence text)
         """
-        result = []
+        return list(self.iter_sentences(zero_based=zero_based,
+                                        include_title=include_title,
+                                        include_fragments=include_fragments))
+
+    def iter_sentences(self, zero_based: bool=False,
+                       include_title: bool=True,
+                       include_fragments: bool=False):
+        """
+        Generator variant of `get_sentences`, which yields the sentences
+        ordered by their start. The sentences' tokens and titles are
+        determined in a single sweep over the sorted TOKEN and TITLE spans.
+        :param zero_based: if True, enforce token indices starting at 0
+        :param include_title: if True, include title sentences
+        :param include_fragments: if True, include fragments (non-sentence text)
+        """
         offset = 0
         requested_keys = [self.SENTENCE_KEY]
 
         if include_fragments:
             requested_keys.append(self.FRAGMENT_KEY)
         if not any([key in self.partitions for key in requested_keys]):
-            return result
+            return
         sentence_spans = chain(
             *(self.partitions.get(key, []) for key in requested_keys)
         )
-        sentence_spans = sorted(sentence_spans, key=lambda span: span.start)
-
-        for sentence_span in sentence_spans:
-            if not isinstance(sentence_span, CharSpan):
-                sentence_span = SpanFactory.new_span(sentence_span)
-
+        sentence_spans = sorted(
+            [span if isinstance(span, CharSpan) else
+             SpanFactory.new_span(span) for span in sentence_spans],
+            key=lambda span: span.start)
+
+        token_index = self.get_partition_index(self.TOKEN_KEY) or \
+            SpanIndex([])
+        title_index = self.get_partition_index(self.TITLE_KEY) or \
+            SpanIndex([])
+
+        for sentence_span, token_spans, title_spans in zip(
+                sentence_spans,
+                token_index.iter_overlaps(sentence_spans),
+                title_index.iter_overlaps(sentence_spans)):
             if zero_based:
                 offset = sentence_span.start
             if not sentence_span.span_type == 'SentenceCharSpan':
                 raise Exception('Bad sentence span')
 
-            # get tokens
-            token_spans = self.get_partition_overlaps(
-                                            search_span=sentence_span,
-                                            target_partition_key=self.TOKEN_KEY)
-            is_title = len(
-                self.get_partition_overlaps(search_span=sentence_span,
-                                            target_partition_key=self.TITLE_KEY)) > 0
+            is_title = len(title_spans) > 0
             if not include_title and is_title:
                 continue
 
@@ -386,12 +496,10 @@ class Document(object):
             # finally, extract the sentence text.
             value = self.get_text_by_span(sentence_span)
 
-            result.append(Sentence(md5sum=sentence_span.md5sum,
-                                   sem_orient=sem_orient,
-                                   significance=sentence_span.significance,
-                                   pos=pos_sequence, token=tok_sequence,
-                                   value=value, is_title=is_title,
-                                   dependency=dep_sequence,
-                                   emotions=sentence_span.emotions))
-
-        return result
+            yield Sentence(md5sum=sentence_span.md5sum,
+                           sem_orient=sem_orient,
+                           significance=sentence_span.significance,
+                           pos=pos_sequence, token=tok_sequence,
+                           value=value, is_title=is_title,
+                           dependency=dep_sequence,
+                           emotions=sentence_span.emotions)
@@ -14,8 +14,15 @@ from builtins import object
 import json
 import logging
 import hashlib
+import math
+import re
+import sys
 import unicodedata
 
+from collections import namedtuple
+from functools import lru_cache
+from itertools import chain
+from io import BytesIO
 from lxml import etree
 from datetime import date, datetime
 
@@ -24,9 +31,82 @@ from weblyzard_api.model.exceptions import (MalformedJSONException,
                                             MissingFieldException,
                                             UnsupportedValueException)
 from weblyzard_api.client.rdf import Namespace
+from weblyzard_api.util import json_codec
 
 logger = logging.getLogger(__name__)
 
+# a JSON number (RFC 8259)
+NUMBER = re.compile(r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?')
+# first characters of JSON values (besides whitespace)
+JSON_START = frozenset('{["-0123456789tfn')
+JSON_WHITESPACE = frozenset(' \t\n\r')
+# first characters of values accepted by int() and float() (besides
+# decimal digits and whitespace)
+NUMERIC_START = frozenset('+-.nNiI')
+
+
+def decode_string(value):
+    ''' decodes attribute values, which are always strings '''
+    return value
+
+
+def decode_number(value):
+    ''' decodes numeric attribute values (see XMLParser.decode_value) '''
+    if NUMBER.fullmatch(value) is None:
+        return XMLParser.decode_value(value)
+    if '.' in value or 'e' in value or 'E' in value:
+        decoded = float(value)
+        # numbers exceeding the float range remain strings
+        return value if math.isinf(decoded) else decoded
+    return int(value)
+
+
+def decode_boolean(value):
+    ''' decodes boolean attribute values (see XMLParser.decode_value) '''
+    if value == 'true':
+        return True
+    if value == 'false':
+        return False
+    return XMLParser.decode_value(value)
+
+
+# maximum length of the cached results of remove_control_characters
+MAX_CACHED_VALUE_LENGTH = 256
+
+
+@lru_cache(maxsize=1)
+def get_control_characters():
+    '''
+    :returns: a compiled pattern matching all characters of the Unicode \
+        categories C* (control, format, surrogate, private use and \
+        unassigned characters); it is built on first use
+    '''
+    ranges = []
+    start = None
+    for code in range(sys.maxunicode + 2):
+        is_control = code <= sys.maxunicode and \
+            unicodedata.category(chr(code))[0] == 'C'
+        if is_control and start is None:
+            start = code
+        elif not is_control and start is not None:
+            ranges.append('\\U%08x-\\U%08x' % (start, code - 1))
+            start = None
+    return re.compile('[%s]+' % ''.join(ranges))
+
+
+@lru_cache(maxsize=4096)
+def _remove_control_characters(value):
+    return get_control_characters().sub('', value)
+
+
+# namespace qualified tags and inverted (XML attribute -> key) mappings of
+# an XMLParser class (see XMLParser.get_compiled)
+CompiledParser = namedtuple('CompiledParser', [
+    'page_tag', 'sentence_tag', 'annotation_tag', 'feature_tag',
+    'relation_tag', 'attr_mapping', 'sentence_mapping', 'annotation_mapping',
+    'feature_mapping', 'relation_mapping', 'sentence_types',
+    'annotation_types'])
+
 
 class EmptySentenceException(Exception):
     pass
@@ -83,7 +163,7 @@ class JSONParserBase(object):
 
             logger.debug(json_string)
 
-            api_dict = json.loads(json_string)
+            api_dict = json_codec.loads(json_string)
         except Exception as e:
             raise MalformedJSONException(f'JSON could not be parsed: {e}') from e
         return cls.from_api_dict(api_dict)
@@ -222,13 +302,40 @@ class XMLParser(object):
     RELATION_MAPPING = {}
     DEFAULT_NAMESPACE = 'wl'
 
+    # decoders of the sentence and annotation attributes (by key); other
+    # attributes are decoded with decode_value
+    SENTENCE_TYPES = {'md5sum': decode_string,
+                      'token': decode_string,
+                      'pos': decode_string,
+                      'dependency': decode_string,
+                      'sem_orient': decode_number,
+                      'significance': decode_number,
+                      'is_title': decode_boolean}
+    ANNOTATION_TYPES = {'key': decode_string,
+                        'surfaceForm': decode_string,
+                        'annotationType': decode_string,
+                        'preferredName': decode_string,
+                        'md5sum': decode_string,
+                        'start': decode_number,
+                        'end': decode_number,
+                        'sentence': decode_number,
+                        'sem_orient': decode_number,
+                        'confidence': decode_number}
+
     @classmethod
     def get_default_ns(cls):
         return cls.SUPPORTED_NAMESPACE
 
     @classmethod
     def remove_control_characters(cls, value):
-        return ''.join(ch for ch in value if unicodedata.category(ch)[0] != 'C')
+        ''' :returns: the value without characters of the Unicode \
+            categories C* (see :func:`get_control_characters`) '''
+        # printable strings do not contain any of these characters
+        if value.isprintable():
+            return value
+        if len(value) <= MAX_CACHED_VALUE_LENGTH:
+            return _remove_control_characters(value)
+        return get_control_characters().sub('', value)
 
     @classmethod
     def encode_value(cls, value):
@@ -249,9 +356,18 @@ class XMLParser(object):
 
     @classmethod
     def decode_value(cls, value):
+        '''
+        :returns: the JSON decoded value or the value itself, if it is not \
+            valid JSON or decodes to an infinite or NaN float
+        '''
+        # most values are plain strings, which cannot be JSON
+        if not value or (value[0] not in JSON_START and
+                         value[0] not in JSON_WHITESPACE):
+            return value
         try:
-            decoded = json.loads(value)
-            if decoded in (float('inf'), float('-inf'), float('nan')):
+            decoded = json_codec.loads_value(value)
+            if isinstance(decoded, float) and \
+                    (math.isinf(decoded) or math.isnan(decoded)):
                 raise ValueError('deserializing of invalid json values')
             else:
                 return decoded
@@ -261,26 +377,37 @@ class XMLParser(object):
 
     @classmethod
     def cast_item(cls, item):
-        ''' '''
-        if item.lower() == 'true':
-            return True
-        elif item.lower() == 'false':
-            return False
-
-        try:
-            return int(item)
-        except Exception:
-            pass
+        '''
+        :returns: the boolean, int, float or JSON value of the given \
+            feature or relation value or the value itself
+        '''
+        if not item:
+            return item
+        first = item[0]
+        if first in 'tTfF':
+            lowered = item.lower()
+            if lowered == 'true':
+                return True
+            elif lowered == 'false':
+                return False
+            return item
+
+        if first in NUMERIC_START or first.isdecimal() or first.isspace():
+            try:
+                return int(item)
+            except Exception:
+                pass
 
-        try:
-            return float(item)
-        except Exception:
-            pass
+            try:
+                return float(item)
+            except Exception:
+                pass
 
-        try:
-            return json.loads(item)
-        except Exception:
-            pass
+        if first in JSON_START or first in JSON_WHITESPACE:
+            try:
+                return json_codec.loads_value(item)
+            except Exception:
+                pass
         return item
 
     @classmethod
@@ -317,9 +444,40 @@ class XMLParser(object):
             result[key] = value
         return result
 
+    @classmethod
+    @lru_cache(maxsize=None)
+    def get_compiled(cls):
+        '''
+        :returns: the :class:`CompiledParser` of this class, i.e. its tags \
+            and inverted mappings, which are computed once per class
+
+        .. note::
+            Call `get_compiled.cache_clear()` after changing the mappings \
+            of a parser class at runtime.
+        '''
+        namespace = cls.get_default_ns()
+        return CompiledParser(
+            *['{%s}%s' % (namespace, tag) for tag in
+              ('page', 'sentence', 'annotation', 'feature', 'relation')],
+            *[cls.invert_mapping(mapping) for mapping in
+              (cls.ATTR_MAPPING, cls.SENTENCE_MAPPING,
+               cls.ANNOTATION_MAPPING, cls.FEATURE_MAPPING,
+               cls.RELATION_MAPPING)],
+            cls.SENTENCE_TYPES, cls.ANNOTATION_TYPES)
+
     @classmethod
     def parse(cls, xml_content, remove_duplicates=True, raise_on_empty=True):
-        ''' '''
+        '''
+        Parses a webLyzard XML document.
+
+        :param xml_content: the XML document as string; bytes and file \
+            objects are parsed with :meth:`parse_stream`
+        :returns: a tuple of the document's attributes, sentences, title \
+            annotations, body annotations, features and relations
+        '''
+        if not isinstance(xml_content, str):
+            return cls.parse_stream(xml_content, remove_duplicates,
+                                    raise_on_empty)
         parser = etree.XMLParser(recover=True, strip_cdata=False)
         cleaned_xml_content = xml_content.replace('encoding="UTF-8"', '')
         root = etree.fromstring(cleaned_xml_content,
@@ -327,41 +485,158 @@ class XMLParser(object):
         if root is None:
             raise ValueError(u'Failed to parse root of xml-content, check if '
                              'this is valid xml: {}'.format(xml_content))
+        attributes = cls.load_page_attributes(root)
+        sentences = cls.load_sentences(
+            root, remove_duplicates=remove_duplicates, raise_on_empty=raise_on_empty)
+        return cls._get_parse_result(attributes, sentences,
+                                     cls.load_annotations(root),
+                                     cls.load_features(root),
+                                     cls.load_relations(root))
+
+    @classmethod
+    def parse_stream(cls, source, remove_duplicates=True,
+                     raise_on_empty=True):
+        '''
+        Parses a webLyzard XML document in a single pass (see
+        :meth:`iterparse`).
+
+        :param source: the XML document as bytes, string or binary file \
+            object
+        :returns: see :meth:`parse`; the result of the first page, if the \
+            source contains several pages
+        '''
+        pages = cls.iterparse(source, remove_duplicates, raise_on_empty)
         try:
-            invert_mapping = cls.invert_mapping(cls.ATTR_MAPPING)
-            attributes = cls.load_attributes(root.attrib,
-                                             mapping=invert_mapping)
+            return next(pages)
+        except StopIteration:
+            raise ValueError(u'Failed to parse root of xml-content, check if '
+                             'this is valid xml')
+        finally:
+            pages.close()
+
+    @classmethod
+    def iterparse(cls, source, remove_duplicates=True, raise_on_empty=True):
+        '''
+        Parses webLyzard XML documents with `lxml.etree.iterparse`.
+
+        Sentences, annotations, features and relations are dispatched in
+        a single pass over the document and cleared once they have been
+        processed, i.e. the memory usage does not grow with the size of
+        the document. Besides single documents, the source may contain a
+        dump of several pages (`wl:page` elements within a root element).
+
+        :param source: the XML as bytes, string or binary file object
+        :returns: a generator yielding the result of every page (see \
+            :meth:`parse`)
+        '''
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        if isinstance(source, bytes):
+            source = BytesIO(source)
+
+        compiled = cls.get_compiled()
+        page_tag = compiled.page_tag
+        sentence_tag = compiled.sentence_tag
+        annotation_tag = compiled.annotation_tag
+        feature_tag = compiled.feature_tag
+        relation_tag = compiled.relation_tag
+
+        # sentences, seen sentence ids, annotations, features and
+        # relations of the pages, which are currently parsed
+        pages = {}
+        for _, element in etree.iterparse(source, events=('end', ),
+                                          recover=True, strip_cdata=False,
+                                          huge_tree=True):
+            parent = element.getparent()
+            if parent is None or element.tag == page_tag:
+                page = pages.pop(element, None)
+                if page is None:
+                    if element.tag != page_tag:
+                        # the root element of a dump (without content of
+                        # its own)
+                        break
+                    page = ([], set(), [], {}, {})
+                sentences, _, annotations, features, relations = page
+                yield cls._get_parse_result(
+                    cls.load_page_attributes(element), sentences,
+                    annotations, features, relations)
+                element.clear()
+                if parent is not None:
+                    while element.getprevious() is not None:
+                        del parent[0]
+                continue
+
+            if parent.tag != page_tag and parent.getparent() is not None:
+                # nested deeper within the page
+                continue
+            tag = element.tag
+            if tag in (sentence_tag, annotation_tag, feature_tag,
+                       relation_tag):
+                page = pages.get(parent)
+                if page is None:
+                    page = pages[parent] = ([], set(), [], {}, {})
+            if tag == sentence_tag:
+                cls._add_sentence(page[0], page[1], element,
+                                  compiled.sentence_mapping,
+                                  remove_duplicates, raise_on_empty)
+            elif tag == annotation_tag:
+                page[2].append(cls.load_attributes(
+                    element.attrib, mapping=compiled.annotation_mapping,
+                    types=compiled.annotation_types))
+            elif tag == feature_tag:
+                cls._add_item(page[3], element, compiled.feature_mapping)
+            elif tag == relation_tag:
+                cls._add_item(page[4], element, compiled.relation_mapping)
+            element.clear()
+            while element.getprevious() is not None:
+                del parent[0]
+
+    @classmethod
+    def load_page_attributes(cls, page):
+        ''' :returns: the attributes of the given page element '''
+        try:
+            return cls.load_attributes(
+                page.attrib, mapping=cls.get_compiled().attr_mapping)
         except Exception as e:
             logger.warning('Could not process mapping %s: %s',
                            cls.ATTR_MAPPING, e)
-            attributes = {}
+            return {}
 
-        sentences = cls.load_sentences(
-            root, remove_duplicates=remove_duplicates, raise_on_empty=raise_on_empty)
-        title_sentence_ids = [sentence['md5sum'] for sentence in sentences
-                              if 'is_title' in sentence and sentence['is_title']]
+    @classmethod
+    def _get_parse_result(cls, attributes, sentences, annotations, features,
+                          relations):
+        ''' splits the annotations into title and body annotations and \
+            returns the result of :meth:`parse` '''
+        title_sentence_ids = {sentence['md5sum'] for sentence in sentences
+                              if 'is_title' in sentence and sentence['is_title']}
 
         title_annotations = []
         body_annotations = []
-        for annotation in cls.load_annotations(root):
+        for annotation in annotations:
             if 'md5sum' in annotation and annotation['md5sum'] in title_sentence_ids:
                 title_annotations.append(annotation)
             else:
                 body_annotations.append(annotation)
-
-        features = cls.load_features(root)
-        relations = cls.load_relations(root)
         return attributes, sentences, title_annotations, body_annotations, features, relations
 
     @classmethod
-    def load_attributes(cls, attributes, mapping):
+    def load_attributes(cls, attributes, mapping, types=None):
+        '''
+        :param attributes: the XML attributes
+        :param mapping: the inverted mapping of the attribute names
+        :param types: optional decoders of the (mapped) attributes; other \
+            attributes are decoded with :meth:`decode_value`
+        :returns: the decoded attributes
+        '''
         new_attributes = {}
 
         for key, value in attributes.items():
             if mapping and key in mapping:
                 key = mapping.get(key, key)
 
-            value = cls.decode_value(value)
+            decode = types.get(key) if types else None
+            value = cls.decode_value(value) if decode is None else \
+                decode(value)
 
             if not value == 'None':
                 new_attributes[key] = value
@@ -373,12 +648,13 @@ class XMLParser(object):
         ''' '''
         annotations = []
 
-        annotation_mapping = cls.invert_mapping(cls.ANNOTATION_MAPPING)
+        compiled = cls.get_compiled()
 
-        for annotation_element in root.iterfind('{%s}annotation' % cls.get_default_ns(),
+        for annotation_element in root.iterfind(compiled.annotation_tag,
                                                 namespaces=cls.DOCUMENT_NAMESPACES):
-            annotations.append(cls.load_attributes(annotation_element.attrib,
-                                                   mapping=annotation_mapping))
+            annotations.append(cls.load_attributes(
+                annotation_element.attrib, mapping=compiled.annotation_mapping,
+                types=compiled.annotation_types))
 
         return annotations
 
@@ -386,42 +662,63 @@ class XMLParser(object):
     def load_sentences(cls, root, remove_duplicates=True, raise_on_empty=False):
         ''' '''
         sentences = []
-        seen_sentences = []
+        seen_sentences = set()
 
-        sentence_mapping = cls.invert_mapping(cls.SENTENCE_MAPPING)
+        sentence_mapping = cls.get_compiled().sentence_mapping
 
-        for sent_element in root.iterfind('{%s}sentence' % cls.get_default_ns(),
+        for sent_element in root.iterfind(cls.get_compiled().sentence_tag,
                                           namespaces=cls.DOCUMENT_NAMESPACES):
-            if sent_element.text:
-                sent_value = sent_element.text.strip()
-            else:
-                sent_value = ''
-            sent_attributes = cls.load_attributes(sent_element.attrib,
-                                                  mapping=sentence_mapping)
-            sent_attributes['value'] = sent_value
-
-            if 'md5sum' in sent_attributes:
-                sent_id = sent_attributes['md5sum']
-            elif 'id' in sent_attributes:
-                sent_id = sent_attributes['id']
-                sent_attributes['md5sum'] = sent_id
-                del sent_attributes['id']
-            else:
-                sent_id = hashlib.md5(
-                    sent_value.encode('utf-8')).hexdigest()
-                sent_attributes['md5sum'] = sent_id
+            cls._add_sentence(sentences, seen_sentences, sent_element,
+                              sentence_mapping, remove_duplicates,
+                              raise_on_empty)
+        return sentences
 
-            if not sent_value:
-                logger.warning('Empty attribute for sentence %s', sent_id)
-                if raise_on_empty:
-                    raise EmptySentenceException
-            if not sent_id in seen_sentences:
-                sentences.append(sent_attributes)
+    @classmethod
+    def _add_sentence(cls, sentences, seen_sentences, sent_element,
+                      sentence_mapping, remove_duplicates, raise_on_empty):
+        ''' adds the attributes of the given sentence element '''
+        if sent_element.text:
+            sent_value = sent_element.text.strip()
+        else:
+            sent_value = ''
+        sent_attributes = cls.load_attributes(
+            sent_element.attrib, mapping=sentence_mapping,
+            types=cls.get_compiled().sentence_types)
+        sent_attributes['value'] = sent_value
+
+        if 'md5sum' in sent_attributes:
+            sent_id = sent_attributes['md5sum']
+        elif 'id' in sent_attributes:
+            sent_id = sent_attributes['id']
+            sent_attributes['md5sum'] = sent_id
+            del sent_attributes['id']
+        else:
+            sent_id = hashlib.md5(
+                sent_value.encode('utf-8')).hexdigest()
+            sent_attributes['md5sum'] = sent_id
 
-                if remove_duplicates:
-                    seen_sentences.append(sent_id)
+        if not sent_value:
+            logger.warning('Empty attribute for sentence %s', sent_id)
+            if raise_on_empty:
+                raise EmptySentenceException
+        if not sent_id in seen_sentences:
+            sentences.append(sent_attributes)
 
-        return sentences
+            if remove_duplicates:
+                seen_sentences.add(sent_id)
+
+    @classmethod
+    def _add_item(cls, items, element, mapping):
+        ''' adds the value of the given feature or relation element '''
+        attributes = cls.load_attributes(element.attrib, mapping=mapping)
+        if 'key' in attributes and attributes['key'] in items:
+            if not isinstance(items[attributes['key']], list):
+                items[attributes['key']] = [items[attributes['key']]]
+            if element.text is not None:
+                items[attributes['key']].append(
+                    cls.cast_item(element.text.strip()))
+        elif element.text is not None:
+            items[attributes['key']] = cls.cast_item(element.text.strip())
 
     @classmethod
     def load_features(cls, root):
@@ -429,21 +726,10 @@ class XMLParser(object):
         features = {}
 
         # inverse feature mapping for loading
-        feature_mapping = cls.invert_mapping(cls.FEATURE_MAPPING)
-        for feat_element in root.iterfind('{%s}feature' % cls.get_default_ns(),
+        feature_mapping = cls.get_compiled().feature_mapping
+        for feat_element in root.iterfind(cls.get_compiled().feature_tag,
                                           namespaces=cls.DOCUMENT_NAMESPACES):
-            feat_attributes = cls.load_attributes(feat_element.attrib,
-                                                  mapping=feature_mapping)
-            if 'key' in feat_attributes and feat_attributes['key'] in features:
-                if not isinstance(features[feat_attributes['key']], list):
-                    features[feat_attributes['key']] = [
-                        features[feat_attributes['key']]]
-                if feat_element.text is not None:
-                    features[feat_attributes['key']].append(
-                        cls.cast_item(feat_element.text.strip()))
-            elif feat_element.text is not None:
-                features[feat_attributes['key']] = cls.cast_item(
-                    feat_element.text.strip())
+            cls._add_item(features, feat_element, feature_mapping)
         return features
 
     @classmethod
@@ -452,21 +738,10 @@ class XMLParser(object):
         relations = {}
 
         # inverse relation mapping for loading
-        relation_mapping = cls.invert_mapping(cls.RELATION_MAPPING)
-        for rel_element in root.iterfind('{%s}relation' % cls.get_default_ns(),
+        relation_mapping = cls.get_compiled().relation_mapping
+        for rel_element in root.iterfind(cls.get_compiled().relation_tag,
                                          namespaces=cls.DOCUMENT_NAMESPACES):
-            rel_attributes = cls.load_attributes(rel_element.attrib,
-                                                 mapping=relation_mapping)
-            if 'key' in rel_attributes and rel_attributes['key'] in relations:
-                if not isinstance(relations[rel_attributes['key']], list):
-                    relations[rel_attributes['key']] = [
-                        relations[rel_attributes['key']]]
-                if rel_element.text is not None:
-                    relations[rel_attributes['key']].append(
-                        cls.cast_item(rel_element.text.strip()))
-            elif rel_element.text is not None:
-                relations[rel_attributes['key']] = cls.cast_item(
-                    rel_element.text.strip())
+            cls._add_item(relations, rel_element, relation_mapping)
         return relations
 
     @classmethod
@@ -566,9 +841,36 @@ class XMLParser(object):
     @classmethod
     def dump_xml(cls, titles, attributes, sentences, annotations=None,
                  features=None, relations=None):
-        ''' returns a webLyzard XML document '''
-        if annotations is None:
-            annotations = []
+        ''' returns a webLyzard XML document (see :meth:`write_xml`) '''
+        output = BytesIO()
+        cls.write_xml(output, titles=titles, attributes=attributes,
+                      sentences=sentences, annotations=annotations,
+                      features=features, relations=relations,
+                      pretty_print=True)
+        return output.getvalue().decode('utf-8')
+
+    @classmethod
+    def write_xml(cls, output, titles, attributes, sentences,
+                  annotations=None, features=None, relations=None,
+                  pretty_print=False):
+        '''
+        Writes a webLyzard XML document incrementally, i.e. every element
+        is written as soon as it has been produced rather than building
+        the whole document tree in memory first.
+
+        :param output: a binary file object (e.g. an open file or \
+            `socket.makefile('wb')`) or a file name; several documents \
+            may be written to the same file object
+        :param titles: the title sentences
+        :param attributes: the document attributes
+        :param sentences: an iterable of sentences
+        :param annotations: optional list of annotations or dict of \
+            annotations by annotation type
+        :param features: optional dict of features
+        :param relations: optional dict of relations
+        :param pretty_print: if set, every element is written on its own \
+            line
+        '''
         required_namespaces = cls.get_required_namespaces(attributes)
         attributes, sentences = cls.pre_xml_dump(titles=titles,
                                                  attributes=attributes,
@@ -583,136 +885,156 @@ class XMLParser(object):
             attributes = cls.clean_attributes(attributes)
         except Exception as e:
             logger.warning(e)
-        root = etree.Element('{%s}page' % cls.get_default_ns(),
-                             attrib=attributes,
-                             nsmap=required_namespaces)
 
+        # xmlfile declares a new prefix for the implicit xml namespace,
+        # unless its attributes use the reserved xml prefix
+        xml_namespace = required_namespaces.pop('xml', None)
+        if xml_namespace:
+            xml_namespace = '{%s}' % xml_namespace
+            attributes = {
+                'xml:' + key[len(xml_namespace):]
+                if key.startswith(xml_namespace) else key: value
+                for key, value in attributes.items()}
+
+        elements = chain(cls._iter_sentence_elements(sentences),
+                         cls._iter_annotation_elements(annotations),
+                         cls._iter_item_elements(
+                             features, cls.FEATURE_MAPPING,
+                             cls.get_compiled().feature_tag),
+                         cls._iter_relation_elements(relations))
+        with etree.xmlfile(output, encoding='utf-8') as xml_file:
+            with xml_file.element(cls.get_compiled().page_tag,
+                                  attrib=attributes,
+                                  nsmap=required_namespaces):
+                for tag, element_attributes, text in elements:
+                    if pretty_print:
+                        xml_file.write('\n  ')
+                    try:
+                        with xml_file.element(tag, attrib=element_attributes):
+                            for item in text:
+                                xml_file.write(item)
+                    except (TypeError, ValueError) as e:
+                        logger.warning('Skipping invalid element %s: %s',
+                                       element_attributes, e)
+                if pretty_print:
+                    xml_file.write('\n')
+        if pretty_print and hasattr(output, 'write'):
+            output.write(b'\n')
+
+    @classmethod
+    def _get_cdata(cls, value):
+        '''
+        :returns: a tuple of the CDATA section (and text) representing \
+            the given value or None, if the value cannot be represented \
+            as CDATA
+        '''
+        try:
+            value = cls.get_xml_value(value)
+            if isinstance(value, bytes):
+                value = value.decode('utf-8')
+            # lxml's xmlfile crashes on CDATA sections ending with a
+            # single "]", therefore it is written as text
+            if value.endswith(']') and not value.endswith(']]'):
+                return etree.CDATA(value[:-1]), ']'
+            return etree.CDATA(value),
+        except Exception as e:
+            logger.debug('Skipping bad cdata: %s (%s)', value, e)
+            return None
+
+    @classmethod
+    def _iter_sentence_elements(cls, sentences):
+        ''' yields the tag, attributes and content of the sentence elements '''
+        tag = cls.get_compiled().sentence_tag
         for sent in sentences:
             sent = sent.as_dict()
             assert isinstance(sent, dict), 'dict required'
-            value = sent['value']
-            del sent['value']
+            value = sent.pop('value', None)
 
             if not value:
                 continue
 
-            value = cls.get_xml_value(value)
-            sent_attributes = cls.dump_xml_attributes(attributes=sent,
-                                                      mapping=cls.SENTENCE_MAPPING)
-            sent_elem = etree.SubElement(root,
-                                         '{%s}sentence' % cls.get_default_ns(),
-                                         attrib=sent_attributes,
-                                         nsmap=required_namespaces)
-            try:
-                sent_elem.text = etree.CDATA(value)
-            except Exception as e:
-                logger.debug('Skipping bad cdata: %s (%s)', value, e)
+            value = cls._get_cdata(value)
+            if value is None:
                 continue
+            yield tag, cls.dump_xml_attributes(
+                attributes=sent, mapping=cls.SENTENCE_MAPPING), value
 
-        if annotations:
-            if isinstance(annotations, list):
-                annotations = cls.map_by_annotationtype(annotations)
-
-            # add all annotations as body annotations
-            for a_type, a_items in annotations.items():
+    @classmethod
+    def _iter_annotation_elements(cls, annotations):
+        ''' yields the tag and attributes of the annotation elements '''
+        if not annotations:
+            return
+        if isinstance(annotations, list):
+            annotations = cls.map_by_annotationtype(annotations)
+
+        tag = cls.get_compiled().annotation_tag
+        # add all annotations as body annotations
+        for a_type, a_items in annotations.items():
+
+            if a_items is None or len(a_items) == 0:
+                continue
 
-                if a_items is None or len(a_items) == 0:
+            for annotation in a_items:
+                if not isinstance(annotation, dict):
                     continue
+                for entity in annotation.get('entities', ()):
+                    entity = entity.copy()
+                    entity['annotation_type'] = a_type
+                    entity['key'] = annotation['key']
+                    preferred_name = annotation['preferredName']
+                    if not isinstance(preferred_name, str):
+                        preferred_name = preferred_name.decode('utf-8')
+                    entity['preferredName'] = preferred_name
+
+                    yield tag, cls.dump_xml_attributes(
+                        entity, mapping=cls.ANNOTATION_MAPPING), ()
 
-                for annotation in a_items:
-                    if not isinstance(annotation, dict):
-                        continue
-                    assert isinstance(annotation, dict), 'dict required'
-                    if 'entities' in annotation:
-                        for entity in annotation['entities']:
-                            entity = entity.copy()
-                            entity['annotation_type'] = a_type
-                            entity['key'] = annotation['key']
-                            preferred_name = annotation['preferredName']
-                            if not isinstance(preferred_name, str):
-                                preferred_name = preferred_name.decode('utf-8')
-                            entity['preferredName'] = preferred_name
-
-                            annotation_attributes = cls.dump_xml_attributes(
-                                entity, mapping=cls.ANNOTATION_MAPPING)
-
-                            try:
-                                etree.SubElement(
-                                        root,
-                                        f'{cls.get_default_ns()}annotation',
-                                        attrib=annotation_attributes,
-                                        nsmap=required_namespaces)
-                            except Exception as e:
-                                continue
-
-        # feature mappings if specified
-        if features is None:
-            features = {}
-        if cls.FEATURE_MAPPING and len(cls.FEATURE_MAPPING):
-            for key, items in features.items():
-                feature_attributes = cls.dump_xml_attributes({'key': key},
-                                                             mapping=cls.FEATURE_MAPPING)
-                if not isinstance(items, list):
-                    items = [items]
-
-                for value in items:
-                    try:
-                        value = cls.get_xml_value(value)
-                        feat_elem = etree.SubElement(root,
-                                                     '{%s}feature' % cls.get_default_ns(
-                                                     ),
-                                                     attrib=feature_attributes,
-                                                     nsmap={})
-                        feat_elem.text = etree.CDATA(value)
-
-                    except Exception as e:
-                        print('Skipping bad cdata: %s (%s)' % (value, e))
-                        continue
-
-        # relation mappings, if specified
-        if relations is None:
-            relations = {}
-        if cls.RELATION_MAPPING and len(cls.RELATION_MAPPING):
-            for key, items in relations.items():
-
-                rel_attributes = {'key': key}
-                rel_items = []
-
-                if isinstance(items, dict):
-                    for url, attributes in items.items():
-                        rel_attributes = {'key': key}
-                        attributes = {key: value for (
-                            key, value) in attributes.items() if key in cls.RELATION_MAPPING}
-                        rel_attributes.update(attributes)
-                        rel_items.append((rel_attributes, url))
-
-                elif isinstance(items, list):
-                    rel_items = [(rel_attributes, item)
-                                 for item in items]
-                else:
-                    rel_items = [(rel_attributes, items)]
-
-                for rel_attributes, urls in rel_items:
+    @classmethod
+    def _iter_item_elements(cls, items, mapping, tag):
+        ''' yields the tag, attributes and content of the feature elements '''
+        if not items or not mapping:
+            return
+        for key, values in items.items():
+            attributes = cls.dump_xml_attributes({'key': key},
+                                                 mapping=mapping)
+            if not isinstance(values, list):
+                values = [values]
+
+            for value in values:
+                value = cls._get_cdata(value)
+                if value is not None:
+                    yield tag, attributes, value
 
-                    rel_attributes = cls.dump_xml_attributes(rel_attributes,
-                                                             mapping=cls.RELATION_MAPPING)
-                    try:
-                        urls = cls.get_xml_value(urls)
-                        rel_elem = etree.SubElement(root,
-                                                    '{%s}relation' % cls.get_default_ns(
-                                                    ),
-                                                    attrib=rel_attributes,
-                                                    nsmap={})
-                        rel_elem.text = etree.CDATA(urls)
-
-                    except Exception as e:
-                        logger.warning('Skipping bad cdata: %s (%s)', value, e)
-                        continue
+    @classmethod
+    def _iter_relation_elements(cls, relations):
+        ''' yields the tag, attributes and content of the relation elements '''
+        if not relations or not cls.RELATION_MAPPING:
+            return
+        tag = cls.get_compiled().relation_tag
+        for key, items in relations.items():
+
+            rel_attributes = {'key': key}
+            rel_items = []
+
+            if isinstance(items, dict):
+                for url, attributes in items.items():
+                    rel_attributes = {'key': key}
+                    attributes = {key: value for (
+                        key, value) in attributes.items() if key in cls.RELATION_MAPPING}
+                    rel_attributes.update(attributes)
+                    rel_items.append((rel_attributes, url))
+
+            elif isinstance(items, list):
+                rel_items = [(rel_attributes, item)
+                             for item in items]
+            else:
+                rel_items = [(rel_attributes, items)]
 
-        return etree.tostring(root,
-                              encoding='unicode',
-                              pretty_print=True).replace("&quot;", "")  # [mig] lxml.etree returs `bytes` if encoding is NOT 'unicode'
-        # [mig] somewhere along the migration path, if run by python2, this return above contains double quotes (") and their xml counterparts (&quot;) which is very unhelpful, so we just replace them. please use python3 to not have that issue :)
+            for rel_attributes, urls in rel_items:
+                urls = cls._get_cdata(urls)
+                if urls is not None:
+                    yield tag, cls.dump_xml_attributes(
+                        rel_attributes, mapping=cls.RELATION_MAPPING), urls
 
     @classmethod
     def pre_xml_dump(cls, titles, attributes, sentences):
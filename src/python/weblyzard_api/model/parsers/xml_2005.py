@@ -6,6 +6,8 @@ Created on 07.04.2014
 @author: heinz-peterlang
 '''
 from __future__ import unicode_literals
+
+from itertools import chain
 from weblyzard_api.model.parsers import XMLParser
 
 
@@ -49,4 +51,4 @@ class XML2005(XMLParser):
         if not 'title' in attributes:
             attributes['title'] = ' '.join([t.value for t in titles])
 
-        return attributes, titles + sentences
+        return attributes, chain(titles, sentences)
@@ -6,6 +6,8 @@ Created on 07.04.2014
 @author: heinz-peterlang
 '''
 from __future__ import unicode_literals
+
+from itertools import chain
 from weblyzard_api.model.parsers import XMLParser
 from weblyzard_api.client.rdf import Namespace
 
@@ -178,4 +180,4 @@ class XML2013(XMLParser):
 
     @classmethod
     def pre_xml_dump(cls, titles, attributes, sentences):
-        return attributes, titles + sentences
+        return attributes, chain(titles, sentences)
@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Lazily materialized document partitions.
+
+:class:`LazyPartitions` keeps the raw spans (e.g. the dicts of a parsed
+JSON document) of every partition and converts them into span objects
+only when the partition is accessed for the first time. Reading a
+document's header, content or annotations therefore does not require
+converting its (potentially many thousands of) spans.
+'''
+
+
+class RawPartition(object):
+    ''' holds the raw spans of a partition, which have not been converted \
+        yet '''
+    __slots__ = ('spans', )
+
+    def __init__(self, spans):
+        self.spans = spans
+
+
+class LazyPartitions(dict):
+    '''
+    A dict of partition keys to span lists, which converts the raw spans of
+    a partition on first access.
+
+    Lookups of single partitions (`partitions[key]`, :meth:`get`,
+    :meth:`pop`, :meth:`setdefault`) only convert the requested partition;
+    methods which access all values (e.g. :meth:`items`, :meth:`values`,
+    comparisons) convert all remaining partitions. Membership tests,
+    :func:`len` and the keys never trigger a conversion.
+
+    :param partitions: a dict of partition keys to raw partitions (e.g. \
+        lists of span dicts)
+    :param factory: a callable (key, raw partition) -> partition, which \
+        converts the raw spans of the given partition
+    '''
+
+    def __init__(self, partitions=None, factory=None):
+        dict.__init__(self)
+        self.factory = factory
+        for key, spans in (partitions or {}).items():
+            dict.__setitem__(self, key, RawPartition(spans))
+
+    def _materialize(self, key):
+        spans = dict.__getitem__(self, key)
+        if type(spans) is RawPartition:
+            spans = self.factory(key, spans.spans)
+            dict.__setitem__(self, key, spans)
+        return spans
+
+    def _materialize_all(self):
+        for key in dict.keys(self):
+            self._materialize(key)
+
+    def is_materialized(self, key):
+        '''
+        :returns: True, if the given partition has already been converted
+        '''
+        return type(dict.__getitem__(self, key)) is not RawPartition
+
+    def __getitem__(self, key):
+        return self._materialize(key)
+
+    def __iter__(self):
+        # overriding __iter__ prevents dict(partitions) and
+        # {**partitions} from copying the raw partitions, since CPython then
+        # retrieves the values via __getitem__
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self._materialize(key)
+        return default
+
+    def pop(self, key, *default):
+        if key in self:
+            spans = self._materialize(key)
+            dict.__delitem__(self, key)
+            return spans
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self._materialize_all()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self._materialize(key)
+        return dict.setdefault(self, key, default)
+
+    def values(self):
+        self._materialize_all()
+        return dict.values(self)
+
+    def items(self):
+        self._materialize_all()
+        return dict.items(self)
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        self._materialize_all()
+        if isinstance(other, LazyPartitions):
+            other._materialize_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._materialize_all()
+        return dict.__repr__(self)
+
+    def __reduce__(self):
+        # pickled as plain dict, i.e. without the factory
+        return dict, (self.copy(), )
+
+    def __json__(self):
+        return self.copy()
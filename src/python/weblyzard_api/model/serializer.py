@@ -0,0 +1,454 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Compiled serializer for documents and their spans.
+
+:class:`DocumentSerializer` produces the same output as the former
+recursive implementation of `Document._dict_transform`, but dispatches on the exact type of every value (resolved once per type)
+and serializes objects based on per-class field plans (slot names and
+their mapped keys) rather than introspecting every instance.
+
+:meth:`DocumentSerializer.dump` streams the JSON representation of an
+object straight to a file (or socket file object) without building the
+intermediate dict; the output is identical to `json.dump(to_dict(obj), fp)`.
+
+.. note::
+    `_dict_transform` transforms the attribute values of objects twice,
+    which only makes a difference for tuples (a tuple with a single
+    element is replaced by this element, which is transformed by the
+    next pass only). Rather than walking the values twice, the serializer
+    keeps track of the number of passes which apply to every value.
+'''
+from datetime import datetime
+from decimal import Decimal
+from json import JSONEncoder
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+try:
+    # private, but reusing a single C encoder is considerably faster than
+    # JSONEncoder.encode, which creates one per value
+    from json.encoder import c_make_encoder
+except ImportError:
+    c_make_encoder = None
+
+from weblyzard_api.model import get_slot_names
+from weblyzard_api.model.token_partition import TokenPartition
+
+# value kinds, in the order of _dict_transform's isinstance checks
+(NONE, STR, INT, BOOL, FLOAT, DECIMAL, TUPLE, MEMORYVIEW, BYTES, DATETIME,
+ LIST, DICT, OBJECT) = range(13)
+
+# number of chunks buffered by DocumentSerializer.dump
+WRITE_BUFFER_SIZE = 8192
+
+
+def get_kind(cls):
+    ''' :returns: the kind of the values of the given class '''
+    if cls is type(None):
+        return NONE
+    if issubclass(cls, str):
+        return STR
+    if issubclass(cls, int):
+        return BOOL if issubclass(cls, bool) else INT
+    if issubclass(cls, float):
+        return FLOAT
+    for kind, types in ((DECIMAL, Decimal), (TUPLE, tuple),
+                        (MEMORYVIEW, memoryview), (BYTES, bytes),
+                        (DATETIME, datetime), (LIST, (list, TokenPartition)),
+                        (DICT, dict)):
+        if issubclass(cls, types):
+            return kind
+    return OBJECT
+
+
+def is_none(value, passes):
+    '''
+    :returns: True, if the given number of transformation passes turn \
+        the value into None
+    '''
+    while passes and isinstance(value, tuple) and len(value) == 1:
+        value, passes = value[0], passes - 1
+    return value is None
+
+
+def _iter_items(data):
+    ''' :returns: an iterator over the items of a list or TokenPartition '''
+    if type(data) is TokenPartition:
+        return data.iter_spans()
+    return data
+
+
+def float_repr(value):
+    ''' :returns: the JSON representation of a float (see json.encoder) '''
+    if value != value:
+        return 'NaN'
+    if value == float('inf'):
+        return 'Infinity'
+    if value == -float('inf'):
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+class DocumentSerializer(object):
+    '''
+    Serializes documents, spans and other objects analogous to
+    :meth:`Document._dict_transform`, i.e. with the mapping applied to
+    keys and attribute names, and `None` values removed.
+
+    :param mapping: the mapping from attribute names to serialized keys
+    '''
+    _serializers = {}
+
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        # with idempotent mappings, the repeated transformation of
+        # attribute values only affects tuples; otherwise every pass needs
+        # to be performed literally
+        self.literal = any(self.mapping.get(key, key) != key
+                           for key in self.mapping.values())
+        self._kinds = {}
+        self._plans = {}
+        self._keys = {}
+
+    @classmethod
+    def for_mapping(cls, mapping):
+        ''' :returns: the (cached) serializer for the given mapping '''
+        cache_key = tuple(mapping.items())
+        serializer = cls._serializers.get(cache_key)
+        if serializer is None:
+            serializer = cls._serializers[cache_key] = cls(mapping)
+        return serializer
+
+    def _get_kind(self, cls):
+        kind = self._kinds.get(cls)
+        if kind is None:
+            kind = self._kinds[cls] = get_kind(cls)
+        return kind
+
+    def _get_key(self, name):
+        ''' :returns: the serialized key of the given attribute or None, \
+            if the attribute is not serialized '''
+        try:
+            return self._keys[name]
+        except KeyError:
+            key = self.mapping.get(name)
+            if key is None and not name.startswith('_'):
+                key = name
+            self._keys[name] = key
+            return key
+
+    def _get_plan(self, cls):
+        '''
+        :returns: the field plan of the given class, i.e. a tuple of the \
+            (slot name, key) pairs of its serialized slots, whether the \
+            keys are unique and whether its instances have a __dict__
+        '''
+        plan = self._plans.get(cls)
+        if plan is None:
+            fields = tuple((name, self._get_key(name))
+                           for name in get_slot_names(cls)
+                           if self._get_key(name) is not None)
+            keys = [key for _, key in fields]
+            plan = self._plans[cls] = (fields, len(set(keys)) == len(keys),
+                                       cls.__dictoffset__ != 0)
+        return plan
+
+    def _get_attributes(self, obj):
+        '''
+        :returns: the object's serialized (key, value) pairs which survive \
+            the first transformation pass (compare `_dict_transform`)
+        '''
+        fields, unique, has_dict = self._get_plan(type(obj))
+        instance_dict = obj.__dict__ if has_dict else None
+        result = []
+        for name, key in fields:
+            value = getattr(obj, name, None)
+            if value is None:
+                continue
+            if key == 'lang':
+                value = value.upper()
+            if isinstance(value, tuple) and is_none(value, 1):
+                continue
+            result.append((key, value))
+        if instance_dict:
+            unique = False
+            for name, value in instance_dict.items():
+                key = self._get_key(name)
+                if key is None or value is None:
+                    continue
+                if key == 'lang':
+                    value = value.upper()
+                if isinstance(value, tuple) and is_none(value, 1):
+                    continue
+                result.append((key, value))
+        # later attributes overwrite earlier ones with the same key
+        return result if unique else list(dict(result).items())
+
+    def _get_items(self, data):
+        '''
+        :returns: the dict's (key, value) pairs with the mapping applied, \
+            which survive the first transformation pass
+        '''
+        mapping = self.mapping
+        if mapping.keys().isdisjoint(data.keys()):
+            return data.items()
+        result = {}
+        for key, value in data.items():
+            if value is not None and not is_none(value, 1):
+                result[mapping.get(key, key)] = value
+        return result.items()
+
+    def to_dict(self, data):
+        '''
+        :returns: the JSON serializable representation of `data`, which is \
+            identical to the result of `_dict_transform(data, mapping)`
+        '''
+        if self.literal:
+            return self._transform_literal(data)
+        return self._transform(data, 1)
+
+    def _transform(self, data, passes):
+        ''' :returns: the result of `passes` transformations of `data` '''
+        if not passes:
+            return data
+        cls = type(data)
+        kind = self._kinds.get(cls)
+        if kind is None:
+            kind = self._get_kind(cls)
+        if kind <= FLOAT:
+            return data
+        if kind == OBJECT:
+            # attribute values are transformed twice per pass; values
+            # which become None are only removed by subsequent passes
+            return self._transform_items(self._get_attributes(data),
+                                         passes + 1, passes == 1)
+        if kind == LIST:
+            return [self._transform(item, passes)
+                    for item in _iter_items(data)]
+        if kind == DICT:
+            return self._transform_items(self._get_items(data), passes)
+        if kind == TUPLE:
+            if len(data) == 1:
+                return self._transform(data[0], passes - 1)
+            return data
+        if kind == DECIMAL:
+            return str(data)
+        if kind == MEMORYVIEW:
+            return bytes(data).decode('utf-8')
+        if kind == BYTES:
+            return data.decode('utf-8')
+        return data.strftime('%Y-%m-%d %H:%M:%S')
+
+    def _transform_items(self, items, passes, keep_none=False):
+        ''' :returns: a dict of the transformed (key, value) pairs '''
+        result = {}
+        kinds = self._kinds
+        for key, value in items:
+            kind = kinds.get(type(value))
+            if kind is not None and kind <= FLOAT:
+                if value is not None:
+                    result[key] = value
+                continue
+            value = self._transform(value, passes)
+            if value is not None or keep_none:
+                result[key] = value
+        return result
+
+    def _transform_literal(self, data):
+        ''' a single transformation pass (used for mappings, which are \
+            not idempotent) '''
+        kind = self._get_kind(type(data))
+        if kind == OBJECT:
+            result = {}
+            fields, _, has_dict = self._get_plan(type(data))
+            attributes = [(key, getattr(data, name)) for name, key in fields
+                          if hasattr(data, name)]
+            if has_dict:
+                attributes.extend((self._get_key(name), value)
+                                  for name, value in data.__dict__.items())
+            for key, value in attributes:
+                if key is None or value is None:
+                    continue
+                if key == 'lang':
+                    value = value.upper()
+                value = self._transform_literal(value)
+                if value is not None:
+                    result[key] = self._transform_literal(value)
+            return result
+        if kind == LIST:
+            return [self._transform_literal(item)
+                    for item in _iter_items(data)]
+        if kind == DICT:
+            result = {}
+            for key, value in data.items():
+                if value is not None:
+                    value = self._transform_literal(value)
+                    if value is not None:
+                        result[self.mapping.get(key, key)] = value
+            return result
+        return self._transform(data, 1)
+
+    def dumps(self, data, ensure_ascii=True, separators=None):
+        '''
+        :returns: the JSON representation of `to_dict(data)`, which is \
+            identical to `json.dumps(to_dict(data))`
+        '''
+        chunks = []
+        _StreamEncoder(self, chunks.append, ensure_ascii,
+                       separators).encode(data)
+        return ''.join(chunks)
+
+    def dump(self, data, fp, ensure_ascii=True, separators=None):
+        '''
+        Writes the JSON representation of `to_dict(data)` to the given file
+        object without building the intermediate dict; the output is
+        identical to `json.dump(to_dict(data), fp)`.
+
+        :param data: the object to serialize
+        :param fp: a text file object (e.g. created by `socket.makefile`)
+        :param ensure_ascii: escape non-ASCII characters
+        :param separators: an optional (item separator, key separator) tuple
+        '''
+        chunks = []
+
+        def write(chunk):
+            chunks.append(chunk)
+            if len(chunks) >= WRITE_BUFFER_SIZE:
+                fp.write(''.join(chunks))
+                del chunks[:]
+
+        _StreamEncoder(self, write, ensure_ascii, separators).encode(data)
+        if chunks:
+            fp.write(''.join(chunks))
+
+
+class _StreamEncoder(object):
+    ''' encodes the transformed values straight into JSON chunks '''
+
+    def __init__(self, serializer, write, ensure_ascii=True, separators=None):
+        self.serializer = serializer
+        self.write = write
+        self.item_separator, self.key_separator = separators or (', ', ': ')
+        self.encode_string = encode_basestring_ascii if ensure_ascii \
+            else encode_basestring
+        # encodes values which are not transformed
+        self.raw_encoder = JSONEncoder(ensure_ascii=ensure_ascii,
+                                       separators=separators)
+        self.encode_value = self._make_value_encoder() or \
+            self.raw_encoder.encode
+
+    def _make_value_encoder(self):
+        ''' :returns: a function encoding single values with a reused C \
+            encoder (compare JSONEncoder.iterencode) or None, if the C \
+            encoder is not available '''
+        if c_make_encoder is None:
+            return None
+        try:
+            encoder = c_make_encoder(
+                None, self.raw_encoder.default, self.encode_string, None,
+                self.key_separator, self.item_separator, False, False, True)
+        except TypeError:
+            # the signature of the private function has changed
+            return None
+        return lambda value: ''.join(encoder(value, 0))
+
+    def encode(self, data):
+        if self.serializer.literal:
+            self._encode(self.serializer.to_dict(data), 0)
+        else:
+            self._encode(data, 1)
+
+    def _encode_key(self, key):
+        if isinstance(key, str):
+            return self.encode_string(key)
+        if key is True:
+            return '"true"'
+        if key is False:
+            return '"false"'
+        if key is None:
+            return '"null"'
+        if isinstance(key, float):
+            return '"%s"' % float_repr(key)
+        if isinstance(key, int):
+            return '"%s"' % int.__repr__(key)
+        raise TypeError('keys must be str, int, float, bool or None, '
+                        'not %s' % key.__class__.__name__)
+
+    def _encode_items(self, items, passes):
+        ''' encodes (key, value) pairs, whose values are transformed \
+            `passes` times, as JSON object '''
+        write = self.write
+        encode_string = self.encode_string
+        kinds = self.serializer._kinds
+        separator = None
+        for key, value in items:
+            if separator is None:
+                write('{')
+                separator = self.item_separator
+            else:
+                write(separator)
+            write(encode_string(key) if type(key) is str
+                  else self._encode_key(key))
+            write(self.key_separator)
+            kind = kinds.get(type(value))
+            if kind == STR:
+                write(encode_string(value))
+            elif kind == INT:
+                write(int.__repr__(value))
+            else:
+                self._encode(value, passes)
+        write('{}' if separator is None else '}')
+
+    def _encode(self, data, passes):
+        ''' encodes the result of `passes` transformations of `data` '''
+        write = self.write
+        if not passes:
+            for chunk in self.raw_encoder.iterencode(data):
+                write(chunk)
+            return
+        serializer = self.serializer
+        cls = type(data)
+        kind = serializer._kinds.get(cls)
+        if kind is None:
+            kind = serializer._get_kind(cls)
+        if kind == STR:
+            write(self.encode_string(data))
+        elif kind == INT:
+            write(int.__repr__(data))
+        elif kind == OBJECT:
+            attributes = serializer._get_attributes(data)
+            if passes == 1:
+                self._encode_items(attributes, 2)
+            else:
+                self._encode_items(((key, value) for key, value in attributes
+                                    if not is_none(value, passes + 1)),
+                                   passes + 1)
+        elif kind == LIST:
+            # list items (e.g. spans) are transformed one at a time and
+            # encoded by the json module's C encoder
+            transform = serializer._transform
+            encode = self.encode_value
+            separator = None
+            for item in _iter_items(data):
+                if separator is None:
+                    write('[')
+                    separator = self.item_separator
+                else:
+                    write(separator)
+                write(encode(transform(item, passes)))
+            write('[]' if separator is None else ']')
+        elif kind == DICT:
+            self._encode_items(((key, value) for key, value
+                                in serializer._get_items(data)
+                                if not is_none(value, passes)), passes)
+        elif kind == NONE:
+            write('null')
+        elif kind == FLOAT:
+            write(float_repr(data))
+        elif kind == BOOL:
+            write('true' if data else 'false')
+        elif kind == TUPLE:
+            self._encode(data[0] if len(data) == 1 else data,
+                         passes - 1 if len(data) == 1 else 0)
+        else:
+            self._encode(serializer._transform(data, 1), 1)
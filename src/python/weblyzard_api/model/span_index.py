@@ -0,0 +1,230 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Sorted interval index over the spans of a document partition.
+
+The :class:`SpanIndex` keeps the spans' start and end offsets sorted by
+start together with the running maximum of the end offsets, so that
+overlap, containment and point queries only require two binary searches
+and a scan over the candidate spans. :meth:`SpanIndex.iter_overlaps`
+answers the overlap queries for a sorted list of spans (e.g. all sentences
+of a document) in a single sweep.
+
+:meth:`SpanIndex.get_first_overlaps` and :meth:`SpanIndex.get_containing`
+align whole lists of ranges or positions (e.g. the annotations of a
+document) with the spans at once; they use `numpy.searchsorted`, if the
+optional `numpy` package is installed and the input is large enough.
+'''
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# minimum number of queries, for which the numpy implementation is used
+NUMPY_MIN_QUERIES = 64
+
+
+class SpanIndex(object):
+    '''
+    Answers overlap, containment and point queries for a list of spans.
+
+    Results are returned in the order of the original span list.
+
+    :param spans: a list of :class:`~weblyzard_api.model.CharSpan` objects
+    :param starts: optional list of the spans' start offsets
+    :param ends: optional list of the spans' end offsets
+    '''
+
+    def __init__(self, spans, starts=None, ends=None):
+        self.spans = spans
+        if starts is None:
+            starts = [span.start for span in spans]
+        if ends is None:
+            ends = [span.end for span in spans]
+        self._order = sorted(range(len(spans)), key=starts.__getitem__)
+        self._starts = [starts[i] for i in self._order]
+        self._ends = [ends[i] for i in self._order]
+        # running maximum of the end offsets; spans starting before a
+        # position can only contain it, if this maximum exceeds it
+        self._max_ends = []
+        max_end = None
+        for end in self._ends:
+            max_end = end if max_end is None or end > max_end else max_end
+            self._max_ends.append(max_end)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def _use_numpy(self, queries):
+        return numpy is not None and (isinstance(queries, numpy.ndarray) or
+                                      len(queries) >= NUMPY_MIN_QUERIES)
+
+    def _get_arrays(self):
+        ''' :returns: the (cached) sorted columns as numpy arrays, padded \
+            with a sentinel for positions after the last span '''
+        arrays = self.__dict__.get('_arrays')
+        if arrays is None:
+            sentinel = numpy.iinfo(numpy.int64).max
+            arrays = self._arrays = tuple(
+                numpy.array(column + [sentinel], dtype=numpy.int64)
+                for column in (self._starts, self._ends, self._max_ends)) + (
+                    numpy.array(self._order + [-1], dtype=numpy.int64),)
+        return arrays
+
+    def _get_spans(self, positions):
+        ''' :returns: the spans at the given positions of the sorted index \
+            in their original order '''
+        return [self.spans[i] for i in sorted(self._order[pos]
+                                              for pos in positions)]
+
+    def _containing(self, position):
+        ''' :returns: the sorted index positions of the spans starting at \
+            or before `position` and ending after it '''
+        end = bisect_right(self._starts, position)
+        start = bisect_right(self._max_ends, position, 0, end)
+        return [pos for pos in range(start, end)
+                if self._ends[pos] > position]
+
+    def get_at(self, position):
+        '''
+        :param position: a character offset
+        :returns: all spans containing the given offset (start <= \
+            position < end)
+        '''
+        return self._get_spans(self._containing(position))
+
+    def get_overlaps(self, start, end):
+        '''
+        :returns: all spans overlapping [start, end), i.e. spans which \
+            start within the given range or contain its start (compare \
+            :meth:`Document.overlapping`)
+        '''
+        positions = set(self._containing(start))
+        positions.update(range(bisect_left(self._starts, start),
+                               bisect_left(self._starts, end)))
+        return self._get_spans(positions)
+
+    def iter_overlaps(self, search_spans):
+        '''
+        Sweeps over the search spans and yields the spans overlapping each
+        of them (see :meth:`get_overlaps`).
+
+        :param search_spans: an iterable of spans sorted by their start
+        :raises ValueError: if the search spans are not sorted
+        '''
+        starts, ends = self._starts, self._ends
+        size = len(starts)
+        # spans starting before the current search span, which may still
+        # contain its start
+        active = []
+        pos = 0
+        last_start = None
+        for search_span in search_spans:
+            start, end = search_span.start, search_span.end
+            if last_start is not None and start < last_start:
+                raise ValueError('Search spans need to be sorted by start')
+            last_start = start
+
+            while pos < size and starts[pos] < start:
+                active.append(pos)
+                pos += 1
+            active = [p for p in active if ends[p] > start]
+
+            positions = list(active)
+            p = pos
+            while p < size and (starts[p] < end or starts[p] == start):
+                if starts[p] < end or ends[p] > start:
+                    positions.append(p)
+                p += 1
+            yield self._get_spans(positions)
+
+    def get_contained(self, start, end):
+        '''
+        :returns: all spans lying within [start, end)
+        '''
+        return self._get_spans(
+            pos for pos in range(bisect_left(self._starts, start),
+                                 bisect_right(self._starts, end))
+            if self._ends[pos] <= end)
+
+    def get_first_overlaps(self, starts, ends):
+        '''
+        Aligns a list of ranges with the spans.
+
+        :param starts: a list or array of the ranges' start offsets
+        :param ends: a list or array of the ranges' end offsets
+        :returns: for every range [start, end) the index (in the original \
+            span list) of the overlapping span with the smallest start or \
+            -1, if no span overlaps the range (compare :meth:`get_overlaps`)
+        '''
+        size = len(self._starts)
+        if self._use_numpy(starts):
+            sorted_starts, _, max_ends, order = self._get_arrays()
+            starts = numpy.asarray(starts, dtype=numpy.int64)
+            ends = numpy.asarray(ends, dtype=numpy.int64)
+            # the first span ending after the start contains the start, if
+            # it does not start after it
+            containing = numpy.searchsorted(max_ends[:size], starts, 'right')
+            containing[sorted_starts[containing] > starts] = size
+            # otherwise, the first span starting within the range
+            within = numpy.searchsorted(sorted_starts[:size], starts, 'left')
+            within[sorted_starts[within] >= ends] = size
+            return order[numpy.minimum(containing, within)].tolist()
+
+        sorted_starts, max_ends, order = self._starts, self._max_ends, \
+            self._order
+        result = []
+        for start, end in zip(starts, ends):
+            pos = bisect_right(max_ends, start)
+            if pos == size or sorted_starts[pos] > start:
+                pos = bisect_left(sorted_starts, start)
+                if pos == size or sorted_starts[pos] >= end:
+                    result.append(-1)
+                    continue
+            else:
+                # an empty span at the start precedes the containing span
+                within = bisect_left(sorted_starts, start, 0, pos)
+                if within < pos and sorted_starts[within] < end:
+                    pos = within
+            result.append(order[pos])
+        return result
+
+    def _get_containing(self, position):
+        ''' :returns: the sorted index position of the last span starting \
+            at or before `position` and containing it or -1 '''
+        pos = bisect_right(self._starts, position) - 1
+        while pos >= 0 and self._max_ends[pos] > position:
+            if self._ends[pos] > position:
+                return pos
+            pos -= 1
+        return -1
+
+    def get_containing(self, positions):
+        '''
+        Aligns a list of character offsets with the spans.
+
+        :param positions: a list or array of character offsets
+        :returns: for every position the index (in the original span \
+            list) of the span with the largest start, which contains the \
+            position, or -1, if no span contains it (compare :meth:`get_at`)
+        '''
+        order = self._order
+        if not self._use_numpy(positions):
+            result = []
+            for position in positions:
+                pos = self._get_containing(position)
+                result.append(-1 if pos < 0 else order[pos])
+            return result
+
+        sorted_starts, sorted_ends, max_ends, order = self._get_arrays()
+        positions = numpy.asarray(positions, dtype=numpy.int64)
+        pos = numpy.searchsorted(sorted_starts[:-1], positions, 'right') - 1
+        # pos == -1 selects the sentinels
+        result = numpy.where(sorted_ends[pos] > positions, pos, -1)
+        # spans nested in a longer span, which contains the position
+        for i in numpy.flatnonzero((result < 0) & (pos >= 0) &
+                                   (max_ends[pos] > positions)):
+            result[i] = self._get_containing(int(positions[i]))
+        return order[result].tolist()
@@ -0,0 +1,454 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Columnar storage of a document's TOKEN partition.
+
+A :class:`TokenPartition` stores the tokens' offsets, POS tags and
+dependencies in compact arrays rather than as one
+:class:`~weblyzard_api.model.TokenCharSpan` object (plus dependency dict)
+per token. POS tags and dependency labels are interned, i.e. stored as
+codes into a shared value table.
+
+The partition behaves like a list of spans: indexing and iterating
+returns :class:`TokenSpanView` objects, i.e. TokenCharSpan objects whose
+attributes are read from and written to the partition's columns. Changes
+to a token (including in-place changes of its dependency dict) are
+therefore reflected in the partition. A partition returns the same view
+for a token as long as the view is referenced; views follow their token,
+if tokens are inserted or deleted before it, and keep a copy of their
+values once their token has been replaced or deleted.
+
+Spans which do not fit into the columns (e.g. other span types or
+subclasses of TokenCharSpan) are stored as they are.
+
+.. note::
+    A TokenPartition is a :class:`~collections.abc.MutableSequence`, not
+    a `list` subclass; use `isinstance(spans, Sequence)` rather than
+    `isinstance(spans, list)`.
+'''
+from array import array
+from collections.abc import MutableSequence, Sequence
+from weakref import WeakValueDictionary
+
+from weblyzard_api.model import CharSpan, TokenCharSpan
+
+# dependency label code of tokens without dependency
+NO_DEPENDENCY = 0xFFFF
+MAX_CODES = NO_DEPENDENCY
+DEPENDENCY_KEYS = ['parent', 'label']
+
+
+# attributes of a token and the slot storing them in detached views
+VIEW_FIELDS = {'span_type': CharSpan.span_type,
+               'start': CharSpan.start,
+               'end': CharSpan.end,
+               'pos': TokenCharSpan.pos,
+               'dependency': TokenCharSpan.dependency}
+
+
+class DependencyView(dict):
+    '''
+    The dependency dict of a :class:`TokenSpanView`; changes are written
+    back to the token.
+    '''
+    __slots__ = ('_token', )
+
+    def __init__(self, token, dependency):
+        dict.__init__(self, dependency)
+        self._token = token
+
+    def __reduce__(self):
+        return dict, (dict(self), )
+
+
+def _write_back(name):
+    method = getattr(dict, name)
+
+    def write_back(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._token.dependency = dict(self)
+        return result
+    write_back.__name__ = name
+    return write_back
+
+
+for _name in ('__setitem__', '__delitem__', '__ior__', 'clear', 'pop',
+              'popitem', 'setdefault', 'update'):
+    setattr(DependencyView, _name, _write_back(_name))
+
+
+def _new_token_span(state):
+    ''' unpickles a :class:`TokenSpanView` as TokenCharSpan '''
+    span = TokenCharSpan.__new__(TokenCharSpan)
+    span.__setstate__(state)
+    return span
+
+
+def _view_property(name):
+    slot = VIEW_FIELDS[name]
+
+    def get(self):
+        partition = self._partition
+        if partition is None:
+            return slot.__get__(self)
+        return partition._get_field(self._index, name, self)
+
+    def set(self, value):
+        partition = self._partition
+        if partition is None:
+            slot.__set__(self, value)
+        else:
+            partition._set_field(self._index, name, value)
+    return property(get, set)
+
+
+class TokenSpanView(TokenCharSpan):
+    '''
+    A token of a :class:`TokenPartition`, whose attributes are stored in
+    the partition.
+    '''
+    __slots__ = ('_partition', '_index', '__weakref__')
+
+    span_type = _view_property('span_type')
+    start = _view_property('start')
+    end = _view_property('end')
+    pos = _view_property('pos')
+    dependency = _view_property('dependency')
+
+    def __init__(self, partition, index):
+        self._partition = partition
+        self._index = index
+
+    def _detach(self, span):
+        ''' stores the values of the given span in the view itself '''
+        for name, slot in VIEW_FIELDS.items():
+            slot.__set__(self, getattr(span, name, None))
+        self._partition = None
+
+    def copy(self):
+        ''' :returns: a TokenCharSpan with the view's values '''
+        span = TokenCharSpan.__new__(TokenCharSpan)
+        for name, slot in VIEW_FIELDS.items():
+            value = getattr(self, name)
+            slot.__set__(span, dict(value) if isinstance(
+                value, DependencyView) else value)
+        return span
+
+    def __reduce_ex__(self, protocol):
+        return _new_token_span, (self.copy().__getstate__(), )
+
+
+class TokenPartition(MutableSequence):
+    '''
+    A list of token spans backed by arrays.
+
+    :param spans: an optional iterable of spans
+    '''
+
+    def __init__(self, spans=()):
+        self._starts = array('i')
+        self._ends = array('i')
+        self._pos = array('H')
+        self._parents = array('i')
+        self._labels = array('H')
+        # interned POS tags and dependency labels
+        self._values = []
+        self._codes = {}
+        # spans which cannot be stored in the columns, by index
+        self._objects = {}
+        # views handed out, by index
+        self._views = WeakValueDictionary()
+        self.extend(spans)
+
+    def _get_code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            if len(self._values) >= MAX_CODES:
+                return None
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def _encode(self, span):
+        ''' :returns: the column values of the given span or None, if the \
+            span cannot be stored in the columns '''
+        try:
+            if type(span) not in (TokenCharSpan, TokenSpanView) or \
+                    span.span_type != TokenCharSpan.SPAN_TYPE or \
+                    not isinstance(span.pos, str):
+                return None
+            dependency = span.dependency
+            start, end = span.start, span.end
+        except AttributeError:
+            # unset attributes
+            return None
+        if dependency is None:
+            parent, label = 0, NO_DEPENDENCY
+        elif isinstance(dependency, dict) and \
+                list(dependency) == DEPENDENCY_KEYS and \
+                type(dependency['parent']) is int and \
+                (dependency['label'] is None or
+                 isinstance(dependency['label'], str)):
+            parent = dependency['parent']
+            label = self._get_code(dependency['label'])
+        else:
+            return None
+        pos = self._get_code(span.pos)
+        if label is None or pos is None:
+            return None
+        values = (start, end, pos, parent, label)
+        try:
+            # check whether the values fit into the columns
+            array('i', values[:2] + values[3:4])
+        except (TypeError, OverflowError):
+            return None
+        return values
+
+    def _decode(self, index):
+        view = self._views.get(index)
+        if view is not None:
+            return view
+        obj = self._objects.get(index)
+        if obj is not None or index in self._objects:
+            return obj
+        view = self._views[index] = TokenSpanView(self, index)
+        return view
+
+    def _get_span(self, index):
+        ''' :returns: a TokenCharSpan with the column values of the token '''
+        label = self._labels[index]
+        dependency = None if label == NO_DEPENDENCY else {
+            'parent': self._parents[index], 'label': self._values[label]}
+        return TokenCharSpan(start=self._starts[index],
+                             end=self._ends[index],
+                             pos=self._values[self._pos[index]],
+                             dependency=dependency)
+
+    def _get_field(self, index, name, view):
+        ''' :returns: the given attribute of the token at the index '''
+        obj = self._objects.get(index)
+        if obj is not None or index in self._objects:
+            return getattr(obj, name)
+        if name == 'start':
+            return self._starts[index]
+        if name == 'end':
+            return self._ends[index]
+        if name == 'pos':
+            return self._values[self._pos[index]]
+        if name == 'span_type':
+            return TokenCharSpan.SPAN_TYPE
+        label = self._labels[index]
+        if label == NO_DEPENDENCY:
+            return None
+        return DependencyView(view, {'parent': self._parents[index],
+                                     'label': self._values[label]})
+
+    def _set_field(self, index, name, value):
+        ''' sets the given attribute of the token at the index '''
+        if isinstance(value, DependencyView):
+            value = dict(value)
+        obj = self._objects.get(index)
+        if obj is None and index not in self._objects:
+            obj = self._get_span(index)
+        setattr(obj, name, value)
+        self._store(index, obj)
+
+    def _detach(self, index):
+        ''' detaches the view of the token at the index from the partition '''
+        view = self._views.pop(index, None)
+        if view is not None:
+            view._detach(self._decode_span(index))
+
+    def _decode_span(self, index):
+        obj = self._objects.get(index)
+        if obj is not None or index in self._objects:
+            return obj
+        return self._get_span(index)
+
+    def _store(self, index, span):
+        ''' writes the span to the columns at the given index '''
+        if isinstance(span, TokenSpanView):
+            if span._partition is self and span._index == index:
+                return
+            span = span.copy()
+        values = self._encode(span)
+        if values is None:
+            self._objects[index] = span
+            values = (0, 0, 0, 0, NO_DEPENDENCY)
+        else:
+            self._objects.pop(index, None)
+        for column, value in zip(self._columns(), values):
+            column[index] = value
+
+    def _columns(self):
+        return (self._starts, self._ends, self._pos, self._parents,
+                self._labels)
+
+    def _normalize_index(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('TokenPartition index out of range')
+        return index
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(len(self)))]
+        return self._decode(self._normalize_index(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._decode(index)
+
+    def iter_spans(self):
+        '''
+        :returns: an iterator over read-only snapshots of the tokens, \
+            which is faster than iterating over the (writable) views
+        '''
+        for index in range(len(self)):
+            yield self._decode_span(index)
+
+    def __setitem__(self, index, span):
+        if isinstance(index, slice):
+            spans = list(self)
+            spans[index] = span
+            self.clear()
+            self.extend(spans)
+            return
+        index = self._normalize_index(index)
+        if not (isinstance(span, TokenSpanView) and
+                span._partition is self and span._index == index):
+            self._detach(index)
+        self._store(index, span)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            spans = list(self)
+            del spans[index]
+            self.clear()
+            self.extend(spans)
+            return
+        index = self._normalize_index(index)
+        self._detach(index)
+        for column in self._columns():
+            del column[index]
+        self._shift_objects(index, -1)
+
+    def _shift_objects(self, index, offset):
+        ''' moves the stored objects and views at or after `index` by \
+            `offset` '''
+        self._objects = {i + offset if i >= index else i: obj
+                         for i, obj in self._objects.items() if i != index or
+                         offset > 0}
+        views = WeakValueDictionary()
+        for i, view in list(self._views.items()):
+            if i >= index:
+                i = view._index = i + offset
+            views[i] = view
+        self._views = views
+
+    def insert(self, index, span):
+        size = len(self)
+        if index < 0:
+            index = max(0, index + size)
+        index = min(index, size)
+        if index < size:
+            self._shift_objects(index, 1)
+        for column in self._columns():
+            column.insert(index, 0)
+        self._store(index, span)
+
+    def append(self, span):
+        self.insert(len(self), span)
+
+    def clear(self):
+        for index in list(self._views.keys()):
+            self._detach(index)
+        for column in self._columns():
+            del column[:]
+        self._objects = {}
+
+    @classmethod
+    def from_columns(cls, starts, ends, pos, parents, labels, values):
+        '''
+        Creates a partition from its columns (see :meth:`get_columns`).
+
+        :param starts: array('i') of start offsets
+        :param ends: array('i') of end offsets
+        :param pos: array('H') of POS tag codes
+        :param parents: array('i') of dependency parents
+        :param labels: array('H') of dependency label codes
+        :param values: the list of POS tags and labels referenced by the \
+            codes
+        '''
+        partition = cls()
+        partition._starts, partition._ends = starts, ends
+        partition._pos, partition._parents = pos, parents
+        partition._labels = labels
+        partition._values = list(values)
+        partition._codes = {value: code for code, value
+                            in enumerate(partition._values)}
+        return partition
+
+    def get_columns(self):
+        '''
+        :returns: a tuple of the columns (starts, ends, pos, parents, \
+            labels) and the value list, or None, if the partition contains \
+            spans which are not stored in the columns
+        '''
+        if self._objects:
+            return None
+        return self._columns(), self._values
+
+    def get_offsets(self):
+        ''' :returns: a tuple of the spans' start and end offsets '''
+        starts, ends = list(self._starts), list(self._ends)
+        for index, span in self._objects.items():
+            starts[index], ends[index] = span.start, span.end
+        return starts, ends
+
+    def get_pos(self, indices):
+        '''
+        :param indices: a list of token indices
+        :returns: the POS tags of the given tokens (None for index -1)
+        '''
+        values, pos, objects = self._values, self._pos, self._objects
+        result = []
+        for index in indices:
+            if index < 0:
+                result.append(None)
+            elif index in objects:
+                result.append(getattr(objects[index], 'pos', None))
+            else:
+                result.append(values[pos[index]])
+        return result
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and \
+            all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_views']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = WeakValueDictionary()
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __json__(self):
+        return list(self.iter_spans())
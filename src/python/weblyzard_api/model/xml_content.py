@@ -20,13 +20,13 @@ Remove functions:
 from __future__ import unicode_literals
 from builtins import str
 from builtins import object
-import json
 
 from weblyzard_api.model.parsers.xml_deprecated import XMLDeprecated
 from weblyzard_api.model.parsers.xml_2005 import XML2005
 from weblyzard_api.model.parsers.xml_2013 import XML2013
 from weblyzard_api.model.parsers import EmptySentenceException
 from weblyzard_api.model import Sentence, Annotation
+from weblyzard_api.util import json_codec
 
 SENTENCE_ATTRIBUTES = ('pos_tags', 'sem_orient', 'significance', 'md5sum',
                        'pos', 'token', 'dependency')
@@ -157,6 +157,40 @@ class XMLContent(object):
         if not xml_version:
             xml_version = self.xml_version
 
+        return self.SUPPORTED_XML_VERSIONS[xml_version].dump_xml(
+            **self._get_dump_arguments(annotations=annotations,
+                                       features=features,
+                                       relations=relations,
+                                       ignore_title=ignore_title))
+
+    def write_xml_document(self, output, annotations=None, features=None,
+                           relations=None, ignore_title=False,
+                           xml_version=XML2013.VERSION, pretty_print=False):
+        '''
+        Writes the XML representation of the document incrementally to
+        the given output (see :meth:`XMLParser.write_xml`).
+
+        :param output: a binary file object or a file name
+        :param annotations, optionally
+        :param features, optionally to overwrite
+        :param relations, optionally to overwrite
+        :param ignore_title: if set, the title sentences are omitted
+        :param xml_version: version of the webLyzard XML format to use (XML2005.VERSION, *XML2013.VERSION*)
+        :param pretty_print: if set, every element is written on its own line
+        '''
+        if not xml_version:
+            xml_version = self.xml_version
+
+        self.SUPPORTED_XML_VERSIONS[xml_version].write_xml(
+            output, pretty_print=pretty_print,
+            **self._get_dump_arguments(annotations=annotations,
+                                       features=features,
+                                       relations=relations,
+                                       ignore_title=ignore_title))
+
+    def _get_dump_arguments(self, annotations, features, relations,
+                            ignore_title):
+        ''' :returns: the arguments of XMLParser.dump_xml for this document '''
         if not hasattr(self, 'features'):
             self.features = {}
         if features is None:
@@ -171,12 +205,12 @@ class XMLContent(object):
         if ignore_title:
             titles = []
 
-        return self.SUPPORTED_XML_VERSIONS[xml_version].dump_xml(titles=titles,
-                                                                 attributes=self.attributes,
-                                                                 sentences=self.sentences,
-                                                                 annotations=annotations,
-                                                                 features=features,
-                                                                 relations=relations)
+        return {'titles': titles,
+                'attributes': self.attributes,
+                'sentences': self.sentences,
+                'annotations': annotations,
+                'features': features,
+                'relations': relations}
 
     def get_plain_text(self, include_title=False):
         ''' :returns: the plain text of the XML content '''
@@ -351,7 +385,8 @@ class XMLContent(object):
         :returns: A JSON string.
         :rtype: str
         '''
-        return json.dumps(self.to_api_dict(version=version))
+        return json_codec.dumps(self.to_api_dict(version=version),
+                                compatible=True)
 
     def _get_attribute(self, attr_name):
         ''' ::returns: the attribute for the given name '''
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the memory mapped binary corpus.
+'''
+import os
+import shutil
+import tempfile
+import unittest
+
+from weblyzard_api.model.binary_corpus import BinaryCorpus, write_corpus
+from weblyzard_api.model.document import Document
+from weblyzard_api.tests.always_run.model.test_json2018 import (
+    TestJSON2018Parser)
+
+
+def get_document(content_id):
+    return Document(
+        content_id=content_id, content='Ünïcode text %d.' % content_id,
+        content_type='text/plain', lang='de', nilsimsa='abc',
+        header={'title': 'Text %d' % content_id},
+        partitions={
+            'TOKEN': [{'@type': 'TokenCharSpan', 'start': 0, 'end': 7,
+                       'pos': 'NN', 'dependency': {'parent': -1,
+                                                   'label': 'ROOT'}},
+                      {'@type': 'TokenCharSpan', 'start': 8, 'end': 12,
+                       'pos': 'NN'}],
+            'SENTENCE': [{'@type': 'SentenceCharSpan', 'start': 0, 'end': 15,
+                          'id': 'md5', 'semOrient': -0.5}],
+            'LAYOUT': [],
+            'TITLE': [{'@type': 'CharSpan', 'start': 0, 'end': 2 ** 40}]},
+        annotations=[{'annotationType': 'Location', 'start': 0, 'end': 7,
+                      'key': 'http://x.org/%d' % content_id}])
+
+
+class TestBinaryCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'corpus.wlc')
+        self.documents = [get_document(content_id) for content_id
+                          in (-5, 0, 3, 17, 2 ** 40, 1000)]
+        self.documents.append(Document.from_json(
+            TestJSON2018Parser.JSON_2018))
+        assert write_corpus(self.path, self.documents) == 7
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_random_access(self):
+        with BinaryCorpus(self.path) as corpus:
+            assert len(corpus) == 7
+            for document in reversed(self.documents):
+                loaded = corpus[document.content_id]
+                assert loaded.to_dict() == \
+                    Document.from_json(document.to_json()).to_dict()
+            assert 4 not in corpus and '3' not in corpus and 17 in corpus
+            with self.assertRaises(KeyError):
+                corpus.get_document(4)
+            assert corpus.get(4) is None
+            assert corpus.get_content(17) == 'Ünïcode text 17.'
+            assert bytes(corpus.get_content_bytes(17)[:3]) == 'Ün'.encode()
+
+    def test_lazy_partitions(self):
+        with BinaryCorpus(self.path) as corpus:
+            document = corpus[3]
+        # the partitions are decoded on access (after closing the corpus)
+        assert not document.partitions.is_materialized('TOKEN')
+        tokens = document.partitions['TOKEN']
+        assert tokens[0].dependency == {'parent': -1, 'label': 'ROOT'}
+        assert document.partitions['SENTENCE'][0].sem_orient == -0.5
+        assert document.partitions['TITLE'][0].end == 2 ** 40
+
+    def test_sequential_scan(self):
+        with BinaryCorpus(self.path) as corpus:
+            assert list(corpus.iter_content_ids()) == \
+                [document.content_id for document in self.documents]
+            assert [document.to_dict() for document in corpus] == \
+                [Document.from_json(document.to_json()).to_dict()
+                 for document in self.documents]
+
+    def test_content_views(self):
+        corpus = BinaryCorpus(self.path)
+        content = corpus.get_content_bytes(17)
+        # the view remains valid after closing the corpus
+        corpus.close()
+        assert bytes(content) == 'Ünïcode text 17.'.encode('utf-8')
+        content.release()
+        corpus.close()
+
+    def test_index_ids(self):
+
+        class ContentId(object):
+            ''' an integer type such as numpy.int64 '''
+
+            def __index__(self):
+                return 17
+
+        with BinaryCorpus(self.path) as corpus:
+            assert ContentId() in corpus
+            assert corpus[ContentId()].content_id == 17
+
+    def test_invalid_corpus(self):
+        # failed writes keep the existing corpus
+        invalid = get_document(2)
+        invalid.content_id = 'abc'
+        for documents in ([get_document(1), get_document(1)],
+                          [get_document(1), invalid]):
+            with self.assertRaises(ValueError):
+                write_corpus(self.path, documents)
+            assert os.listdir(self.directory) == ['corpus.wlc']
+            with BinaryCorpus(self.path) as corpus:
+                assert len(corpus) == 7
+
+        with open(self.path, 'wb') as fp:
+            fp.write(b'not a corpus' * 10)
+        with self.assertRaises(ValueError):
+            BinaryCorpus(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,11 +6,14 @@ Created on September 11, 2019
 @author: jakob <jakob.steixner@modul.ac.at>
 '''
 
+import json
+import pickle
 import unittest
 import pytest
 
 from weblyzard_api.model import SpanFactory, CharSpan, TokenCharSpan, \
-    SentimentCharSpan, SentenceCharSpan
+    SentimentCharSpan, SentenceCharSpan, Sentence, Annotation, get_attributes
+from weblyzard_api.model.document import Document
 
 
 class TestSpanFactory(unittest.TestCase):
@@ -48,3 +51,72 @@ class TestSpanFactory(unittest.TestCase):
         assert not hasattr(sentence_span, 'id')
         assert getattr(sentence_span, 'md5sum', None)
         assert sentence_span.md5sum == dict_sentence_span['id']
+
+
+class TestSlots(unittest.TestCase):
+
+    def setUp(self):
+        self.spans = [
+            CharSpan(start=0, end=5),
+            TokenCharSpan(start=0, end=3, pos='NN',
+                          dependency={'parent': -1, 'label': 'ROOT'}),
+            SentenceCharSpan(start=0, end=5, md5sum='abc', sem_orient=0.5),
+            SentimentCharSpan(start=1, end=2, value=-1.0, modality='neg')]
+        self.sentence = Sentence(md5sum='abc', pos='DT NN', token='0,3 4,9',
+                                 value='The text', is_title=True)
+        self.annotation = Annotation(annotation_type='Person', start=0, end=3,
+                                     key='http://x.org/p', surfaceForm='The')
+
+    def test_no_instance_dict(self):
+        for obj in self.spans + [self.sentence, self.annotation]:
+            assert not hasattr(obj, '__dict__')
+            with pytest.raises(AttributeError):
+                obj.undeclared = 1
+
+    def test_attribute_order(self):
+        assert [name for name, _ in get_attributes(self.spans[1])] == \
+            ['span_type', 'start', 'end', 'pos', 'dependency']
+        assert list(self.sentence.as_dict()) == [
+            'md5sum', 'pos', 'sem_orient', 'significance', 'token', 'value',
+            'is_title', 'dependency', 'emotions']
+
+    def test_json_output(self):
+        document = Document(content_id=1, content='The text',
+                            content_type='text/plain', lang='en',
+                            partitions={'TOKEN': self.spans[1:2],
+                                        'OTHER': self.spans[2:]},
+                            annotations=[self.annotation])
+        # attribute order and names are unchanged by the slots
+        assert document.to_json() == json.dumps({
+            'id': 1, 'content': 'The text', 'format': 'text/plain',
+            'lang': 'EN',
+            'partitions': {
+                'TOKEN': [{'@type': 'TokenCharSpan', 'start': 0, 'end': 3,
+                           'pos': 'NN',
+                           'dependency': {'parent': -1, 'label': 'ROOT'}}],
+                'OTHER': [{'@type': 'SentenceCharSpan', 'start': 0, 'end': 5,
+                           'id': 'abc', 'semOrient': 0.5,
+                           'significance': 0.0, 'emotions': {}},
+                          {'@type': 'SentimentCharSpan', 'start': 1,
+                           'end': 2, 'value': -1.0, 'modality': 'neg'}]},
+            'header': {},
+            'annotations': [{'annotation_type': 'Person',
+                             'surfaceForm': 'The', 'start': 0, 'end': 3,
+                             'key': 'http://x.org/p'}]})
+        assert self.sentence.to_json() == json.dumps({
+            'id': 'abc', 'pos_list': 'DT NN', 'tok_list': '0,3 4,9',
+            'value': 'The text', 'is_title': True})
+
+    def test_pickle(self):
+        for obj in self.spans + [self.annotation]:
+            clone = pickle.loads(pickle.dumps(obj))
+            assert get_attributes(clone) == get_attributes(obj)
+        assert pickle.loads(pickle.dumps(self.sentence)).as_dict() == \
+            self.sentence.as_dict()
+
+    def test_dict_state(self):
+        ''' state of pickles created before the introduction of slots '''
+        span = TokenCharSpan.__new__(TokenCharSpan)
+        span.__setstate__({'span_type': 'TokenCharSpan', 'start': 1,
+                           'end': 2, 'pos': 'NN', 'dependency': None})
+        assert span == TokenCharSpan(start=1, end=2, pos='NN')
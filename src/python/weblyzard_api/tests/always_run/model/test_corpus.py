@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the JSON Lines corpus reader and writer.
+'''
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from weblyzard_api.model import corpus
+from weblyzard_api.model.corpus import iter_documents, write_documents
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.xml_content import XMLContent
+from weblyzard_api.tests.always_run.model import test_xml_content
+
+
+def get_document(content_id):
+    return Document(content_id=content_id, content='Text number %d.' %
+                    content_id, content_type='text/plain', lang='en',
+                    header={'title': 'Ünïcode\ntitle'},
+                    partitions={'TOKEN': [{'@type': 'TokenCharSpan',
+                                           'start': 0, 'end': 4,
+                                           'pos': 'NN'}]})
+
+
+class TestCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.documents = [get_document(i) for i in range(50)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def get_path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_round_trip(self):
+        for name in ('corpus.jsonl', 'corpus.jsonl.gz'):
+            path = self.get_path(name)
+            assert write_documents(path, iter(self.documents)) == 50
+            assert [document.to_dict() for document in iter_documents(path)] \
+                == [document.to_dict() for document in self.documents]
+        # the gzip compression has been derived from the file name
+        with gzip.open(path) as fp:
+            assert len(fp.read().splitlines()) == 50
+
+    def test_explicit_compression(self):
+        path = self.get_path('corpus')
+        write_documents(path, self.documents[:3], compression='gzip')
+        assert len(list(iter_documents(path, compression='gzip'))) == 3
+        with self.assertRaises(ValueError):
+            write_documents(path, self.documents, compression='bzip2')
+
+    def test_zstd(self):
+        path = self.get_path('corpus.jsonl.zst')
+        if corpus.zstandard is None:
+            with self.assertRaises(ImportError):
+                write_documents(path, self.documents)
+            return
+        write_documents(path, self.documents)
+        assert [d.content_id for d in iter_documents(path)] == list(range(50))
+
+    def test_parallel_decoding(self):
+        path = self.get_path('corpus.jsonl')
+        write_documents(path, self.documents)
+        with open(path, 'a') as fp:
+            fp.write('\n')
+        documents = list(iter_documents(path, processes=3, chunk_size=4))
+        assert [document.content_id for document in documents] == \
+            list(range(50))
+        assert documents[7].partitions['TOKEN'][0].pos == 'NN'
+
+        # closing the generator stops the worker processes
+        documents = iter_documents(path, processes=2, chunk_size=1)
+        assert next(documents).content_id == 0
+        documents.close()
+
+    def test_xml_content(self):
+        path = self.get_path('corpus.jsonl')
+        xml_content = XMLContent(
+            test_xml_content.TestXMLContent.xml_content3)
+        write_documents(path, [xml_content, xml_content])
+        for processes in (None, 2):
+            result = list(iter_documents(path, document_class=XMLContent,
+                                         processes=processes))
+            assert len(result) == 2
+            assert result[1].as_dict() == xml_content.as_dict()
+
+
+if __name__ == '__main__':
+    unittest.main()
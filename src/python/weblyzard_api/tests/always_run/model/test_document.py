@@ -0,0 +1,258 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the partition queries of the Document model.
+'''
+import pickle
+import random
+import unittest
+
+from mock import patch
+
+from weblyzard_api.model import (Annotation, CharSpan, SentenceCharSpan,
+                                 TokenCharSpan, span_index)
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.partitions import LazyPartitions
+from weblyzard_api.model.token_partition import TokenPartition
+
+
+class TestPartitionIndex(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(42)
+        spans = []
+        for _ in range(300):
+            start = rnd.randint(0, 200)
+            spans.append(CharSpan(start=start,
+                                  end=start + rnd.randint(0, 30)))
+        self.document = Document(content_id=1, content='x' * 250,
+                                 content_type='text/plain', lang='en',
+                                 partitions={'LAYOUT': spans})
+        self.spans = self.document.partitions['LAYOUT']
+
+    def test_overlaps(self):
+        for start in range(-5, 240, 3):
+            for length in (-1, 0, 1, 7, 50):
+                search_span = CharSpan(start=start, end=start + length)
+                expected = [span for span in self.spans
+                            if Document.overlapping(span, search_span)]
+                assert self.document.get_partition_overlaps(
+                    search_span, 'LAYOUT') == expected
+
+    def test_contained_and_point_queries(self):
+        for start in range(-5, 240, 7):
+            search_span = CharSpan(start=start, end=start + 20)
+            assert self.document.get_partition_contained(
+                search_span, 'LAYOUT') == [
+                    span for span in self.spans
+                    if span.start >= start and span.end <= start + 20]
+            assert self.document.get_partition_spans_at(start, 'LAYOUT') == [
+                span for span in self.spans if span.start <= start < span.end]
+
+    def test_missing_partition(self):
+        search_span = {'@type': 'CharSpan', 'start': 0, 'end': 5}
+        assert self.document.get_partition_overlaps(search_span,
+                                                    'TOKEN') == []
+        assert self.document.get_partition_spans_at(0, 'TOKEN') == []
+
+    def test_invalidation(self):
+        search_span = CharSpan(start=240, end=250)
+        assert self.document.get_partition_overlaps(search_span,
+                                                    'LAYOUT') == []
+        new_span = CharSpan(start=245, end=246)
+        self.spans.append(new_span)
+        assert self.document.get_partition_overlaps(search_span,
+                                                    'LAYOUT') == [new_span]
+
+        self.document.partitions['LAYOUT'] = [
+            {'@type': 'TokenCharSpan', 'start': 241, 'end': 242, 'pos': 'NN'}]
+        result = self.document.get_partition_overlaps(search_span, 'LAYOUT')
+        assert len(result) == 1 and isinstance(result[0], TokenCharSpan)
+
+        self.document.partitions['LAYOUT'][0] = CharSpan(start=0, end=1)
+        self.document.invalidate_partition_index('LAYOUT')
+        assert self.document.get_partition_overlaps(search_span,
+                                                    'LAYOUT') == []
+
+    def test_iter_overlaps(self):
+        index = self.document.get_partition_index('LAYOUT')
+        search_spans = sorted([CharSpan(start=start, end=start + length)
+                               for start in range(-5, 240, 4)
+                               for length in (-1, 0, 3, 40)],
+                              key=lambda span: span.start)
+        assert list(index.iter_overlaps(search_spans)) == [
+            index.get_overlaps(span.start, span.end) for span in search_spans]
+        with self.assertRaises(ValueError):
+            list(index.iter_overlaps(search_spans[::-1]))
+
+    def test_batch_alignment(self):
+        index = self.document.get_partition_index('LAYOUT')
+        starts = list(range(-5, 240, 2)) * 3
+        ends = [start + length for start, length
+                in zip(starts, [-1] * 123 + [0] * 123 + [9] * 123)]
+        expected_overlaps, expected_containing = [], []
+        for start, end in zip(starts, ends):
+            search_span = CharSpan(start=start, end=end)
+            overlaps = [(span.start, i) for i, span in enumerate(self.spans)
+                        if Document.overlapping(span, search_span)]
+            expected_overlaps.append(min(overlaps)[1] if overlaps else -1)
+            containing = [(span.start, i) for i, span
+                          in enumerate(self.spans)
+                          if span.start <= start < span.end]
+            expected_containing.append(max(containing)[1] if containing
+                                       else -1)
+
+        with patch.object(span_index, 'numpy', None):
+            assert index.get_first_overlaps(starts, ends) == \
+                expected_overlaps
+            assert index.get_containing(starts) == expected_containing
+        if span_index.numpy is not None:
+            assert index.get_first_overlaps(starts, ends) == \
+                expected_overlaps
+            assert index.get_containing(starts) == expected_containing
+
+    def test_index_is_not_serialized(self):
+        self.document.get_partition_index('LAYOUT')
+        assert '_partition_index' not in self.document.to_dict()
+        assert '_partition_index' not in repr(self.document)
+
+
+class TestIterSentences(unittest.TestCase):
+
+    CONTENT = 'The title. First sentence here. Second one.'
+
+    def setUp(self):
+        tokens = [(0, 3, 'DT'), (4, 9, 'NN'), (9, 10, '.'), (11, 16, 'JJ'),
+                  (17, 25, 'NN'), (26, 30, 'RB'), (30, 31, '.'),
+                  (32, 38, 'JJ'), (39, 42, 'CD'), (42, 43, '.')]
+        partitions = {
+            'TITLE': [{'@type': 'CharSpan', 'start': 0, 'end': 10}],
+            # unsorted sentences and tokens
+            'SENTENCE': [
+                {'@type': 'SentenceCharSpan', 'start': start, 'end': end,
+                 'md5sum': str(start), 'sem_orient': 0.5}
+                for start, end in ((32, 43), (0, 10), (11, 31))],
+            'TOKEN': [{'@type': 'TokenCharSpan', 'start': start,
+                       'end': end, 'pos': pos,
+                       'dependency': {'parent': -1, 'label': 'ROOT'}}
+                      for start, end, pos in tokens[3:] + tokens[:3]]}
+        self.document = Document(content_id=1, content=self.CONTENT,
+                                 content_type='text/plain', lang='en',
+                                 partitions=partitions)
+
+    def get_sentences_by_scan(self, zero_based):
+        """ reference implementation based on partition scans """
+        result = []
+        for sentence_span in sorted(self.document.partitions['SENTENCE'],
+                                    key=lambda span: span.start):
+            offset = sentence_span.start if zero_based else 0
+            tokens = [span for span in self.document.partitions['TOKEN']
+                      if Document.overlapping(span, sentence_span)]
+            is_title = any(Document.overlapping(span, sentence_span)
+                           for span in self.document.partitions['TITLE'])
+            result.append((sentence_span.md5sum, is_title,
+                           ' '.join(t.pos for t in tokens),
+                           ' '.join('{},{}'.format(t.start - offset,
+                                                   t.end - offset)
+                                    for t in tokens)))
+        return result
+
+    def test_iter_sentences(self):
+        for zero_based in (False, True):
+            sentences = self.document.get_sentences(zero_based=zero_based)
+            assert [(s.md5sum, s.is_title, s.pos, s.token)
+                    for s in sentences] == \
+                self.get_sentences_by_scan(zero_based)
+        assert sentences[1].value == 'First sentence here.'
+        assert sentences[1].dependency == '-1:ROOT -1:ROOT -1:ROOT -1:ROOT'
+
+    def test_exclude_title(self):
+        sentences = list(self.document.iter_sentences(include_title=False))
+        assert [s.md5sum for s in sentences] == ['11', '32']
+
+    def test_align_annotations(self):
+        alignment = self.document.align_annotations([4, 12, 31, 40, 9],
+                                                    [16, 16, 32, 41, 9])
+        assert alignment.tokens == [8, 0, -1, 5, 9]
+        assert alignment.pos == ['NN', 'JJ', None, 'CD', '.']
+        assert [span.md5sum if span else None
+                for span in alignment.sentences] == ['0', '11', None, '32',
+                                                     '0']
+
+        annotations = [{'start': 17, 'end': 25, 'key': 'x'},
+                       Annotation(start=32, end=42)]
+        assert self.document.align_annotations(annotations).pos == \
+            ['NN', 'JJ']
+        # the overlapping token rather than the next one
+        assert self.document.get_pos_for_annotation(
+            {'start': 18, 'end': 20}) == 'NN'
+        assert self.document.get_pos_for_annotation(
+            {'start': 43, 'end': 45}) is None
+
+    def test_to_xml(self):
+        xml = self.document.to_xml()
+        assert xml.count('<wl:sentence') == 3
+        assert 'First sentence here.' in xml
+
+
+class TestLazyPartitions(unittest.TestCase):
+
+    DOCUMENT = {
+        'id': 1, 'format': 'text/plain', 'lang': 'EN',
+        'content': 'The text. More.', 'header': {'author': 'me'},
+        'partitions': {
+            'TOKEN': [{'@type': 'TokenCharSpan', 'start': 0, 'end': 3,
+                       'pos': 'DT'},
+                      {'@type': 'TokenCharSpan', 'start': 4, 'end': 8,
+                       'pos': 'NN'}],
+            'SENTENCE': [{'@type': 'SentenceCharSpan', 'start': 0, 'end': 9,
+                          'id': 'abc', 'semOrient': 0.5}],
+            'BODY': [{'@type': 'CharSpan', 'start': 0, 'end': 15}],
+            'EMPTY': [],
+            'MISSING': None}}
+
+    def setUp(self):
+        self.document = Document.from_dict(self.DOCUMENT)
+        self.partitions = self.document.partitions
+
+    def test_metadata_access(self):
+        assert isinstance(self.partitions, LazyPartitions)
+        assert self.document.header == {'author': 'me'}
+        assert 'TOKEN' in self.partitions and len(self.partitions) == 4
+        assert not any(self.partitions.is_materialized(key)
+                       for key in self.partitions)
+
+    def test_access_converts_partition(self):
+        tokens = self.partitions['TOKEN']
+        assert isinstance(tokens, TokenPartition)
+        assert tokens[1] == TokenCharSpan(start=4, end=8, pos='NN')
+        assert self.partitions['TOKEN'] is tokens
+        assert not self.partitions.is_materialized('SENTENCE')
+        assert self.partitions.get('SENTENCE') == [SentenceCharSpan(
+            start=0, end=9, md5sum='abc', sem_orient=0.5)]
+        assert self.partitions.get('MISSING') is None
+        assert self.document.get_body() == 'The text. More.'
+
+    def test_invalid_spans_fail_on_access(self):
+        document = Document.from_dict(dict(self.DOCUMENT, partitions={
+            'TOKEN': [{'@type': 'TokenCharSpan', 'start': 0, 'end': 3,
+                       'semOrient': 0.5}]}))
+        with self.assertRaises(TypeError):
+            document.partitions['TOKEN']
+
+    def test_serialization(self):
+        expected = dict(self.DOCUMENT, partitions={
+            'TOKEN': self.DOCUMENT['partitions']['TOKEN'],
+            'SENTENCE': [dict(self.DOCUMENT['partitions']['SENTENCE'][0],
+                              significance=0.0, emotions={})],
+            'BODY': self.DOCUMENT['partitions']['BODY'],
+            'EMPTY': []}, annotations=[])
+        assert self.document.to_dict() == expected
+        document = pickle.loads(pickle.dumps(self.document))
+        assert document.to_dict() == expected
+        assert dict(Document.from_dict(self.DOCUMENT).partitions) == \
+            self.partitions
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the cached token, POS and dependency views of the Sentence model.
+'''
+import pickle
+import unittest
+
+from weblyzard_api.model import LabeledDependency, Sentence
+
+
+def get_tokens(sentence):
+    ''' the former, uncached implementation of `Sentence.get_tokens` '''
+    correction_offset = int(sentence.token.split(',')[0] or 0)
+    for token_pos in sentence.token.split(' '):
+        start, end = [int(i) - correction_offset
+                      for i in token_pos.split(',')]
+        res = str(sentence.sentence)[start:end]
+        if res.strip() != res:
+            correction_offset += len(res) - len(res.strip())
+            res = res.strip()
+        yield res
+
+
+class TestSentence(unittest.TestCase):
+
+    def setUp(self):
+        self.sentence = Sentence(
+            pos='RB PRP MD', dependency='1:SUB -1:ROOT 1:OBJ',
+            value='Then it may.', token='0,4 5,7 8,11')
+
+    def test_token_offsets(self):
+        starts, ends = self.sentence.get_token_offsets()
+        assert list(starts) == [0, 5, 8] and list(ends) == [4, 7, 11]
+        assert list(self.sentence.tokens) == ['Then', 'it', 'may']
+        # the offsets are cached and invalidated by new token strings
+        assert self.sentence.get_token_offsets()[0] is starts
+        self.sentence.token = '0,4'
+        assert list(self.sentence.tokens) == ['Then']
+        self.sentence.token = None
+        assert self.sentence.get_token_offsets() is None
+        assert list(self.sentence.tokens) == []
+
+    def test_shifted_tokens(self):
+        # offsets relative to the document and misaligned (wide) characters
+        for value, token in (('A day.', '10,11 12,15 15,16'),
+                             ('😀 das zeigt, wie toll.',
+                              '0,1 1,2 3,6 7,12 12,13 14,17 18,22 22,23'),
+                             ('x  y', '0,1 1,3 -2,7 3,2')):
+            sentence = Sentence(value=value, token=token)
+            assert list(sentence.tokens) == list(get_tokens(sentence))
+
+    def test_pos_tags(self):
+        assert self.sentence.pos_tags == ['RB', 'PRP', 'MD']
+        self.sentence.pos_tags.append('NN')
+        assert self.sentence.pos_tags_list == ['RB', 'PRP', 'MD']
+        self.sentence.pos_tags = ['NN', 'VB']
+        assert self.sentence.get_pos_tags() == ['NN', 'VB']
+        self.sentence.pos = ''
+        assert self.sentence.pos_tags is None
+        assert self.sentence.pos_tags_list == []
+
+    def test_dependencies(self):
+        assert self.sentence.dependency_list == [
+            LabeledDependency('1', 'RB', 'SUB'),
+            LabeledDependency('-1', 'PRP', 'ROOT'),
+            LabeledDependency('1', 'MD', 'OBJ')]
+        assert list(self.sentence.get_dependency_parents()) == [1, -1, 1]
+
+        self.sentence.dependency_list = [LabeledDependency('-1', 'MD', 'ROOT')]
+        assert self.sentence.dependency_list == [
+            LabeledDependency('-1', 'MD', 'ROOT')]
+        self.sentence.dependency = 'SUB:2'
+        assert self.sentence.dependency_list == [
+            LabeledDependency('2', 'MD', 'SUB')]
+        self.sentence.pos = 'A B C'
+        self.sentence.dependency = 'SUB:2 3 ROOT'
+        assert self.sentence.dependency_list == [
+            LabeledDependency('2', 'A', 'SUB'),
+            LabeledDependency('3', 'B', None),
+            LabeledDependency(-1, 'C', 'ROOT')]
+        self.sentence.dependency = None
+        assert self.sentence.dependency_list is None
+
+    def test_bulk_token_offsets(self):
+        sentences = [self.sentence, Sentence(value='empty'),
+                     Sentence(value='Hi', token='0,2')]
+        boundaries, starts, ends = Sentence.get_all_token_offsets(sentences)
+        assert list(boundaries) == [0, 3, 3, 4]
+        assert list(starts) == [0, 5, 8, 0]
+        assert list(ends) == [4, 7, 11, 2]
+
+    def test_caches_are_not_serialized(self):
+        list(self.sentence.tokens)
+        self.sentence.dependency_list
+        assert not any(key.startswith('_') for key in self.sentence.as_dict())
+        sentence = pickle.loads(pickle.dumps(self.sentence))
+        assert sentence.as_dict() == self.sentence.as_dict()
+        assert list(sentence.tokens) == ['Then', 'it', 'may']
+
+
+if __name__ == '__main__':
+    unittest.main()
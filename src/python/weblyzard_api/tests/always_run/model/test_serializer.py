@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the compiled document serializer against the former recursive
+`Document._dict_transform` implementation.
+'''
+import io
+import json
+import random
+import unittest
+
+from unittest import mock
+from datetime import datetime
+from decimal import Decimal
+
+from weblyzard_api.model import (Annotation, CharSpan, SentenceCharSpan,
+                                 TokenCharSpan, get_attributes)
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.serializer import DocumentSerializer
+from weblyzard_api.model.token_partition import TokenPartition
+
+
+def dict_transform(data, mapping):
+    ''' the former recursive implementation of Document._dict_transform '''
+    if data is None:
+        return None
+    if isinstance(data, (str, int, float)):
+        return data
+    if isinstance(data, Decimal):
+        return str(data)
+    if isinstance(data, tuple):
+        if len(data) == 1:
+            return data[0]
+        return data
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    if isinstance(data, bytes):
+        return data.decode("utf-8")
+    if isinstance(data, datetime):
+        return data.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(data, (list, TokenPartition)):
+        return [dict_transform(item, mapping) for item in data]
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            key = mapping.get(key, key)
+            if value is not None:
+                value = dict_transform(value, mapping)
+                if value is not None:
+                    result[key] = value
+        return result
+    result = {}
+    for key, value in get_attributes(data):
+        if key in mapping:
+            key = mapping[key]
+        elif key.startswith('_'):
+            continue
+        if value is not None:
+            if key == 'lang':
+                value = value.upper()
+            value = dict_transform(value, mapping)
+            if value is not None:
+                result[key] = dict_transform(value, mapping)
+    return result
+
+
+class Record(object):
+    ''' an object with a __dict__ '''
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestDocumentSerializer(unittest.TestCase):
+
+    def setUp(self):
+        self.rnd = random.Random(7)
+
+    def random_value(self, depth=0):
+        rnd = self.rnd
+        leaves = [None, 'text', 'ünïcode', 3, -1, True, False, 0.5, 1e20,
+                  Decimal('1.25'), b'bytes', memoryview(b'view'),
+                  datetime(2020, 1, 2, 3, 4, 5), 'en', (), ('a', 'b')]
+        if depth > 3:
+            return rnd.choice(leaves)
+        choice = rnd.randint(0, 9)
+        if choice == 0:
+            return (self.random_value(depth + 1), )
+        if choice == 1:
+            return [self.random_value(depth + 1)
+                    for _ in range(rnd.randint(0, 3))]
+        if choice == 2:
+            keys = ['content_id', 'md5sum', 'id', 'span_type', 'lang',
+                    '_private', 'sem_orient', 'x', 'header']
+            return {rnd.choice(keys): self.random_value(depth + 1)
+                    for _ in range(rnd.randint(0, 4))}
+        if choice == 3:
+            # the language of objects needs to be a string
+            return Record(**{key: rnd.choice(['en', None])
+                             if key == 'lang' else self.random_value(depth + 1)
+                             for key in rnd.sample(['content_id', 'md5sum',
+                                                    'lang', '_private',
+                                                    'value', 'id'], 3)})
+        if choice == 4:
+            return SentenceCharSpan(start=rnd.randint(0, 9), end=10,
+                                    md5sum=self.random_value(depth + 1),
+                                    sem_orient=self.random_value(depth + 1))
+        return rnd.choice(leaves)
+
+    def assert_identical(self, data, mapping=Document.MAPPING):
+        serializer = DocumentSerializer(mapping)
+        expected = dict_transform(data, mapping)
+        assert serializer.to_dict(data) == expected
+        try:
+            expected_json = json.dumps(expected)
+        except (TypeError, ValueError):
+            return
+        assert serializer.dumps(data) == expected_json
+        fp = io.StringIO()
+        serializer.dump(data, fp)
+        assert fp.getvalue() == expected_json
+
+    def test_random_values(self):
+        for _ in range(2000):
+            self.assert_identical(self.random_value())
+
+    def test_pure_python_encoder(self):
+        # the private C encoder might be missing (e.g. on other interpreters)
+        with mock.patch('weblyzard_api.model.serializer.c_make_encoder', None):
+            for _ in range(500):
+                self.assert_identical(self.random_value())
+
+    def test_tuples(self):
+        for value in [((None, ), ), (((None, ), ), ), (('x', ), ),
+                      Record(lang='de', value=((None, ), )),
+                      Record(value=Record(value=(((None, ), ), ))),
+                      {'md5sum': 1, 'content_id': ((None, ), )},
+                      Record(md5sum=2, content_id=((None, ), ))]:
+            self.assert_identical(value)
+            self.assert_identical([value])
+
+    def test_non_idempotent_mapping(self):
+        mapping = {'a': 'b', 'b': 'c', 'x': 'c'}
+        assert DocumentSerializer(mapping).literal
+        for _ in range(500):
+            self.assert_identical(self.random_value(), mapping)
+        self.assert_identical({'a': 1, 'x': 2, 'b': 3}, mapping)
+
+    def test_document(self):
+        document = Document(
+            content_id=5, content='Die Straße.', content_type='text/plain',
+            lang='de', header={'title': 'Straße', 'date': datetime(2020, 1, 1)},
+            partitions={'TOKEN': [TokenCharSpan(start=0, end=3, pos='DT'),
+                                  TokenCharSpan(start=4, end=10, pos='NN',
+                                                dependency={'parent': -1,
+                                                            'label': None})],
+                        'SENTENCE': [SentenceCharSpan(start=0, end=11,
+                                                      md5sum='abc')],
+                        'LAYOUT': [CharSpan(start=0, end=11)]},
+            annotations=[Annotation(annotation_type='Location', start=4,
+                                    end=10, key='http://x.org/s')])
+        expected = dict_transform(document, Document.MAPPING)
+        assert document.to_dict() == expected
+        fp = io.StringIO()
+        document.dump(fp)
+        assert fp.getvalue() == json.dumps(expected)
+        assert document.to_json() == fp.getvalue()
+        assert Document.from_json(fp.getvalue()).to_dict() == expected
+        serializer = DocumentSerializer.for_mapping(Document.MAPPING)
+        assert serializer.dumps(document, ensure_ascii=False,
+                                separators=(',', ':')) == \
+            json.dumps(expected, ensure_ascii=False, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    unittest.main()
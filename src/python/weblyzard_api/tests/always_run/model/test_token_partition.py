@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the columnar storage of TOKEN partitions.
+'''
+import pickle
+import unittest
+
+from weblyzard_api.model import CharSpan, TokenCharSpan
+from weblyzard_api.model.document import Document
+from weblyzard_api.model.token_partition import (TokenPartition,
+                                                  TokenSpanView)
+from weblyzard_api.util import json_codec
+
+
+class LemmaCharSpan(TokenCharSpan):
+    ''' a token span with an additional attribute '''
+    __slots__ = ('lemma', )
+
+
+class TestTokenPartition(unittest.TestCase):
+
+    def setUp(self):
+        self.spans = [
+            TokenCharSpan(start=0, end=3, pos='DT',
+                          dependency={'parent': 1, 'label': 'NMOD'}),
+            TokenCharSpan(start=4, end=9, pos='NN',
+                          dependency={'parent': -1, 'label': None}),
+            TokenCharSpan(start=9, end=10, pos='.'),
+        ]
+        self.partition = TokenPartition(self.spans)
+
+    def test_sequence(self):
+        assert len(self.partition) == 3
+        assert self.partition == self.spans
+        assert list(self.partition) == self.spans
+        assert self.partition[-1] == self.spans[-1]
+        assert self.partition[1:] == self.spans[1:]
+        assert self.partition[0].dependency == {'parent': 1, 'label': 'NMOD'}
+        assert self.partition[2].pos == '.'
+        assert self.partition[2].dependency is None
+        with self.assertRaises(IndexError):
+            self.partition[3]
+
+    def test_columns(self):
+        assert not self.partition._objects
+        assert self.partition.get_offsets() == ([0, 4, 9], [3, 9, 10])
+        # POS tags and labels are interned
+        self.partition.append(TokenCharSpan(start=11, end=14, pos='NN'))
+        assert self.partition._values.count('NN') == 1
+
+    def test_objects(self):
+        extra = LemmaCharSpan(start=11, end=12, pos='NN')
+        extra.lemma = 'word'
+        others = [CharSpan(start=0, end=1), extra,
+                  TokenCharSpan(start=2 ** 40, end=2 ** 40 + 1),
+                  TokenCharSpan(start=1, end=2, dependency='1:ROOT')]
+        self.partition.extend(others)
+        assert self.partition[3:] == others
+        assert self.partition[4] is extra
+        assert len(self.partition._objects) == 4
+
+        # stored objects are moved with insertions and deletions
+        self.partition.insert(0, TokenCharSpan(start=20, end=21))
+        assert self.partition[5] is extra
+        del self.partition[1]
+        assert self.partition[4] is extra
+        self.partition[4] = TokenCharSpan(start=11, end=12, pos='NN')
+        assert self.partition[4] is not extra
+        assert len(self.partition._objects) == 3
+
+    def test_changes(self):
+        token = self.partition[0]
+        assert isinstance(token, TokenCharSpan)
+        assert token is self.partition[0]
+        token.pos = 'UH'
+        token.dependency['label'] = 'SBJ'
+        for token in self.partition:
+            token.end += 1
+        assert self.partition[0].pos == 'UH'
+        assert self.partition[0].dependency == {'parent': 1, 'label': 'SBJ'}
+        assert self.partition.get_offsets() == ([0, 4, 9], [4, 10, 11])
+        assert not self.partition._objects
+
+        # values which do not fit into the columns are kept as well
+        self.partition[1].dependency = '1:ROOT'
+        self.partition[2].start = 2 ** 40
+        assert self.partition[1].dependency == '1:ROOT'
+        assert self.partition[2].start == 2 ** 40
+        assert self.partition.get_columns() is None
+
+        # views follow their token and keep the values of removed tokens
+        self.partition.extend(self.spans)
+        token, removed = self.partition[0], self.partition[3]
+        self.partition.insert(0, TokenCharSpan(start=20, end=21))
+        del self.partition[4]
+        assert token is self.partition[1] and token.pos == 'UH'
+        assert removed.start == 0 and removed.dependency['label'] == 'NMOD'
+        assert self.partition[4].start == 4
+        self.partition[1] = TokenCharSpan(start=0, end=4, pos='NN')
+        assert token.pos == 'UH' and self.partition[1].pos == 'NN'
+
+    def test_document_changes(self):
+        document = Document(content_id=1, content='The text.',
+                            content_type='text/plain', lang='en',
+                            partitions={'TOKEN': self.spans})
+        document.partitions['TOKEN'][0].pos = 'UH'
+        document.partitions['TOKEN'][1].dependency = None
+        tokens = document.to_dict()['partitions']['TOKEN']
+        assert tokens[0]['pos'] == 'UH'
+        assert 'dependency' not in tokens[1]
+        spans = list(document.partitions['TOKEN'].iter_spans())
+        assert [type(span) for span in spans] == [TokenCharSpan] * 3
+        assert spans[0].pos == 'UH' and spans[1].dependency is None
+        # views are pickled as TokenCharSpan objects
+        token = pickle.loads(pickle.dumps(document.partitions['TOKEN'][0]))
+        assert type(token) is TokenCharSpan and token.pos == 'UH'
+        assert not isinstance(self.partition[0].copy(), TokenSpanView)
+
+    def test_pickle_and_json(self):
+        partition = pickle.loads(pickle.dumps(self.partition))
+        assert partition == self.spans
+        assert json_codec.loads(json_codec.dumps(self.partition)) == \
+            [span.to_dict() for span in self.spans]
+
+    def test_document(self):
+        document = Document(content_id=1, content='The text.',
+                            content_type='text/plain', lang='en',
+                            partitions={'TOKEN': [span.to_dict() for span
+                                                  in self.spans]})
+        assert isinstance(document.partitions['TOKEN'], TokenPartition)
+        assert document.get_partition_spans_at(5, 'TOKEN') == [self.spans[1]]
+        tokens = document.to_dict()['partitions']['TOKEN']
+        assert [token['start'] for token in tokens] == [0, 4, 9]
+        assert tokens[0]['dependency'] == {'parent': 1, 'label': 'NMOD'}
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,18 @@
 from __future__ import print_function
 from __future__ import unicode_literals
 import unittest
+import unicodedata
 import os
 
+from io import BytesIO
 from pickle import load
 
-from weblyzard_api.model.parsers import XMLParser
+from weblyzard_api.model import Sentence
+from weblyzard_api.model.parsers import EmptySentenceException, XMLParser
+from weblyzard_api.util import json_codec
 from weblyzard_api.model.parsers.xml_2005 import XML2005
 from weblyzard_api.model.parsers.xml_2013 import XML2013
+from weblyzard_api.model.xml_content import XMLContent
 
 
 class TestXMLParser(unittest.TestCase):
@@ -121,5 +126,178 @@ class TestXML2013(unittest.TestCase):
             assert 'md5sum' in sent
 
 
+def cast_item(item):
+    ''' the former implementation of `XMLParser.cast_item` '''
+    if item.lower() == 'true':
+        return True
+    elif item.lower() == 'false':
+        return False
+    for cast in (int, float, json_codec.loads_value):
+        try:
+            return cast(item)
+        except Exception:
+            pass
+    return item
+
+
+class TestAttributeDecoding(unittest.TestCase):
+
+    VALUES = ['', ' ', 'text', 'True', 'FALSE', 'tru', 'f', 'null', 'None',
+              'nan', 'NaN', '-inf', 'Infinity', '12', '-0', '+3', ' 4 ',
+              '1_000', '٣', '1.5', '.5', '5.', '1e5', '1e400', '-1E-3',
+              '0x1f', '007', '[1, 2]', '{"a": null}', ' [1]', '"quoted"',
+              '0,5 6,9', '-1:ROOT', 'NN VB', '3120900866903065837e521458088467']
+
+    def test_cast_item(self):
+        for value in self.VALUES:
+            expected = cast_item(value)
+            result = XMLParser.cast_item(value)
+            assert type(result) is type(expected), value
+            assert result == expected or result != result, value
+
+    def test_remove_control_characters(self):
+        text = ''.join(chr(code) for code in range(0x10000)) + \
+            '\U0001F600\U000E0001\U000F0000\U0010FFFF\U0001F8FF'
+        for value in (text, 'a\tb\u200bc\x00', 'printable text', '',
+                      'a' * 1000 + '\n'):
+            assert XMLParser.remove_control_characters(value) == ''.join(
+                ch for ch in value if unicodedata.category(ch)[0] != 'C')
+
+    def test_typed_attributes(self):
+        attributes = XML2013.load_attributes(
+            {'{http://www.weblyzard.com/wl/2013#}id': '1234',
+             '{http://www.weblyzard.com/wl/2013#}pos': 'null',
+             '{http://www.weblyzard.com/wl/2013#}dependency': '-1',
+             '{http://www.weblyzard.com/wl/2013#}sem_orient': '-0.5',
+             '{http://www.weblyzard.com/wl/2013#}significance': 'n/a',
+             '{http://www.weblyzard.com/wl/2013#}is_title': 'true',
+             'unknown': '12', 'text': 'New York', 'nan': 'NaN'},
+            mapping=XML2013.get_compiled().sentence_mapping,
+            types=XML2013.SENTENCE_TYPES)
+        assert attributes == {'md5sum': '1234', 'pos': 'null',
+                              'dependency': '-1', 'sem_orient': -0.5,
+                              'significance': 'n/a', 'is_title': True,
+                              'unknown': 12, 'text': 'New York',
+                              'nan': 'NaN'}
+
+
+class TestIterParse(unittest.TestCase):
+
+    PAGE = '''<wl:page xmlns:wl="http://www.weblyzard.com/wl/2013#"
+             xmlns:dc="http://purl.org/dc/elements/1.1/"
+             wl:id="{id}" dc:format="text/html" xml:lang="de">
+        <wl:sentence wl:id="b42b" wl:pos="NN NN" wl:token="0,5 6,11"
+            wl:is_title="true"><![CDATA[Title {id}]]></wl:sentence>
+        <wl:annotation wl:key="x.org" wl:start="0" wl:end="5"
+            wl:md5sum="b42b"/>
+        <wl:sentence wl:id="c53c" wl:pos="NN"
+            wl:token="0,4"><![CDATA[Body.]]></wl:sentence>
+        <wl:sentence wl:id="c53c"><![CDATA[Body.]]></wl:sentence>
+        <wl:annotation wl:key="y.org" wl:start="0" wl:end="4"/>
+        <wl:feature key="category">sports</wl:feature>
+        <wl:feature key="category">news</wl:feature>
+        <wl:relation key="url">["http://x.org"]</wl:relation>
+        <wl:other><wl:sentence wl:id="nested">Nested.</wl:sentence></wl:other>
+    </wl:page>'''
+
+    def test_single_pass_result(self):
+        xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + \
+            self.PAGE.format(id=1)
+        expected = XML2013.parse(xml)
+        assert len(expected[1]) == 2 and len(expected[2]) == 1
+        for source in (xml, xml.encode('utf-8'), BytesIO(xml.encode('utf-8'))):
+            assert XML2013.parse_stream(source) == expected
+        assert XML2013.parse(xml.encode('utf-8')) == expected
+        assert len(XML2013.parse_stream(
+            xml, remove_duplicates=False)[1]) == 3
+        with self.assertRaises(EmptySentenceException):
+            XML2013.parse_stream(xml.replace('Body.', ''))
+
+    def test_compiled_parser(self):
+        compiled = XML2013.get_compiled()
+        assert compiled is XML2013.get_compiled()
+        assert compiled.sentence_tag == \
+            '{http://www.weblyzard.com/wl/2013#}sentence'
+        assert compiled.sentence_mapping == XML2013.invert_mapping(
+            XML2013.SENTENCE_MAPPING)
+        assert XML2005.get_compiled().page_tag == \
+            '{http://www.weblyzard.com/wl/2005}page'
+
+    def test_dump(self):
+        xml = '<dump>%s</dump>' % ''.join(self.PAGE.format(id=i)
+                                          for i in range(50))
+        pages = list(XML2013.iterparse(BytesIO(xml.encode('utf-8'))))
+        assert len(pages) == 50
+        assert [page[0]['content_id'] for page in pages] == list(range(50))
+        assert all(page[2:] == pages[0][2:] for page in pages)
+        assert pages[7][1][0]['value'] == 'Title 7'
+        assert pages[7][4] == {'category': ['sports', 'news']}
+        assert pages[7][5] == {'url': ['http://x.org']}
+
+    def test_empty_dump(self):
+        for xml in ('<dump></dump>', '<dump><other/></dump>'):
+            assert list(XML2013.iterparse(xml)) == []
+            with self.assertRaises(ValueError):
+                XML2013.parse_stream(xml)
+        # an empty page is still a page
+        assert len(list(XML2013.iterparse(
+            '<dump>%s</dump>' % XML2013.dump_xml([], {'id': 1}, [])))) == 1
+
+
+class TestWriteXML(unittest.TestCase):
+
+    def get_document(self):
+        xml = '<?xml version="1.0" encoding="UTF-8"?>\n' + \
+            TestIterParse.PAGE.format(id=1).replace(
+                'Body.', 'The "quoted" body [1]')
+        return XMLContent(xml)
+
+    def test_round_trip(self):
+        document = self.get_document()
+        for pretty_print in (False, True):
+            output = BytesIO()
+            document.write_xml_document(output, pretty_print=pretty_print)
+            xml = output.getvalue()
+            assert xml.count(b'\n') == (7 if pretty_print else 0)
+            result = XMLContent(xml.decode('utf-8'))
+            assert result.as_dict() == \
+                XMLContent(document.get_xml_document()).as_dict()
+            assert result.sentences[0].value == 'The "quoted" body [1]'
+            assert result.features == {'category': ['sports', 'news']}
+        assert xml.decode('utf-8') == document.get_xml_document()
+
+    def test_annotations(self):
+        annotations = [{'annotationType': 'Person', 'key': 'x.org',
+                        'preferredName': 'Ünïcode "name"',
+                        'entities': [{'start': 0, 'end': 3,
+                                      'surfaceForm': 'The'}]}]
+        document = self.get_document()
+        xml = document.get_xml_document(annotations=annotations)
+        assert 'Ünïcode &quot;name&quot;' in xml
+        annotations = XMLContent(xml).body_annotations
+        assert len(annotations) == 1
+        assert annotations[0].preferredName == 'Ünïcode "name"'
+
+    def test_invalid_elements(self):
+        output = BytesIO()
+        XML2013.write_xml(output, titles=[], attributes={'id': 1},
+                          sentences=[Sentence(md5sum='a1', value='Valid.'),
+                                     Sentence(md5sum='b2', value='\x01')],
+                          features={'a': ['\x02', 'valid']})
+        result = XML2013.parse_stream(output.getvalue())
+        assert [s['value'] for s in result[1]] == ['Valid.']
+        assert result[4] == {'a': 'valid'}
+
+    def test_multiple_pages(self):
+        document = self.get_document()
+        output = BytesIO()
+        output.write(b'<dump>')
+        for _ in range(3):
+            document.write_xml_document(output)
+        output.write(b'</dump>')
+        output.seek(0)
+        assert len(list(XML2013.iterparse(output))) == 3
+
+
 if __name__ == '__main__':
     unittest.main()
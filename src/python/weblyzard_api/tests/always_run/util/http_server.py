@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Local HTTP test servers shared by the client and retrieval tests.
+'''
+import gzip
+import json
+import unittest
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+
+class KeepAliveRequestHandler(BaseHTTPRequestHandler):
+    ''' echoes the request and the client's port which allows detecting
+        whether a connection has been reused '''
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, body=b''):
+        payload = json.dumps({'path': self.path,
+                              'port': self.client_address[1],
+                              'body': body.decode('utf-8')}).encode('utf-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', '') and \
+                self.path.startswith('/gzip'):
+            payload = gzip.compress(payload)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._reply()
+        if self.path == '/drop':
+            self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self._reply(self.rfile.read(length))
+
+    def log_message(self, *args):
+        pass
+
+
+class EchoRequestHandler(KeepAliveRequestHandler):
+    ''' returns the submitted documents and records the batch sizes '''
+    batch_sizes = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.batch_sizes.append(len(json.loads(body)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_test_server(handler=KeepAliveRequestHandler):
+    ''' starts a local HTTP server in a background thread
+    :returns: tuple (server, base_url) '''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+class LocalServerTestCase(unittest.TestCase):
+    ''' starts a local HTTP server using the `REQUEST_HANDLER` for every
+    test; `self.url` is the server's base url '''
+    REQUEST_HANDLER = KeepAliveRequestHandler
+
+    def setUp(self):
+        self.server, self.url = start_test_server(self.REQUEST_HANDLER)
+        # cleanups run after tearDown, i.e. after blocked handlers have
+        # been released by the test case
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
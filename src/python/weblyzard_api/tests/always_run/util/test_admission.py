@@ -0,0 +1,172 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the client side admission control.
+'''
+import asyncio
+import unittest
+
+from threading import Thread, Lock
+from time import sleep, time
+from urllib.error import HTTPError
+
+from weblyzard_api.client.admission import (AdmissionController, NodeLimiter,
+                                            parse_retry_after)
+from weblyzard_api.client.jeremia_ng import JeremiaNg, AsyncJeremiaNg
+from weblyzard_api.tests.always_run.util.http_server import (
+    EchoRequestHandler, LocalServerTestCase)
+
+
+class Client(object):
+    ''' minimal stand-in for a RESTClient '''
+
+    def __init__(self, service_url):
+        self.service_url = service_url
+
+
+class OverloadedRequestHandler(EchoRequestHandler):
+    ''' answers the first request with `503 Service Unavailable` and
+    records the concurrency of the remaining requests '''
+    lock = Lock()
+    overloaded = True
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_POST(self):
+        cls = self.__class__
+        with cls.lock:
+            overloaded, cls.overloaded = cls.overloaded, False
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            if overloaded:
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                self.send_response(503)
+                self.send_header('Retry-After', '0.2')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            sleep(0.05)
+            EchoRequestHandler.do_POST(self)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+
+class TestAdmissionController(unittest.TestCase):
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:30 GMT',
+                                 now=1445412480) == 30
+
+    def test_aimd(self):
+        limiter = NodeLimiter('http://node', initial_limit=2, max_limit=3,
+                              backoff=1)
+        for _ in range(2):
+            limiter.success()
+        assert limiter.limit == 3
+        limiter.overload(now=100)
+        assert limiter.limit == 1
+        assert limiter.get_delay(100.5) == 0.5
+        # consecutive overloads without Retry-After double the backoff
+        limiter.overload(now=101)
+        assert limiter.blocked_until == 103
+        limiter.overload(retry_after=10, now=101)
+        assert limiter.blocked_until == 111
+        assert limiter.get_delay(111) == 0
+        limiter.in_flight = 1
+        assert limiter.get_delay(111) is None
+
+    def test_acquire_waits_for_release(self):
+        controller = AdmissionController(initial_limit=1)
+        first, second = Client('http://first'), Client('http://second')
+        assert controller.acquire([first, second]) is first
+        assert controller.acquire([first, second]) is second
+
+        def release():
+            sleep(0.1)
+            controller.release(second)
+
+        Thread(target=release).start()
+        start_time = time()
+        assert controller.acquire([first, second]) is second
+        assert time() - start_time >= 0.1
+
+    def test_retry_after(self):
+        controller = AdmissionController()
+        client = Client('http://node')
+        controller.acquire([client])
+        controller.release(client, HTTPError('', 503, 'Service Unavailable',
+                                             {'Retry-After': '0.2'}, None))
+        start_time = time()
+        controller.acquire([client])
+        assert time() - start_time >= 0.15
+        assert controller.as_dict()[0]['overloads'] == 1
+
+    def test_acquire_async(self):
+        controller = AdmissionController(initial_limit=1)
+        client = Client('http://node')
+
+        async def run():
+            await controller.acquire_async([client])
+            asyncio.get_running_loop().call_later(0.1, controller.release,
+                                                  client)
+            start_time = time()
+            await controller.acquire_async([client])
+            return time() - start_time
+
+        assert asyncio.run(run()) >= 0.1
+
+
+class TestAdmissionControlledSubmission(LocalServerTestCase):
+    REQUEST_HANDLER = OverloadedRequestHandler
+
+    def setUp(self):
+        OverloadedRequestHandler.overloaded = True
+        OverloadedRequestHandler.max_in_flight = 0
+        LocalServerTestCase.setUp(self)
+        self.documents = [{'id': str(i), 'body': 'text %d' % i}
+                          for i in range(5)]
+
+    def test_submit_documents(self):
+        client = JeremiaNg(self.url)
+        client.admission.get_limiter(client.clients[0]).limit = 2
+        results = []
+
+        def submit(document):
+            results.append(client.submit_documents([document],
+                                                   max_retry_delay=60))
+
+        start_time = time()
+        threads = [Thread(target=submit, args=(document, ))
+                   for document in self.documents]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the overloaded node is paused for the Retry-After period rather
+        # than a random retry delay
+        assert 0.2 <= time() - start_time < 10
+        assert sorted(result[0]['id'] for result in results) == \
+            [document['id'] for document in self.documents]
+        # the node never received more requests than its limit
+        assert OverloadedRequestHandler.max_in_flight <= 2
+        assert client.admission.as_dict()[0]['overloads'] == 1
+
+    def test_async_submit_documents(self):
+        client = AsyncJeremiaNg(self.url)
+
+        async def run():
+            return await asyncio.gather(*[
+                client.submit_documents([document], max_retry_delay=60)
+                for document in self.documents])
+
+        results = asyncio.run(run())
+        assert [result[0] for result in results] == self.documents
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Tests the asyncio HTTP layer and the asynchronous REST clients against a
+local web server.
+'''
+import asyncio
+import json
+import unittest
+
+from pytest import raises
+from urllib.error import HTTPError
+
+from weblyzard_api.client import AsyncMultiRESTClient
+from weblyzard_api.client.opinion_mining import (OpinionClient,
+                                                 AsyncOpinionClient)
+from weblyzard_api.util.async_http import AsyncRetrieve
+from weblyzard_api.tests.always_run.util.http_server import (
+    KeepAliveRequestHandler, LocalServerTestCase)
+
+
+class MissingPathRequestHandler(KeepAliveRequestHandler):
+    ''' returns 404 for all paths starting with /missing '''
+
+    def _missing(self):
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.startswith('/missing'):
+            self._missing()
+        else:
+            KeepAliveRequestHandler.do_GET(self)
+
+    def do_POST(self):
+        if self.path.startswith('/missing'):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._missing()
+        else:
+            KeepAliveRequestHandler.do_POST(self)
+
+
+class TestAsyncRetrieve(LocalServerTestCase):
+    REQUEST_HANDLER = MissingPathRequestHandler
+
+    def test_connection_reuse(self):
+        async def run():
+            r = AsyncRetrieve(self.__class__.__name__)
+            ports = set()
+            for no in range(5):
+                response = await r.open('%s/%d' % (self.url, no))
+                response = json.loads(response.read())
+                assert response['path'] == '/%d' % no
+                ports.add(response['port'])
+            r.close()
+            return ports
+
+        assert len(asyncio.run(run())) == 1
+
+    def test_post_and_gzip(self):
+        async def run():
+            r = AsyncRetrieve(self.__class__.__name__)
+            first = await r.open(self.url + '/post', data='hallo')
+            second = await r.open(self.url + '/gzip')
+            return json.loads(first.read()), json.loads(second.read())
+
+        first, second = asyncio.run(run())
+        assert first['body'] == 'hallo'
+        assert second['path'] == '/gzip'
+
+    def test_concurrent_requests(self):
+        async def run():
+            r = AsyncRetrieve(self.__class__.__name__, max_connections=4)
+            responses = await asyncio.gather(
+                *[r.open('%s/%d' % (self.url, no)) for no in range(20)])
+            return [json.loads(response.read()) for response in responses]
+
+        responses = asyncio.run(run())
+        assert [r['path'] for r in responses] == \
+            ['/%d' % no for no in range(20)]
+        assert len({r['port'] for r in responses}) <= 4
+
+    def test_http_error(self):
+        r = AsyncRetrieve(self.__class__.__name__)
+        with raises(HTTPError) as e:
+            asyncio.run(r.open(self.url + '/missing'))
+        assert e.value.code == 404
+
+
+class TestAsyncMultiRESTClient(LocalServerTestCase):
+    REQUEST_HANDLER = MissingPathRequestHandler
+
+    def test_request(self):
+        client = AsyncMultiRESTClient(self.url)
+        result = asyncio.run(client.request('test', {'a': 1}))
+        assert result['path'] == '/test'
+        assert json.loads(result['body']) == {'a': 1}
+
+    def test_failover(self):
+        client = AsyncMultiRESTClient([self.url + '/missing', self.url],
+                                      use_random_server=False)
+        assert asyncio.run(client.request('test'))['path'] == '/test'
+
+    def test_all_services_fail(self):
+        client = AsyncMultiRESTClient(self.url + '/missing')
+        with raises(Exception) as e:
+            asyncio.run(client.request('test'))
+        assert 'Could not make request to path test' in str(e.value)
+        assert asyncio.run(client.is_online()) is False
+
+    def test_execute_all_services(self):
+        service_urls = [self.url + '/node0', self.url + '/missing']
+        client = AsyncMultiRESTClient(service_urls, use_random_server=False)
+        ok, failed = asyncio.run(
+            client.request('test', execute_all_services=True,
+                           return_node_results=True))
+        assert ok.service_url == service_urls[0]
+        assert ok.response['path'] == '/node0/test'
+        assert isinstance(failed.error, HTTPError)
+        responses = asyncio.run(client.request('test',
+                                               execute_all_services=True))
+        assert [response['path'] for response in responses] == ['/node0/test']
+
+        with raises(HTTPError):
+            asyncio.run(client.request('test', execute_all_services=True,
+                                       pass_through_exceptions=(HTTPError, )))
+
+    def test_service_error_result(self):
+        # the sync and async clients share the retry and error handling
+        url = self.url + '/missing/'
+        expected = OpinionClient(url).get_polarity('text', 'plaintext')
+        result = asyncio.run(AsyncOpinionClient(url).get_polarity(
+            'text', 'plaintext'))
+        for error in (expected['error'], result['error']):
+            assert error.startswith('Request to sentiment webservice failed '
+                                    '2 times')
+            assert 'HTTP Error 404' in error
+
+
+if __name__ == '__main__':
+    unittest.main()
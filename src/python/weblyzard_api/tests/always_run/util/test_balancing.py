@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the load balancing strategies and the circuit breaker of the
+MultiRESTClient.
+'''
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from time import time
+from urllib.error import HTTPError, URLError
+
+from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.client.balancing import (
+    NodeHealth, RoundRobinStrategy, LeastOutstandingStrategy,
+    LatencyEWMAStrategy, get_balancing_strategy, is_node_failure,
+    CLOSED, OPEN, HALF_OPEN)
+from weblyzard_api.tests.always_run.util.http_server import (
+    LocalServerTestCase)
+
+
+class TestNodeHealth(unittest.TestCase):
+
+    def test_is_node_failure(self):
+        assert is_node_failure(URLError('connection refused'))
+        assert is_node_failure(HTTPError('', 503, '', {}, None))
+        assert is_node_failure(HTTPError('', 429, '', {}, None))
+        assert not is_node_failure(HTTPError('', 404, '', {}, None))
+        assert not is_node_failure(ValueError())
+
+    def test_circuit_breaker(self):
+        health = NodeHealth('http://node', failure_threshold=2,
+                            reset_timeout=0)
+        error = URLError('refused')
+        for _ in range(2):
+            health.start()
+            health.failure(error)
+        assert health.state == OPEN
+        assert health.ejections == 1
+
+        # the reset timeout passed; a single probe is allowed
+        assert health.is_available()
+        start_time = health.start()
+        assert health.state == HALF_OPEN
+        assert not health.is_available()
+
+        # a failed probe re-opens the circuit ...
+        health.failure(error)
+        assert health.state == OPEN
+        assert health.ejections == 2
+
+        # ... whereas a successful one closes it
+        start_time = health.start()
+        health.success(start_time)
+        assert health.state == CLOSED
+        assert health.as_dict()['consecutive_failures'] == 0
+        assert health.outstanding == 0
+
+    def test_single_probe(self):
+        health = NodeHealth('http://node', failure_threshold=1,
+                            reset_timeout=60)
+        health.start()
+        health.failure(URLError('refused'))
+        assert not health.try_start()
+        # the reset timeout passed
+        health.opened_at = time() - 60
+        barrier = Barrier(8)
+
+        def select(_):
+            barrier.wait()
+            return health.try_start()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert sorted(executor.map(select, range(8))) == [False] * 7 + \
+                [True]
+        assert health.state == HALF_OPEN
+
+        # the probe has not been sent within the reset timeout
+        health.probe_started_at = time() - 60
+        assert health.try_start()
+        assert not health.try_start()
+
+    def test_request_errors_do_not_eject(self):
+        health = NodeHealth('http://node', failure_threshold=1)
+        health.start()
+        health.failure(HTTPError('', 404, '', {}, None))
+        assert health.state == CLOSED
+        assert health.failures == 0
+
+
+class TestBalancingStrategies(unittest.TestCase):
+
+    def setUp(self):
+        self.clients = ['a', 'b', 'c']
+        self.health = {client: NodeHealth(client) for client in self.clients}
+
+    def test_round_robin(self):
+        strategy = RoundRobinStrategy()
+        first = [strategy.order(self.clients, self.health)[0]
+                 for _ in range(6)]
+        assert first == ['a', 'b', 'c', 'a', 'b', 'c']
+
+    def test_least_outstanding(self):
+        self.health['a'].outstanding = 3
+        self.health['b'].outstanding = 1
+        self.health['c'].outstanding = 2
+        assert LeastOutstandingStrategy().order(self.clients, self.health) \
+            == ['b', 'c', 'a']
+
+    def test_latency_ewma(self):
+        self.health['a'].latency_ewma = 0.5
+        self.health['b'].latency_ewma = 0.1
+        order = LatencyEWMAStrategy().order(self.clients, self.health)
+        # unmeasured nodes are tried first
+        assert order == ['c', 'b', 'a']
+
+    def test_get_balancing_strategy(self):
+        assert isinstance(get_balancing_strategy('round_robin'),
+                          RoundRobinStrategy)
+        with self.assertRaises(ValueError):
+            get_balancing_strategy('unknown')
+
+
+class TestMultiRESTClientBalancing(LocalServerTestCase):
+
+    def test_dead_node_is_ejected(self):
+        dead_url = 'http://127.0.0.1:1'
+        client = MultiRESTClient([dead_url, self.url], use_random_server=False,
+                                 failure_threshold=1, reset_timeout=3600)
+        assert client.request('test')['path'] == '/test'
+        dead, alive = client.get_health()
+        assert dead['state'] == OPEN
+        assert alive['successes'] == 1
+
+        # the ejected node is not tried anymore
+        client.request('test')
+        dead, alive = client.get_health()
+        assert dead['requests'] == 1
+        assert alive['successes'] == 2
+        assert alive['latency_ewma'] is not None
+
+    def test_probe_is_selected_once(self):
+        client = MultiRESTClient(['http://127.0.0.1:1', self.url],
+                                 use_random_server=False,
+                                 failure_threshold=1, reset_timeout=60)
+        dead, alive = client.clients.values()
+        client.health[dead].start()
+        client.health[dead].failure(URLError('refused'))
+        client.health[dead].opened_at = time() - 60
+        barrier = Barrier(8)
+
+        def select(_):
+            barrier.wait()
+            return client._select_clients()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            selections = list(executor.map(select, range(8)))
+        # a single selection sends the probe to the dead node first
+        assert sorted(selection[0] is dead for selection in selections) == \
+            [False] * 7 + [True]
+        assert all(selection == [alive, dead] for selection in selections
+                   if selection[0] is not dead)
+
+    def test_round_robin(self):
+        service_urls = ['%s/node%d' % (self.url, i) for i in range(3)]
+        client = MultiRESTClient(service_urls, use_random_server=False,
+                                 balancing_strategy='round_robin')
+        paths = [client.request('test')['path'] for _ in range(3)]
+        assert paths == ['/node%d/test' % i for i in range(3)]
+
+
+if __name__ == '__main__':
+    unittest.main()
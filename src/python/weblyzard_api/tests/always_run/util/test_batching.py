@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the adaptive batching of document submissions.
+'''
+import asyncio
+import unittest
+
+from urllib.error import HTTPError
+
+from weblyzard_api.client.batching import AdaptiveBatcher, merge_results
+from weblyzard_api.client.jeremia_ng import JeremiaNg, AsyncJeremiaNg
+from weblyzard_api.tests.always_run.util.http_server import (
+    EchoRequestHandler, LocalServerTestCase)
+
+
+class TestAdaptiveBatcher(unittest.TestCase):
+
+    def test_merge_results(self):
+        assert merge_results([[1, 2], None, [3]]) == [1, 2, 3]
+        assert merge_results([{'a': 1}, {'b': 2}]) == {'a': 1, 'b': 2}
+        assert merge_results([{'a': 1}]) == {'a': 1}
+        assert merge_results([]) is None
+        with self.assertRaises(TypeError):
+            merge_results([[1], {'a': 1}])
+
+    def test_batch_size_limits(self):
+        batcher = AdaptiveBatcher(initial_batch_size=3, max_batch_bytes=10)
+        documents = ['aaaa', 'bbbb', 'cccc', 'dddddddddddddddd', 'e']
+        assert batcher.next_batch(documents, 0) == ['aaaa', 'bbbb']
+        # batches always contain at least one document
+        assert batcher.next_batch(documents, 3) == ['dddddddddddddddd']
+        assert batcher.next_batch(documents, 4) == ['e']
+
+    def test_aimd(self):
+        batcher = AdaptiveBatcher(initial_batch_size=10, max_batch_size=25,
+                                  target_latency=1, additive_increase=10)
+        batcher.record_latency(10, 0.1)
+        assert batcher.batch_size == 20
+        # partially filled batches do not increase the batch size
+        batcher.record_latency(5, 0.1)
+        assert batcher.batch_size == 20
+        batcher.record_latency(20, 0.1)
+        assert batcher.batch_size == 25
+        batcher.record_latency(25, 2)
+        assert batcher.batch_size == 12
+        batcher.record_error()
+        assert batcher.batch_size == 6
+
+    def test_process_in_order(self):
+        batcher = AdaptiveBatcher(initial_batch_size=2, additive_increase=1)
+        batches = []
+
+        def submit(batch):
+            batches.append(len(batch))
+            return [d * 2 for d in batch]
+
+        assert batcher.process(list(range(10)), submit) == \
+            [d * 2 for d in range(10)]
+        assert batches == [2, 3, 4, 1]
+
+    def test_payload_too_large(self):
+        batcher = AdaptiveBatcher(initial_batch_size=8)
+        batches = []
+
+        def submit(batch):
+            batches.append(len(batch))
+            if len(batch) > 2:
+                raise HTTPError('', 413, 'Payload Too Large', {}, None)
+            return batch
+
+        assert batcher.process(list(range(5)), submit) == list(range(5))
+        assert batches[:3] == [5, 4, 2]
+
+    def test_errors_are_raised(self):
+        batcher = AdaptiveBatcher(initial_batch_size=8)
+
+        def submit(batch):
+            raise HTTPError('', 500, 'Internal Server Error', {}, None)
+
+        with self.assertRaises(HTTPError):
+            batcher.process(list(range(5)), submit)
+        assert batcher.batch_size == 4
+
+
+class TestBatchedSubmission(LocalServerTestCase):
+    REQUEST_HANDLER = EchoRequestHandler
+
+    def setUp(self):
+        EchoRequestHandler.batch_sizes = []
+        LocalServerTestCase.setUp(self)
+        self.documents = [{'id': str(i), 'body': 'text %d' % i}
+                          for i in range(120)]
+
+    def test_submit_documents(self):
+        client = JeremiaNg(self.url)
+        assert client.submit_documents(self.documents) == self.documents
+        assert EchoRequestHandler.batch_sizes == [50, 60, 10]
+
+    def test_async_submit_documents(self):
+        client = AsyncJeremiaNg(self.url)
+        assert asyncio.run(client.submit_documents(self.documents)) == \
+            self.documents
+        assert sum(EchoRequestHandler.batch_sizes) == len(self.documents)
+
+
+if __name__ == '__main__':
+    unittest.main()
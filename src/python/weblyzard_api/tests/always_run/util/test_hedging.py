@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests hedged requests of the MultiRESTClient.
+'''
+import asyncio
+import time
+import unittest
+
+from threading import Event
+
+from weblyzard_api.client import MultiRESTClient, AsyncMultiRESTClient
+from weblyzard_api.client.admission import AdmissionController
+from weblyzard_api.client.hedging import HedgingPolicy
+from weblyzard_api.tests.always_run.util.http_server import (
+    KeepAliveRequestHandler, LocalServerTestCase)
+
+
+class SlowNodeRequestHandler(KeepAliveRequestHandler):
+    ''' delays all requests to the /slow node, answers requests to the
+    /busy node with `503 Service Unavailable` and never answers requests to
+    the /hang node (until `released` is set) '''
+    released = Event()
+
+    def do_POST(self):
+        if self.path.startswith('/hang'):
+            self.released.wait(30)
+            return
+        if self.path.startswith('/busy'):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(503)
+            self.send_header('Retry-After', '60')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path.startswith('/slow'):
+            time.sleep(1)
+        KeepAliveRequestHandler.do_POST(self)
+
+
+class TestHedgingPolicy(unittest.TestCase):
+
+    def test_delay(self):
+        policy = HedgingPolicy(percentile=90, initial_delay=2, min_samples=10)
+        assert policy.get_delay() == 2
+        for latency in range(1, 11):
+            policy.record_latency(latency / 100.)
+        assert policy.get_delay() == 0.09
+
+    def test_window(self):
+        policy = HedgingPolicy(percentile=100, window_size=3, min_samples=1)
+        for latency in (5, 1, 1, 1):
+            policy.record_latency(latency)
+        assert policy.get_delay() == 1
+
+    def test_budget(self):
+        policy = HedgingPolicy(budget=0.1)
+        for _ in range(20):
+            policy.start_request()
+        hedges = sum(policy.acquire_hedge() for _ in range(20))
+        assert hedges == 3
+
+
+class TestHedgedRequests(LocalServerTestCase):
+    REQUEST_HANDLER = SlowNodeRequestHandler
+
+    def setUp(self):
+        LocalServerTestCase.setUp(self)
+        self.service_urls = [self.url + '/slow', self.url + '/fast']
+
+    def tearDown(self):
+        SlowNodeRequestHandler.released.set()
+
+    def test_hedged_request(self):
+        client = MultiRESTClient(self.service_urls, use_random_server=False,
+                                 hedging_policy=HedgingPolicy(
+                                     initial_delay=0.1))
+        start = time.time()
+        result = client.request('search', {'q': 1}, hedge=True)
+        assert time.time() - start < 0.8
+        assert result['path'] == '/fast/search'
+        assert client.hedging_policy.hedges == 1
+        client.close()
+
+    def test_losers_are_aborted(self):
+        # the losing requests to the hanging node must not occupy the
+        # hedging executor's threads (2 * max_workers)
+        SlowNodeRequestHandler.released.clear()
+        client = MultiRESTClient([self.url + '/hang', self.url + '/fast'],
+                                 use_random_server=False, max_workers=1,
+                                 hedging_policy=HedgingPolicy(
+                                     initial_delay=0.05, budget=1))
+        hang = list(client.clients.values())[0]
+        start = time.time()
+        for _ in range(5):
+            result = client.request('search', {'q': 1}, hedge=True)
+            assert result['path'] == '/fast/search'
+        assert time.time() - start < 2
+        assert client.hedging_policy.hedges == 5
+        assert client.health[hang].failures == 0
+        client.close()
+
+    def test_no_hedging_without_flag(self):
+        client = MultiRESTClient(self.service_urls, use_random_server=False,
+                                 hedging_policy=HedgingPolicy(
+                                     initial_delay=0.1))
+        result = client.request('search', {'q': 1})
+        assert result['path'] == '/slow/search'
+        assert client.hedging_policy.hedges == 0
+
+    def test_budget_exhausted(self):
+        policy = HedgingPolicy(initial_delay=0.1, budget=0)
+        policy.hedges = 1
+        client = MultiRESTClient(self.service_urls, use_random_server=False,
+                                 hedging_policy=policy)
+        result = client.request('search', {'q': 1}, hedge=True)
+        assert result['path'] == '/slow/search'
+
+    def get_admitted_client(self, service_urls, client_class=MultiRESTClient):
+        return client_class(service_urls, use_random_server=False,
+                            admission_control=AdmissionController(),
+                            hedging_policy=HedgingPolicy(initial_delay=0.1))
+
+    @staticmethod
+    def wait_for_release(client):
+        deadline = time.time() + 2
+        while any(limiter.in_flight for limiter
+                  in client.admission.limiters.values()):
+            assert time.time() < deadline
+            time.sleep(0.01)
+
+    def test_hedge_admission(self):
+        client = self.get_admitted_client(self.service_urls)
+        slow, fast = client.clients.values()
+        result = client.request('search', {'q': 1}, hedge=True)
+        assert result['path'] == '/fast/search'
+        self.wait_for_release(client)
+        assert client.admission.get_limiter(fast)._successes == 1
+
+        # no hedge is sent, if the hedge node has no free slot
+        limiter = client.admission.get_limiter(fast)
+        limiter.in_flight = limiter.limit
+        result = client.request('search', {'q': 1}, hedge=True)
+        assert result['path'] == '/slow/search'
+        assert client.health[fast].requests == 1
+        client.close()
+
+    def test_hedge_overload(self):
+        client = self.get_admitted_client([self.url + '/slow',
+                                           self.url + '/busy'])
+        busy = list(client.clients.values())[1]
+        result = client.request('search', {'q': 1}, hedge=True)
+        assert result['path'] == '/slow/search'
+        self.wait_for_release(client)
+        # the hedge's overload response reached the busy node's limiter
+        limiter = client.admission.get_limiter(busy).as_dict()
+        assert limiter['overloads'] == 1
+        assert limiter['blocked_for'] > 50
+        client.close()
+
+    def test_async_hedge_overload(self):
+        client = self.get_admitted_client([self.url + '/slow',
+                                           self.url + '/busy'],
+                                          AsyncMultiRESTClient)
+        busy = list(client.clients.values())[1]
+        result = asyncio.run(client.request('search', {'q': 1}, hedge=True))
+        assert result['path'] == '/slow/search'
+        self.wait_for_release(client)
+        assert client.admission.get_limiter(busy).as_dict()['overloads'] == 1
+
+    def test_async_hedged_request(self):
+        client = AsyncMultiRESTClient(self.service_urls,
+                                      use_random_server=False,
+                                      hedging_policy=HedgingPolicy(
+                                          initial_delay=0.1))
+        start = time.time()
+        result = asyncio.run(client.request('search', {'q': 1}, hedge=True))
+        assert time.time() - start < 0.8
+        assert result['path'] == '/fast/search'
+
+
+if __name__ == '__main__':
+    unittest.main()
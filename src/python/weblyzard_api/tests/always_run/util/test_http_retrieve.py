@@ -19,13 +19,17 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from future import standard_library
 standard_library.install_aliases()
+import json
 import unittest
 import urllib.request, urllib.error, urllib.parse
 
 from pytest import raises
 from socket import timeout
 
-from weblyzard_api.util.http import DEFAULT_TIMEOUT, Retrieve, setdefaulttimeout, log
+from weblyzard_api.util.http import (DEFAULT_TIMEOUT, Retrieve,
+                                     setdefaulttimeout, log)
+from weblyzard_api.tests.always_run.util.http_server import (
+    LocalServerTestCase)
 
 
 class TestHttpRetrieve(unittest.TestCase):
@@ -100,6 +104,72 @@ class TestHttpRetrieve(unittest.TestCase):
             if user:
                 assert url != test_url
 
+
+class TestConnectionPool(LocalServerTestCase):
+    ''' tests keep-alive connection pooling against a local server '''
+
+    def test_connection_reuse(self):
+        r = Retrieve(self.__class__.__name__, sleep_time=0)
+        ports = set()
+        for no in range(5):
+            response = json.loads(r.open('%s/%d' % (self.url, no)).read())
+            assert response['path'] == '/%d' % no
+            ports.add(response['port'])
+        assert len(ports) == 1
+        r.close()
+
+    def test_post_and_gzip(self):
+        r = Retrieve(self.__class__.__name__, sleep_time=0)
+        first = json.loads(r.open(self.url + '/post', data='hallo').read())
+        second = json.loads(r.open(self.url + '/gzip').read())
+        assert first['body'] == 'hallo'
+        assert second['path'] == '/gzip'
+        assert first['port'] == second['port']
+
+    def test_streaming_gzip(self):
+        r = Retrieve(self.__class__.__name__, sleep_time=0, pool_size=1)
+        handle = r.open(self.url + '/gzip')
+        assert handle.headers['Content-Encoding'] == 'gzip'
+        assert handle.getcode() == 200
+        # the compressed body is decompressed while reading from the socket
+        assert handle.fileobj is handle.response
+        first = json.loads(handle.read())
+        handle.close()
+        assert handle.response.closed
+        second = json.loads(r.open(self.url + '/gzip').read())
+        assert first['path'] == second['path'] == '/gzip'
+        assert first['port'] == second['port']
+
+    def test_partially_read_response_is_discarded(self):
+        r = Retrieve(self.__class__.__name__, sleep_time=0,
+                     pool_size=1)
+        handle = r.open(self.url + '/a')
+        handle.read(1)
+        handle.close()
+        assert not sum(len(pool) for pool in r.pool_manager._pools.values())
+        assert json.loads(r.open(self.url + '/b').read())['path'] == '/b'
+
+    def test_idle_timeout(self):
+        r = Retrieve(self.__class__.__name__, sleep_time=0,
+                     pool_idle_timeout=0)
+        first = json.loads(r.open(self.url + '/a').read())
+        second = json.loads(r.open(self.url + '/b').read())
+        assert first['port'] != second['port']
+
+    def test_stale_connection(self):
+        ''' the server silently drops the idle connection '''
+        r = Retrieve(self.__class__.__name__, sleep_time=0)
+        first = json.loads(r.open(self.url + '/drop').read())
+        second = json.loads(r.open(self.url + '/b').read())
+        assert second['path'] == '/b'
+        assert first['port'] != second['port']
+
+    def test_opener_is_not_installed(self):
+        opener = urllib.request._opener
+        Retrieve(self.__class__.__name__, sleep_time=0).open(self.url).read()
+        assert urllib.request._opener is opener
+
+
 def t_retrieve(url):
     ''' retrieves the given url from the web
 
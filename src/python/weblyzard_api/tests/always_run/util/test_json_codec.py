@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the JSON codec and its fallback to the standard library.
+'''
+import json
+import math
+import unittest
+
+from weblyzard_api.model import CharSpan
+from weblyzard_api.model.parsers import XMLParser
+from weblyzard_api.util import json_codec
+
+
+class TestJsonCodec(unittest.TestCase):
+
+    VALUES = [{'content_id': 2 ** 70, 'title': 'Überschrift', 'a/b': [1.5]},
+              {1: 'non string key'},
+              [None, True, False, -0.25, 'x' * 100],
+              'text', 12]
+
+    def test_round_trip(self):
+        for value in self.VALUES:
+            expected = json.loads(json.dumps(value))
+            assert json_codec.loads(json_codec.dumps(value)) == expected
+            assert json_codec.loads(json_codec.dumpb(value)) == expected
+
+    def test_special_floats(self):
+        encoded = json_codec.dumps({'score': float('nan'),
+                                    'max': float('inf')})
+        assert encoded == json.dumps({'score': float('nan'),
+                                      'max': float('inf')})
+
+    def test_compatible(self):
+        for value in self.VALUES + [{'ü': ['ß', CharSpan(start=0, end=1)]}]:
+            assert json_codec.dumps(value, compatible=True) == \
+                json.dumps(value, default=lambda obj: obj.__json__())
+
+    def test_json_hook(self):
+        span = CharSpan(start=1, end=5)
+        assert json_codec.loads(json_codec.dumps([span])) == [span.to_dict()]
+        with self.assertRaises(TypeError):
+            json_codec.dumps(object())
+
+    def test_loads(self):
+        assert json_codec.loads(b'\xef\xbb\xbf{"a": 1}') == {'a': 1}
+        assert json_codec.loads('{"a": "b\x01"}', strict=False) == \
+            {'a': 'b\x01'}
+        for invalid in ('{"a": "b\x01"}', 'text', '{"a": '):
+            with self.assertRaises(ValueError):
+                json_codec.loads(invalid)
+
+    def test_loads_value(self):
+        for value in ('12', '-0.5', '1e3', '123456789012345678901234567890',
+                      '"\\ud800"', '[1, "a"]', 'true', 'null'):
+            assert json_codec.loads_value(value) == json.loads(value)
+        assert math.isnan(json_codec.loads_value('NaN'))
+        assert json_codec.loads_value('-Infinity') == float('-inf')
+        for invalid in ('text', 'NN VB', '0,5 6,9', ''):
+            with self.assertRaises(ValueError):
+                json_codec.loads_value(invalid)
+
+    def test_parser_values(self):
+        assert XMLParser.decode_value('123456789012345678901234567890') == \
+            123456789012345678901234567890
+        assert XMLParser.decode_value('[1, 2]') == [1, 2]
+        for value in ('Infinity', '-Infinity', '1e400', 'text'):
+            assert XMLParser.decode_value(value) == value
+        assert XMLParser.cast_item('True') is True
+        assert XMLParser.cast_item('12') == 12
+        assert XMLParser.cast_item('{"a": null}') == {'a': None}
+        assert XMLParser.cast_item('text') == 'text'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests the incremental decoding of JSON arrays.
+'''
+import json
+import unittest
+
+from io import BytesIO
+
+from weblyzard_api.client import MultiRESTClient
+from weblyzard_api.util.json_stream import iter_json_array
+from weblyzard_api.tests.always_run.util.http_server import (
+    EchoRequestHandler, LocalServerTestCase)
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    DATA = [{'content_id': i, 'value': 'Überschrift %d' % i,
+             'scores': [1.5, None, True]} for i in range(100)] + \
+        [12345678, 'text', [], {}]
+
+    def test_chunk_sizes(self):
+        raw = json.dumps(self.DATA, ensure_ascii=False).encode('utf-8')
+        for chunk_size in (1, 2, 3, 7, 1024):
+            assert list(iter_json_array(BytesIO(raw),
+                                        chunk_size=chunk_size)) == self.DATA
+
+    def test_whitespace_and_bom(self):
+        assert list(iter_json_array(BytesIO(b' [ ] '))) == []
+        assert list(iter_json_array(BytesIO(b''))) == []
+        assert list(iter_json_array(BytesIO(b'\xef\xbb\xbf[1, 22 ,\n333]'),
+                                    chunk_size=1)) == [1, 22, 333]
+
+    def test_invalid_input(self):
+        for invalid in (b'{"a": 1}', b'[1,', b'[1 2]', b'[1,]'):
+            with self.assertRaises(ValueError):
+                list(iter_json_array(BytesIO(invalid), chunk_size=2))
+
+    def test_incremental(self):
+        fp = BytesIO(json.dumps(list(range(10000))).encode('utf-8'))
+        iterator = iter_json_array(fp, chunk_size=16)
+        assert next(iterator) == 0
+        assert fp.tell() < 100
+        iterator.close()
+        assert fp.closed
+
+
+class TestStreamResult(LocalServerTestCase):
+    REQUEST_HANDLER = EchoRequestHandler
+
+    def test_stream_result(self):
+        client = MultiRESTClient(self.url)
+        documents = [{'id': i} for i in range(100)]
+        result = client.request('echo', documents, stream_result=True)
+        assert not isinstance(result, list)
+        assert list(result) == documents
+
+
+if __name__ == '__main__':
+    unittest.main()
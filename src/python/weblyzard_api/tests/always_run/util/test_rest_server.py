@@ -10,11 +10,28 @@ from future import standard_library
 standard_library.install_aliases()
 from builtins import str
 from builtins import range
+import json
+import time
 import unittest
 
 from urllib.error import HTTPError
 
-from weblyzard_api.client import MultiRESTClient, RESTClient
+from weblyzard_api.client import MultiRESTClient, RESTClient, NodeResult
+from weblyzard_api.tests.always_run.util.http_server import (
+    KeepAliveRequestHandler, LocalServerTestCase)
+
+
+class SlowRequestHandler(KeepAliveRequestHandler):
+    ''' delays every response and fails for paths containing /missing '''
+
+    def do_GET(self):
+        time.sleep(0.2)
+        if '/missing' in self.path:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            KeepAliveRequestHandler.do_GET(self)
 
 
 class TestRESTClient(unittest.TestCase):
@@ -89,5 +106,61 @@ class TestRESTClient(unittest.TestCase):
         assert service_urls != client._service_urls
 
 
+class TestExecuteAllServices(LocalServerTestCase):
+    ''' tests broadcasting requests to all services '''
+    REQUEST_HANDLER = SlowRequestHandler
+
+    def test_concurrent_execution(self):
+        service_urls = ['%s/node%d' % (self.url, i) for i in range(8)]
+        client = MultiRESTClient(service_urls, use_random_server=False)
+
+        start = time.time()
+        results = client.request('profile', execute_all_services=True,
+                                 return_node_results=True)
+        assert time.time() - start < 1.0
+
+        assert [r.service_url for r in results] == service_urls
+        for no, result in enumerate(results):
+            assert isinstance(result, NodeResult)
+            assert result.error is None
+            assert result.response['path'] == '/node%d/profile' % no
+
+    def test_max_workers(self):
+        service_urls = ['%s/node%d' % (self.url, i) for i in range(4)]
+        client = MultiRESTClient(service_urls, use_random_server=False,
+                                 max_workers=1)
+        start = time.time()
+        client.request('profile', execute_all_services=True)
+        assert time.time() - start >= 0.8
+
+    def test_per_node_errors(self):
+        service_urls = [self.url + '/node0', self.url + '/missing']
+        client = MultiRESTClient(service_urls, use_random_server=False)
+        ok, failed = client.request('profile', execute_all_services=True,
+                                    return_node_results=True)
+        assert ok.response['path'] == '/node0/profile'
+        assert ok.error is None
+        assert failed.response is None
+        assert isinstance(failed.error, HTTPError)
+
+        # by default, only the responses of the successful nodes are
+        # returned (the failed ones are logged)
+        with self.assertLogs('weblyzard_api.client', 'WARNING') as logs:
+            responses = client.request('profile', execute_all_services=True)
+        assert [response['path'] for response in responses] == \
+            ['/node0/profile']
+        assert service_urls[1] in logs.output[0]
+
+        with self.assertRaises(HTTPError):
+            client.request('profile', execute_all_services=True,
+                           pass_through_exceptions=(HTTPError, ))
+
+    def test_all_services_fail(self):
+        client = MultiRESTClient([self.url + '/missing'] * 2)
+        with self.assertRaises(Exception) as e:
+            client.request('profile', execute_all_services=True)
+        assert 'Could not make request to path' in str(e.exception)
+
+
 if __name__ == '__main__':
     unittest.main()
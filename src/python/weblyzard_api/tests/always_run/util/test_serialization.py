@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Tests request body compression and serializer negotiation.
+'''
+import asyncio
+import gzip
+import json
+import unittest
+
+from weblyzard_api.client import (RESTClient, MultiRESTClient,
+                                  AsyncMultiRESTClient)
+from weblyzard_api.client.serialization import (
+    JSONSerializer, get_serializer, check_compression, msgpack, zstandard)
+from weblyzard_api.tests.always_run.util.http_server import (
+    KeepAliveRequestHandler, LocalServerTestCase)
+
+
+class CompressionRequestHandler(KeepAliveRequestHandler):
+    ''' echoes the request's headers and (decompressed) body; services
+    below /plain reject compressed requests '''
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        encoding = self.headers.get('Content-Encoding')
+        if encoding and self.path.startswith('/plain'):
+            self.send_response(415)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+
+        payload = json.dumps({'content_encoding': encoding,
+                              'content_type': self.headers['Content-Type'],
+                              'body': json.loads(body)}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class TestSerialization(LocalServerTestCase):
+    REQUEST_HANDLER = CompressionRequestHandler
+
+    DOCUMENTS = [{'id': i, 'sentences': ['This is sentence %d.' % i] * 10}
+                 for i in range(20)]
+
+    def test_get_serializer(self):
+        assert isinstance(get_serializer(), JSONSerializer)
+        serializer = JSONSerializer(dumps=lambda obj: json.dumps(obj,
+                                                                 indent=1))
+        assert get_serializer(serializer) is serializer
+        assert serializer.dumps({'a': 1}) == b'{\n "a": 1\n}'
+        with self.assertRaises(ValueError):
+            get_serializer('yaml')
+        with self.assertRaises(ValueError):
+            check_compression('brotli')
+        if msgpack is None:
+            with self.assertRaises(ImportError):
+                get_serializer('msgpack')
+        if zstandard is None:
+            with self.assertRaises(ImportError):
+                check_compression('zstd')
+
+    def test_gzip_compression(self):
+        client = RESTClient(self.url, compression='gzip')
+        result = client.execute('submit', parameters=self.DOCUMENTS)
+        assert result['content_encoding'] == 'gzip'
+        assert result['body'] == self.DOCUMENTS
+
+        # small requests are not compressed
+        result = client.execute('submit', parameters={'id': 1})
+        assert result['content_encoding'] is None
+
+    def test_fallback(self):
+        client = MultiRESTClient(self.url + '/plain', compression='gzip')
+        result = client.request('submit', self.DOCUMENTS)
+        assert result['content_encoding'] is None
+        assert result['body'] == self.DOCUMENTS
+        assert client.clients[0].compression is None
+
+    def test_async_fallback(self):
+        client = AsyncMultiRESTClient(self.url + '/plain', compression='gzip')
+        result = asyncio.run(client.request('submit', self.DOCUMENTS))
+        assert result['body'] == self.DOCUMENTS
+        assert client.clients[0].compression is None
+
+
+if __name__ == '__main__':
+    unittest.main()
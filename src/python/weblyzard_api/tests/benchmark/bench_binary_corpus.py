@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks random access to a binary corpus against parsing the
+documents' JSON representation.
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_binary_corpus [documents]
+'''
+import os
+import random
+import sys
+import tempfile
+
+from timeit import repeat
+
+from weblyzard_api.model.binary_corpus import BinaryCorpus, write_corpus
+from weblyzard_api.model.document import Document
+from weblyzard_api.tests.benchmark.bench_json_codec import get_document_json
+
+ROUNDS = 100
+
+
+def main(count=1000):
+    document = Document.from_json(get_document_json(10))
+    documents = []
+    for content_id in range(count):
+        document.content_id = content_id
+        documents.append(document.to_json())
+    path = os.path.join(tempfile.mkdtemp(), 'corpus.wlc')
+    write_corpus(path, (Document.from_json(line) for line in documents))
+    print('%d documents, %d bytes' % (count, os.path.getsize(path)))
+
+    content_ids = [random.randrange(count) for _ in range(ROUNDS)]
+    with BinaryCorpus(path) as corpus:
+        binary = min(repeat(lambda: [corpus[content_id].header
+                                     for content_id in content_ids],
+                            number=1, repeat=5)) / ROUNDS
+        partitions = min(repeat(lambda: [
+            corpus[content_id].partitions['TOKEN']
+            for content_id in content_ids], number=1, repeat=5)) / ROUNDS
+    json_ = min(repeat(lambda: [Document.from_json(documents[content_id])
+                                .partitions['TOKEN']
+                                for content_id in content_ids],
+                       number=1, repeat=5)) / ROUNDS
+    print('load:        json %8.3f ms, binary %8.3f ms (%.2fx)' % (
+        json_ * 1000, binary * 1000, json_ / binary))
+    print('load tokens: json %8.3f ms, binary %8.3f ms (%.2fx)' % (
+        json_ * 1000, partitions * 1000, json_ / partitions))
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
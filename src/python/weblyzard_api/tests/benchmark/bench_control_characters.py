@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks the removal of control characters from XML values and the
+XML serialization of the bundled test documents against the former per
+character implementation.
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_control_characters
+'''
+import unicodedata
+
+from timeit import repeat
+
+from mock import patch
+
+from weblyzard_api.model.parsers import XMLParser, get_control_characters
+from weblyzard_api.model.xml_content import XMLContent
+from weblyzard_api.tests.benchmark.bench_xml_parser import get_test_documents
+
+ROUNDS = 3
+
+
+def remove_control_characters(cls, value):
+    ''' the former implementation of `XMLParser.remove_control_characters` '''
+    return ''.join(ch for ch in value if unicodedata.category(ch)[0] != 'C')
+
+
+def benchmark(function):
+    ''' :returns: the best time of the given function in milliseconds '''
+    return min(repeat(function, number=ROUNDS, repeat=3)) / ROUNDS * 1000
+
+
+def main():
+    documents = []
+    for _, document in get_test_documents():
+        try:
+            documents.append(XMLContent(document))
+        except Exception:
+            continue
+    values = [sentence.value for document in documents
+              for sentence in document.sentences + document.titles
+              if sentence.value]
+    values.extend(str(value) for document in documents
+                  for value in document.attributes.values())
+    print('%d documents, %d values, %d characters' % (
+        len(documents), len(values), sum(len(value) for value in values)))
+    # build the pattern outside of the measurements
+    get_control_characters()
+
+    old = benchmark(lambda: [remove_control_characters(XMLParser, value)
+                             for value in values])
+    new = benchmark(lambda: [XMLParser.remove_control_characters(value)
+                             for value in values])
+    print('values:   per character %8.2f ms, pattern %8.2f ms (%.1fx)' % (
+        old, new, old / new))
+
+    def dump():
+        return [document.get_xml_document() for document in documents]
+
+    new = benchmark(dump)
+    with patch.object(XMLParser, 'remove_control_characters',
+                      classmethod(remove_control_characters)):
+        old = benchmark(dump)
+    print('dump_xml: per character %8.2f ms, pattern %8.2f ms (%.1fx)' % (
+        old, new, old / new))
+
+
+if __name__ == '__main__':
+    main()
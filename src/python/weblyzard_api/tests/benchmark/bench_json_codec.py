@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks document JSON round trips (:meth:`Document.from_json` and
+:func:`json_codec.dumps` of :meth:`Document.to_dict`) using the
+accelerated JSON backend against the standard library.
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_json_codec [copies]
+'''
+import sys
+
+from contextlib import contextmanager
+from timeit import repeat
+
+from weblyzard_api.model.document import Document
+from weblyzard_api.tests.always_run.model.test_json2018 import (
+    TestJSON2018Parser)
+from weblyzard_api.util import json_codec
+
+ROUNDS = 20
+
+
+@contextmanager
+def stdlib_backend():
+    ''' temporarily disables the accelerated backends '''
+    backends = json_codec.orjson, json_codec.ujson
+    json_codec.orjson = json_codec.ujson = None
+    try:
+        yield
+    finally:
+        json_codec.orjson, json_codec.ujson = backends
+
+
+def get_document_json(copies):
+    ''' :returns: the test document with its partitions and annotations \
+        repeated `copies` times '''
+    document = json_codec.loads(TestJSON2018Parser.JSON_2018)
+    document['partitions'] = {
+        label: spans * copies
+        for label, spans in document.get('partitions', {}).items()}
+    document['annotations'] = document.get('annotations', []) * copies
+    return json_codec.dumps(document)
+
+
+def round_trip(document_json):
+    document = Document.from_json(document_json)
+    return Document.from_json(json_codec.dumps(document.to_dict()))
+
+
+def benchmark(document_json):
+    ''' :returns: the best time of a document round trip in seconds '''
+    return min(repeat(lambda: round_trip(document_json),
+                      number=ROUNDS, repeat=5)) / ROUNDS
+
+
+def main(copies=100):
+    document_json = get_document_json(copies)
+    print('backend: %s, document size: %d bytes' % (json_codec.BACKEND,
+                                                     len(document_json)))
+    accelerated = benchmark(document_json)
+    with stdlib_backend():
+        stdlib = benchmark(document_json)
+    print('json:   %8.3f ms per round trip' % (stdlib * 1000))
+    print('%-7s %8.3f ms per round trip (speedup %.2fx)' % (
+        json_codec.BACKEND + ':', accelerated * 1000, stdlib / accelerated))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
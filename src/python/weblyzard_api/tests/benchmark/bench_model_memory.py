@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks the memory footprint of the slotted model classes (char spans,
+sentences and annotations) against equivalent objects which store their
+attributes in a per-instance __dict__ (i.e. the former model classes).
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_model_memory [documents]
+'''
+import gc
+import sys
+import tracemalloc
+
+from copy import copy
+
+from weblyzard_api.model import (Annotation, LayoutCharSpan, NerCharSpan,
+                                 Sentence, SentenceCharSpan, SentimentCharSpan,
+                                 TokenCharSpan, get_attributes)
+
+SENTENCES = 20
+TOKENS = 18
+ANNOTATIONS = 10
+POS_TAGS = ('DT', 'NN', 'VBZ', 'JJ', 'IN', '.')
+
+
+class DictModel(object):
+    ''' stores the attributes of a model object in its __dict__ '''
+
+    def __init__(self, obj):
+        self.__dict__.update(get_attributes(obj))
+
+
+def get_document(seed):
+    ''' :returns: the model objects of a representative document '''
+    objects = [LayoutCharSpan(start=0, end=SENTENCES * 100, layout='p',
+                              title=False, level=0)]
+    for sentence_no in range(SENTENCES):
+        offset = sentence_no * 100
+        objects.append(SentenceCharSpan(start=offset, end=offset + 90,
+                                        md5sum='%032x' % (seed + sentence_no),
+                                        sem_orient=0.1, significance=0.5))
+        objects.append(Sentence(md5sum='%032x' % (seed + sentence_no),
+                                pos=' '.join(POS_TAGS), token='0,3 4,9',
+                                value='sentence %d' % sentence_no))
+        objects.extend(TokenCharSpan(start=offset + i * 5,
+                                     end=offset + i * 5 + 4,
+                                     pos=POS_TAGS[i % len(POS_TAGS)],
+                                     dependency={'parent': i - 1,
+                                                 'label': 'NMOD'})
+                       for i in range(TOKENS))
+    for annotation_no in range(ANNOTATIONS):
+        start = annotation_no * 100
+        objects.append(NerCharSpan(start=start, end=start + 8,
+                                   label='PERSON'))
+        objects.append(SentimentCharSpan(start=start, end=start + 8,
+                                         value=-0.5, modality='neg'))
+        objects.append(Annotation(annotation_type='PersonEntity',
+                                  start=start, end=start + 8,
+                                  key='http://www.wikidata.org/entity/Q%d'
+                                  % annotation_no,
+                                  surfaceForm='Jane Doe',
+                                  preferredName='Jane Doe'))
+    return objects
+
+
+def measure(factory):
+    ''' :returns: the result of `factory` and the memory allocated by it '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = factory()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def main(documents=200):
+    corpus = [get_document(i * SENTENCES) for i in range(documents)]
+    # both variants share the attribute values, i.e. only the objects
+    # themselves are measured
+    _, slotted = measure(
+        lambda: [[copy(obj) for obj in document] for document in corpus])
+    _, dict_based = measure(
+        lambda: [[DictModel(obj) for obj in document] for document in corpus])
+    print('%d documents, %d model objects' % (
+        documents, sum(len(document) for document in corpus)))
+    print('__dict__ based objects: %8.2f MB' % (dict_based / 1e6))
+    print('slotted objects:        %8.2f MB (%.2fx less memory)' % (
+        slotted / 1e6, dict_based / slotted))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
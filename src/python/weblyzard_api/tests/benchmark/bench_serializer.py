@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks the compiled document serializer against the former recursive
+`Document._dict_transform` implementation.
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_serializer [copies]
+'''
+import io
+import json
+import sys
+
+from timeit import repeat
+
+from weblyzard_api.model.document import Document
+from weblyzard_api.tests.always_run.model.test_serializer import (
+    dict_transform)
+from weblyzard_api.tests.benchmark.bench_json_codec import get_document_json
+
+ROUNDS = 10
+
+
+def benchmark(function):
+    ''' :returns: the best time of the given function in seconds '''
+    return min(repeat(function, number=ROUNDS, repeat=5)) / ROUNDS
+
+
+def main(copies=100):
+    document = Document.from_json(get_document_json(copies))
+    # convert the partitions, which are accessed by both serializers
+    document.partitions.items()
+    print('%d spans' % sum(len(spans) for spans
+                           in document.partitions.values()))
+
+    recursive = benchmark(lambda: dict_transform(document, Document.MAPPING))
+    compiled = benchmark(document.to_dict)
+    print('to_dict:  recursive %8.3f ms, compiled %8.3f ms (%.2fx)' % (
+        recursive * 1000, compiled * 1000, recursive / compiled))
+
+    recursive = benchmark(lambda: json.dump(
+        dict_transform(document, Document.MAPPING), io.StringIO()))
+    streaming = benchmark(lambda: document.dump(io.StringIO()))
+    print('dump:     recursive %8.3f ms, streaming %7.3f ms (%.2fx)' % (
+        recursive * 1000, streaming * 1000, recursive / streaming))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Benchmarks the XML parsers on the bundled test documents and on a large
+synthetic document.
+
+Usage::
+
+    python -m weblyzard_api.tests.benchmark.bench_xml_parser [sentences]
+'''
+import gzip
+import os
+import pickle
+import sys
+
+from timeit import repeat
+
+from weblyzard_api.model.parsers.xml_2013 import XML2013
+from weblyzard_api.model.xml_content import XMLContent
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+ROUNDS = 3
+
+
+def get_test_documents():
+    ''' :returns: a list of (parser, document) tuples of the test fixtures '''
+    with gzip.open(os.path.join(DATA_DIR, 'xml_documents.pickle.gz')) as fp:
+        documents = pickle.load(fp)
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith('.xml'):
+            with open(os.path.join(DATA_DIR, name)) as fp:
+                documents.append(fp.read())
+    result = []
+    for document in documents:
+        version = XMLContent.get_xml_version(document)
+        if version:
+            result.append((XMLContent.SUPPORTED_XML_VERSIONS[version],
+                           document))
+    return result
+
+
+def get_large_document(sentences):
+    ''' :returns: a document with the given number of unique sentences, \
+        each with an annotation '''
+    parts = ['<wl:page xmlns:wl="http://www.weblyzard.com/wl/2013#" '
+             'wl:id="1" xml:lang="en">']
+    for i in range(sentences):
+        parts.append('<wl:sentence wl:id="%032x" wl:pos="NN" wl:token="0,8" '
+                     'wl:is_title="%s"><![CDATA[Sentence %d]]></wl:sentence>'
+                     % (i, 'true' if i % 10 == 0 else 'false', i))
+        parts.append('<wl:annotation wl:key="x.org" wl:start="0" wl:end="8" '
+                     'wl:md5sum="%032x"/>' % i)
+    parts.append('</wl:page>')
+    return ''.join(parts)
+
+
+def benchmark(function):
+    ''' :returns: the best time of the given function in milliseconds '''
+    return min(repeat(function, number=ROUNDS, repeat=3)) / ROUNDS * 1000
+
+
+def main(sentences=5000):
+    documents = get_test_documents()
+    print('%d test documents' % len(documents))
+    print('fixtures: parse %8.2f ms, parse_stream %8.2f ms' % (
+        benchmark(lambda: [parser.parse(document, raise_on_empty=False)
+                           for parser, document in documents]),
+        benchmark(lambda: [parser.parse_stream(document,
+                                               raise_on_empty=False)
+                           for parser, document in documents])))
+
+    document = get_large_document(sentences)
+    print('%d sentences: parse %8.2f ms, parse_stream %8.2f ms' % (
+        sentences, benchmark(lambda: XML2013.parse(document)),
+        benchmark(lambda: XML2013.parse_stream(document))))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
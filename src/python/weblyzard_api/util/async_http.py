@@ -0,0 +1,363 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#     @package weblyzard_api.utils.async_http
+#     provides non-blocking access to resources using http
+'''
+An asyncio counterpart to :class:`weblyzard_api.util.http.Retrieve`.
+
+The module implements the small subset of HTTP/1.1 required by the webLyzard
+web service clients on top of :func:`asyncio.open_connection`, so that a
+single event loop can keep thousands of requests in flight without
+depending on a third party HTTP library. Connections are kept alive and
+pooled per host, analogous to the connection pool used by `Retrieve`.
+
+Errors are reported using the same exception types as `Retrieve`
+(:class:`urllib.error.HTTPError` and :class:`urllib.error.URLError`), so
+that the retry logic of the clients works unchanged.
+'''
+import asyncio
+import io
+import ssl
+import time
+import zlib
+import logging
+
+from base64 import b64encode
+from collections import deque
+from email.parser import Parser
+from http.client import HTTPMessage
+from random import randint
+from typing import Dict
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+
+from weblyzard_api.util.http import (USER_AGENT, DEFAULT_TIMEOUT,
+                                     DEFAULT_POOL_SIZE,
+                                     DEFAULT_POOL_IDLE_TIMEOUT,
+                                     RETRY_WAIT_TIME_RANGE,
+                                     HTTP_TEMPORARY_ERROR_CODES)
+
+log = logging.getLogger(__name__)
+
+# max. number of concurrent connections per host
+DEFAULT_MAX_CONNECTIONS = 100
+
+STALE_CONNECTION_ERRORS = (ConnectionResetError, BrokenPipeError,
+                           asyncio.IncompleteReadError)
+
+
+class AsyncResponse(object):
+    ''' A fully received HTTP response. '''
+
+    __slots__ = ('url', 'status', 'reason', 'headers', 'body')
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def getcode(self):
+        return self.status
+
+    def info(self):
+        return self.headers
+
+
+class AsyncConnectionPool(object):
+    '''
+    Pool of idle keep-alive connections to a single host.
+
+    :param host: the host name
+    :param port: the port
+    :param use_ssl: whether to use TLS
+    :param pool_size: max. number of idle connections to keep
+    :param idle_timeout: seconds after which idle connections are discarded
+    :param max_connections: max. number of concurrent connections; further
+        requests wait until a connection becomes available.
+    '''
+
+    def __init__(self, host, port, use_ssl=False,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._idle = deque()
+        self._semaphore = None
+        self._loop = None
+
+    def _check_loop(self):
+        ''' connections and the semaphore are bound to the event loop they
+        have been created in, so they are discarded once the pool is used
+        from a different loop (e.g. by subsequent `asyncio.run` calls) '''
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._idle = deque()
+            self._semaphore = None
+            self._loop = loop
+
+    @property
+    def semaphore(self):
+        # created lazily to bind it to the running event loop
+        self._check_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        return self._semaphore
+
+    async def new_connection(self):
+        try:
+            return await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl,
+                server_hostname=self.host if self.ssl else None)
+        except OSError as e:
+            raise URLError(e)
+
+    async def get_connection(self):
+        ''' :returns: a tuple (reader, writer, reused) '''
+        self._check_loop()
+        now = time.time()
+        while self._idle:
+            reader, writer, last_used = self._idle.pop()
+            if now - last_used <= self.idle_timeout and \
+                    not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await self.new_connection()
+        return reader, writer, False
+
+    def put_connection(self, reader, writer, reusable=True):
+        if reusable and len(self._idle) < self.pool_size and \
+                not writer.is_closing():
+            self._idle.append((reader, writer, time.time()))
+        else:
+            writer.close()
+
+    def clear(self):
+        while self._idle:
+            _, writer, _ = self._idle.pop()
+            try:
+                writer.close()
+            except RuntimeError:
+                # the connection's event loop has already been closed
+                pass
+
+
+class AsyncRetrieve(object):
+    '''
+    Retrieves URLs using HTTP without blocking the event loop.
+
+    :param module: the module name to add to the user agent
+    :param user_agent: the user agent to use
+    :param default_timeout: timeout in seconds for a single request
+    :param pool_size: max. number of idle keep-alive connections per host
+    :param pool_idle_timeout: seconds after which idle connections are \
+        discarded
+    :param max_connections: max. number of concurrent connections per host
+
+    .. note::
+        Only basic authentification is supported.
+    '''
+
+    def __init__(self, module, user_agent=USER_AGENT,
+                 default_timeout=DEFAULT_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.module = module
+        self.timeout = default_timeout
+        self.pool_size = pool_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self.max_connections = max_connections
+        self._pools = {}
+        self.user_agent = user_agent % self.module \
+            if "%s" in user_agent else user_agent
+
+    def _get_pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        if key not in self._pools:
+            self._pools[key] = AsyncConnectionPool(
+                host, port, use_ssl=scheme == 'https',
+                pool_size=self.pool_size,
+                idle_timeout=self.pool_idle_timeout,
+                max_connections=self.max_connections)
+        return self._pools[key]
+
+    async def open(self, url: str, user: str=None, pwd: str=None,
+                   data=None, headers: Dict=None, retry: int=0,
+                   authentification_method: str="basic",
+                   accept_gzip: bool=True, head_only: bool=False):
+        ''' Open a URL and return the received response.
+            :param url: the URL to open
+            :param user: optional user name
+            :param pwd: optional password
+            :param data: optional data to submit
+            :param headers: a dictionary of optional headers
+            :param retry: number of retries in case of an temporary error
+            :param authentification_method: the used authentification_method
+                        (only 'basic' is supported)
+            :param accept_gzip: flag to change the accepted encoding, gzip
+                        or not
+            :param head_only: if True: only execute a HEAD request
+            :returns: an :class:`AsyncResponse`
+        '''
+        if authentification_method != 'basic':
+            raise ValueError('Unsupported authentification method %s' %
+                             authentification_method)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        request_headers = {'User-Agent': self.user_agent}
+        if accept_gzip:
+            request_headers['Accept-Encoding'] = 'gzip'
+        if user and pwd:
+            credentials = b64encode(('%s:%s' % (user, pwd)).encode('utf-8'))
+            request_headers['Authorization'] = 'Basic %s' % \
+                credentials.decode('ascii')
+        if headers:
+            request_headers.update(headers)
+
+        if head_only:
+            method = 'HEAD'
+        else:
+            method = 'GET' if data is None else 'POST'
+
+        tries = 0
+        while True:
+            try:
+                response = await asyncio.wait_for(
+                    self._request(method, url, data, request_headers),
+                    self.timeout)
+            except asyncio.TimeoutError:
+                raise URLError('timed out')
+
+            if response.status < 400:
+                return response
+
+            error = HTTPError(url, response.status, response.reason,
+                              response.headers, io.BytesIO(response.body))
+            if response.status in HTTP_TEMPORARY_ERROR_CODES and \
+                    tries < retry:
+                sleep_time = randint(*RETRY_WAIT_TIME_RANGE)
+                log.info(f'retrying in {sleep_time}; '
+                         f'received {response.status}')
+                await asyncio.sleep(sleep_time)
+                tries += 1
+                continue
+            raise error
+
+    async def _request(self, method, url, data, headers):
+        split_url = urlsplit(url)
+        if split_url.scheme not in ('http', 'https'):
+            raise URLError('unknown url type: %s' % split_url.scheme)
+        port = split_url.port or (443 if split_url.scheme == 'https' else 80)
+        pool = self._get_pool(split_url.scheme, split_url.hostname, port)
+
+        selector = split_url.path or '/'
+        if split_url.query:
+            selector = '%s?%s' % (selector, split_url.query)
+        host = split_url.hostname if not split_url.port else \
+            '%s:%d' % (split_url.hostname, split_url.port)
+
+        head = ['%s %s HTTP/1.1' % (method, selector), 'Host: %s' % host]
+        head.extend('%s: %s' % (key, value) for key, value in headers.items())
+        if data is not None:
+            head.append('Content-Length: %d' % len(data))
+        request = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1')
+        if data is not None:
+            request += data
+
+        async with pool.semaphore:
+            reader, writer, reused = await pool.get_connection()
+            try:
+                try:
+                    response, reusable = await self._exchange(
+                        reader, writer, request, method, url)
+                except STALE_CONNECTION_ERRORS:
+                    if not reused:
+                        raise
+                    # the server has closed the idle connection
+                    writer.close()
+                    pool.clear()
+                    reader, writer = await pool.new_connection()
+                    response, reusable = await self._exchange(
+                        reader, writer, request, method, url)
+            except asyncio.IncompleteReadError as e:
+                writer.close()
+                raise URLError(e)
+            except OSError as e:
+                writer.close()
+                raise URLError(e)
+            except BaseException:
+                writer.close()
+                raise
+            pool.put_connection(reader, writer, reusable)
+        return response
+
+    @classmethod
+    async def _exchange(cls, reader, writer, request, method, url):
+        ''' sends the request and reads the response
+        :returns: tuple (response, connection_reusable) '''
+        writer.write(request)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        version, status, reason = (status_line.decode('latin-1').rstrip(
+            '\r\n').split(' ', 2) + [''])[:3]
+        status = int(status)
+
+        header_lines = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            header_lines.append(line.decode('latin-1'))
+        headers = Parser(_class=HTTPMessage).parsestr(''.join(header_lines))
+
+        connection = (headers.get('Connection') or '').lower()
+        reusable = connection != 'close' and (
+            version == 'HTTP/1.1' or connection == 'keep-alive')
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in (headers.get('Transfer-Encoding') or '').lower():
+            body = await cls._read_chunked(reader)
+        elif headers.get('Content-Length') is not None:
+            body = await reader.readexactly(int(headers['Content-Length']))
+        else:
+            body = await reader.read()
+            reusable = False
+
+        if headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+        return AsyncResponse(url, status, reason, headers, body), reusable
+
+    @staticmethod
+    async def _read_chunked(reader):
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # skip trailer
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self):
+        ''' Close all idle keep-alive connections. '''
+        for pool in self._pools.values():
+            pool.clear()
@@ -23,11 +23,15 @@ from typing import Dict
 standard_library.install_aliases()
 
 import time
-import io
+import http.client
+import socket
 import urllib.request
 
+from collections import deque
 from gzip import GzipFile
 from random import randint
+from threading import Lock, local
+from urllib.error import URLError
 from urllib.parse import urlsplit, urlunsplit
 
 # logging
@@ -46,10 +50,320 @@ HTTP_TEMPORARY_ERROR_CODES = (500, 503, 504)
 from socket import setdefaulttimeout
 DEFAULT_TIMEOUT = 60
 
+# keep-alive connection pooling
+DEFAULT_POOL_SIZE = 10  # max. number of idle connections kept per host
+DEFAULT_POOL_IDLE_TIMEOUT = 60  # in seconds
+
+# errors indicating that the server has silently dropped an idle keep-alive
+# connection; requests failing with one of these on a reused connection are
+# retried once on a fresh connection.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected,
+                           ConnectionResetError, BrokenPipeError)
+
+
+# the AbortHandle of the requests issued by the current thread
+_abort_scope = local()
+
 
 def getHostName(x): return "://".join(urlsplit(x)[:2])
 
 
+class RequestAborted(Exception):
+    """ Raised by requests which have been aborted by
+        :meth:`AbortHandle.abort`. """
+
+
+class AbortHandle(object):
+    """ Allows aborting the requests issued within its context (by the
+        current thread) from any other thread, by shutting down their
+        connections.
+
+        Used for the losing request of a hedged call, which would otherwise
+        occupy its thread and connection until the socket times out.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._connections = []
+        self._lock = Lock()
+
+    def __enter__(self):
+        _abort_scope.handle = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _abort_scope.handle = None
+        with self._lock:
+            del self._connections[:]
+        if self.aborted and exc_type is not None and \
+                not issubclass(exc_type, RequestAborted):
+            raise RequestAborted('request aborted') from exc_value
+
+    def register(self, conn):
+        """ registers the connection of a request
+        :raises RequestAborted: if the handle has already been aborted """
+        with self._lock:
+            if self.aborted:
+                raise RequestAborted('request aborted')
+            self._connections.append(conn)
+
+    def abort(self):
+        """ aborts the current and all further requests of the handle """
+        with self._lock:
+            self.aborted = True
+            connections = list(self._connections)
+        for conn in connections:
+            sock = conn.sock
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class PooledHTTPResponse(http.client.HTTPResponse):
+    """ An HTTPResponse which hands its connection back to the
+        :class:`ConnectionPool` once the response body has been consumed.
+
+        Responses which are closed before their body has been read
+        completely discard the connection, since it still contains unread
+        data.
+    """
+
+    def __init__(self, *args, **kwargs):
+        http.client.HTTPResponse.__init__(self, *args, **kwargs)
+        self._release = None
+        self._reusable = True
+
+    def attach(self, release):
+        """ :param release: callable(reusable) invoked once the response \
+                is complete """
+        self._release = release
+        if self.fp is None:
+            # HEAD requests and empty bodies are complete right away
+            self._release_connection()
+
+    def close(self):
+        if self.fp is not None:
+            self._reusable = False
+        http.client.HTTPResponse.close(self)
+
+    def _close_conn(self):
+        http.client.HTTPResponse._close_conn(self)
+        self._release_connection()
+
+    def _release_connection(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release(self._reusable and not self.will_close)
+
+
+class GzipResponse(GzipFile):
+    """
+    Decompresses a gzip encoded response while it is read from the socket,
+    rather than buffering the whole compressed body.
+
+    Closing the GzipResponse also closes the underlying response (and,
+    therefore, releases its connection); all other attributes (e.g.
+    `headers`, `getcode()`) are delegated to the response.
+    """
+
+    def __init__(self, response):
+        GzipFile.__init__(self, fileobj=response, mode='rb')
+        self.response = response
+
+    def close(self):
+        try:
+            GzipFile.close(self)
+        finally:
+            self.response.close()
+
+    def __getattr__(self, name):
+        # only called for attributes not provided by the GzipFile
+        if name == 'response':
+            raise AttributeError(name)
+        return getattr(self.response, name)
+
+
+class ConnectionPool(object):
+    """ A thread-safe pool of idle keep-alive connections to a single host.
+
+    :param factory: callable returning a new, unconnected \
+        :class:`http.client.HTTPConnection`
+    :param pool_size: maximum number of idle connections to keep
+    :param idle_timeout: idle connections older than this number of \
+        seconds are closed rather than reused
+    """
+
+    def __init__(self, factory, pool_size=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        self._factory = factory
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._idle = deque()
+        self._lock = Lock()
+
+    def new_connection(self):
+        conn = self._factory()
+        conn.response_class = PooledHTTPResponse
+        return conn
+
+    def get_connection(self):
+        """ Check out a connection.
+        :returns: a tuple (connection, reused)
+        """
+        expired = []
+        now = time.time()
+        conn = None
+        with self._lock:
+            while self._idle:
+                candidate, last_used = self._idle.pop()
+                if now - last_used <= self.idle_timeout:
+                    conn = candidate
+                    break
+                # all remaining connections are even older
+                expired.append(candidate)
+                expired.extend(c for c, _ in self._idle)
+                self._idle.clear()
+
+        for candidate in expired:
+            candidate.close()
+
+        if conn is not None:
+            return conn, True
+        return self.new_connection(), False
+
+    def put_connection(self, conn, reusable=True):
+        """ Return a checked out connection to the pool. """
+        if reusable and conn.sock is not None:
+            with self._lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append((conn, time.time()))
+                    return
+        conn.close()
+
+    def clear(self):
+        """ Close all idle connections. """
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+    def __len__(self):
+        return len(self._idle)
+
+
+class PoolManager(object):
+    """ Maintains one :class:`ConnectionPool` per host. """
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self._pools = {}
+        self._lock = Lock()
+
+    def connection_pool(self, key, factory):
+        """ :returns: the ConnectionPool for the given key, which is \
+                created using the given connection factory if required """
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(factory, pool_size=self.pool_size,
+                                          idle_timeout=self.idle_timeout)
+                    self._pools[key] = pool
+        return pool
+
+    def clear(self):
+        """ Close all idle connections of all pools. """
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.clear()
+
+
+class _PooledHandlerMixin(object):
+    """ Replaces urllib's one-connection-per-request `do_open` with a
+        variant that draws keep-alive connections from a PoolManager. """
+
+    def __init__(self, pool_manager, *args, **kwargs):
+        super(_PooledHandlerMixin, self).__init__(*args, **kwargs)
+        self.pool_manager = pool_manager
+
+    def do_open(self, http_class, req, **http_conn_args):
+        host = req.host
+        if not host:
+            raise URLError('no host given')
+
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items()
+                        if k not in headers})
+        headers = {name.title(): val for name, val in headers.items()}
+
+        tunnel_headers = {}
+        if req._tunnel_host and 'Proxy-Authorization' in headers:
+            # Proxy-Authorization should not be sent to origin server.
+            tunnel_headers['Proxy-Authorization'] = headers.pop(
+                'Proxy-Authorization')
+
+        def factory():
+            conn = http_class(host, timeout=req.timeout, **http_conn_args)
+            conn.set_debuglevel(self._debuglevel)
+            if req._tunnel_host:
+                conn.set_tunnel(req._tunnel_host, headers=tunnel_headers)
+            return conn
+
+        pool = self.pool_manager.connection_pool(
+            (http_class, host, req._tunnel_host, req.timeout), factory)
+        conn, reused = pool.get_connection()
+        try:
+            response = self._send(conn, req, headers)
+        except STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            # the server has closed the idle connection in the meantime
+            pool.clear()
+            conn = pool.new_connection()
+            response = self._send(conn, req, headers)
+
+        response.attach(
+            lambda reusable: pool.put_connection(conn, reusable))
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        return response
+
+    @staticmethod
+    def _send(conn, req, headers):
+        try:
+            try:
+                conn.request(req.get_method(), req.selector, req.data,
+                             headers,
+                             encode_chunked=req.has_header(
+                                 'Transfer-encoding'))
+            except STALE_CONNECTION_ERRORS:
+                raise
+            except OSError as err:  # timeout error
+                raise URLError(err)
+            handle = getattr(_abort_scope, 'handle', None)
+            if handle is not None:
+                handle.register(conn)
+            return conn.getresponse()
+        except BaseException:
+            conn.close()
+            raise
+
+
+class PooledHTTPHandler(_PooledHandlerMixin, urllib.request.HTTPHandler):
+    pass
+
+
+class PooledHTTPSHandler(_PooledHandlerMixin, urllib.request.HTTPSHandler):
+    pass
+
+
 class Retrieve(object):
     """ @class Retrieve
         retrieves URLs using HTTP
@@ -70,14 +384,33 @@ class Retrieve(object):
     """
 
     __slots__ = ('module', 'sleep_time', 'last_access_time', 'user_agent',
+                 'timeout', 'pool_manager',
                  '_supported_http_authentification_methods')
 
     def __init__(self, module, sleep_time=DEFAULT_WEB_REQUEST_SLEEP_TIME,
-                 user_agent=USER_AGENT, default_timeout=DEFAULT_TIMEOUT):
+                 user_agent=USER_AGENT, default_timeout=DEFAULT_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 pool_manager=None):
+        """
+        :param module: the module name to add to the user agent
+        :param sleep_time: minimum delay between two requests
+        :param user_agent: the user agent to use
+        :param default_timeout: socket timeout in seconds
+        :param pool_size: max. number of idle keep-alive connections \
+            kept per host
+        :param pool_idle_timeout: number of seconds after which idle \
+            connections are discarded
+        :param pool_manager: an optional :class:`PoolManager` to share \
+            connections between multiple Retrieve objects
+        """
         setdefaulttimeout(default_timeout)
         self.module = module
         self.sleep_time = sleep_time
         self.last_access_time = 0
+        self.timeout = default_timeout
+        self.pool_manager = pool_manager if pool_manager is not None else \
+            PoolManager(pool_size=pool_size, idle_timeout=pool_idle_timeout)
 
         self._supported_http_authentification_methods = {
             'basic': Retrieve._getHTTPBasicAuthOpener,
@@ -123,15 +456,16 @@ class Retrieve(object):
 
             self._throttle()
 
-            opener = []
+            opener = [PooledHTTPHandler(self.pool_manager),
+                      PooledHTTPSHandler(self.pool_manager)]
             if PROXY_SERVER:
                 opener.append(urllib.request.ProxyHandler({"http": PROXY_SERVER}))
             if user and pwd:
                 opener.append(auth_handler(url, user, pwd))
 
-            urllib.request.install_opener(urllib.request.build_opener(*opener))
             try:
-                urlObj = urllib.request.urlopen(request)
+                urlObj = urllib.request.build_opener(*opener).open(
+                    request, timeout=self.timeout)
             except urllib.error.HTTPError as e:
                 if e.code in HTTP_TEMPORARY_ERROR_CODES and tries < retry:
                     sleep_time = randint(*RETRY_WAIT_TIME_RANGE)
@@ -178,8 +512,7 @@ class Retrieve(object):
         :param urlObj:
         :returns: an urlObj containing the uncompressed data
         """
-        compressedStream = io.BytesIO(urlObj.read())
-        return GzipFile(fileobj=compressedStream)
+        return GzipResponse(urlObj)
 
     def _throttle(self):
         """ delays web access according to the content provider's policy """
@@ -197,6 +530,11 @@ class Retrieve(object):
         """ context protocol support """
         if exc_type is not None:
             log.critical("%s" % exc_type)
+        self.close()
+
+    def close(self):
+        """ Close all idle keep-alive connections. """
+        self.pool_manager.clear()
 
     @staticmethod
     def get_user_password(url: str):
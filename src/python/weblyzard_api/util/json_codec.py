@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+JSON encoding and decoding using the fastest available backend.
+
+The codec uses `orjson` or `ujson` if one of them is installed and falls
+back to the standard library's :mod:`json` module otherwise. Values which
+are not supported by the accelerated backend (e.g. integers exceeding 64
+bit, non string dictionary keys, `NaN` or strings containing control
+characters when decoding with `strict=False`) are transparently handled
+by the standard library, so that the results do not depend on the
+installed backend.
+
+.. note::
+    The accelerated backends produce compact JSON (i.e. without whitespace
+    after separators) which contains non-ASCII characters unescaped.
+    orjson decodes integers exceeding 64 bit within documents as float;
+    :func:`loads_value` restores them for single values.
+    Use `dumps(obj, compatible=True)` for public representations (such as
+    `to_json`), which must not depend on the installed backend.
+'''
+import json
+import re
+
+from math import isinf, isnan
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if orjson is not None:
+    BACKEND = 'orjson'
+elif ujson is not None:
+    BACKEND = 'ujson'
+else:
+    BACKEND = 'json'
+
+# values accepted by the standard library but rejected by orjson: NaN,
+# (-)Infinity, numbers out of the float range and lone surrogates
+STDLIB_ONLY_VALUES = re.compile(
+    r'NaN|Infinity|\d[eE][+-]?\d{3}|\\u[dD][89a-fA-F]')
+
+# orjson serializes datetime objects and dataclasses natively, while the
+# standard library rejects them; pass them to `default` for consistency.
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | \
+        orjson.OPT_PASSTHROUGH_DATACLASS
+
+
+def _default(obj):
+    ''' serializes objects providing a `__json__` method (compare
+    :mod:`weblyzard_api`) '''
+    to_json = getattr(obj.__class__, '__json__', None)
+    if to_json is None:
+        raise TypeError('Object of type %s is not JSON serializable' %
+                        obj.__class__.__name__)
+    return to_json(obj)
+
+
+def _has_special_floats(obj):
+    ''' :returns: True if the given object contains NaN or infinite floats,
+        which are serialized as null by orjson '''
+    if isinstance(obj, float):
+        return isnan(obj) or isinf(obj)
+    if isinstance(obj, dict):
+        return any(_has_special_floats(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_special_floats(value) for value in obj)
+    return False
+
+
+def dumpb(obj):
+    '''
+    :param obj: the object to serialize
+    :returns: the UTF-8 encoded JSON representation of the object
+    '''
+    if orjson is not None:
+        try:
+            data = orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # orjson.JSONEncodeError is a subclass of TypeError
+            return json.dumps(obj).encode('utf-8')
+        # `null` is the only representation of NaN/Infinity orjson knows
+        if b'null' in data and _has_special_floats(obj):
+            return json.dumps(obj).encode('utf-8')
+        return data
+    return dumps(obj).encode('utf-8')
+
+
+def dumps(obj, compatible=False):
+    '''
+    :param obj: the object to serialize
+    :param compatible: if True, the result is identical to \
+        :func:`json.dumps` (i.e. with whitespace after separators and \
+        non-ASCII characters escaped) regardless of the installed backend
+    :returns: the JSON representation of the object as str
+    '''
+    if compatible:
+        return json.dumps(obj, default=_default)
+    if orjson is not None:
+        return dumpb(obj).decode('utf-8')
+    if ujson is not None:
+        try:
+            return ujson.dumps(obj, default=_default, ensure_ascii=False,
+                               escape_forward_slashes=False)
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return json.dumps(obj)
+
+
+def loads(data, strict=True):
+    '''
+    :param data: the JSON document as str or bytes
+    :param strict: if False, control characters are allowed within strings
+    :returns: the decoded object
+    :raises ValueError: if the data is not valid JSON
+    '''
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    elif ujson is not None and strict:
+        try:
+            return ujson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data, strict=strict)
+
+
+def loads_value(value):
+    '''
+    Decodes a single JSON value, such as an attribute value, which is
+    frequently not JSON at all. The result equals :func:`json.loads`, but
+    invalid values are only passed to the standard library if they might
+    contain constructs it accepts in contrast to the accelerated backend.
+
+    :param value: the JSON value as str
+    :raises ValueError: if the value is not valid JSON
+    '''
+    if orjson is None:
+        return json.loads(value)
+    try:
+        decoded = orjson.loads(value)
+    except ValueError:
+        if STDLIB_ONLY_VALUES.search(value) is None:
+            raise
+        return json.loads(value)
+    if isinstance(decoded, float) and not any(ch in value for ch in '.eE'):
+        # integers exceeding 64 bit are decoded as float by orjson
+        return json.loads(value)
+    return decoded
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+'''
+Incremental decoding of JSON array responses.
+
+:func:`iter_json_array` yields the elements of a JSON array while it is
+read from a file object (e.g. an HTTP response), so that only the
+element currently decoded needs to be kept in memory rather than the
+whole response.
+'''
+import codecs
+
+from json import JSONDecoder, JSONDecodeError
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_array(fp, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8',
+                    close=True):
+    '''
+    Yields the elements of the JSON array read from the given file object.
+
+    :param fp: a binary file object containing a JSON array
+    :param chunk_size: the number of bytes to read at once
+    :param encoding: the response's encoding
+    :param close: close `fp` once the array has been consumed (or the \
+        generator is closed)
+    :raises ValueError: if the response is not a JSON array
+    '''
+    decoder = JSONDecoder()
+    if codecs.lookup(encoding).name == 'utf-8':
+        # transparently strip byte order marks
+        encoding = 'utf-8-sig'
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill(size):
+        ''' appends at least `size` bytes to the buffer
+        :returns: False if the end of the file has been reached '''
+        nonlocal buffer, pos
+        data = fp.read(size)
+        if buffer and pos:
+            buffer = buffer[pos:]
+            pos = 0
+        buffer += text_decoder.decode(data or b'', final=not data)
+        return bool(data)
+
+    def skip_whitespace():
+        ''' :returns: the next non whitespace character or '' at the end \
+            of the file '''
+        nonlocal pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if eof or not fill(chunk_size):
+                eof = True
+                return ''
+
+    try:
+        first = skip_whitespace()
+        if not first:
+            return
+        if first != '[':
+            raise ValueError('Expected a JSON array, got %r' % first)
+        pos += 1
+
+        if skip_whitespace() == ']':
+            return
+        while True:
+            # decode the next element; values ending at the end of the
+            # buffer (e.g. numbers) might be incomplete, so we read until
+            # the element is followed by at least one character.
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    if end < len(buffer) or eof:
+                        break
+                except JSONDecodeError:
+                    if eof:
+                        raise
+                # grow the reads with the element's size to keep the
+                # number of decoding attempts logarithmic
+                if not fill(max(chunk_size, len(buffer) - pos)):
+                    eof = True
+            pos = end
+            yield value
+
+            separator = skip_whitespace()
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError('Expected "," or "]" at position %d of the '
+                                 'JSON array, got %r' % (pos, separator))
+            pos += 1
+            skip_whitespace()
+    finally:
+        if close:
+            fp.close()